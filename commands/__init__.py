@@ -4,10 +4,12 @@
 # If you want to add an additional command, duplicate one of the existing directories and import it here.
 # You need to use aliases (import "entry" as "my_module") assuming you have the default module named "entry".
 from .marbleRunCreate import entry as marbleRunCreate
+from .marbleRunEdit import entry as marbleRunEdit
 
 # Add the spur gear create module to list so it will be started and stopped.
 commands = [
-    marbleRunCreate
+    marbleRunCreate,
+    marbleRunEdit
 ]
 
 
@@ -0,0 +1,174 @@
+# Beam search engine.
+# A non-backtracking alternative to path_generator.fill_path. All partial paths in the beam have the same length, so
+# every step extends each of the beam_width best partial paths by one cell, scores all extensions at once with NumPy
+# and keeps the best beam_width of them. The run time is about beam_width x number of cells, no matter how unlucky the
+# random choices are. The beam can die out (no valid extension left), then None is returned instead of restarting.
+#
+# Extensions are dropped if they leave a free cell that can't be passed through any more (a dead end), cut off the
+# end cell, or split the free cells into separate parts. The rest are ranked by the number of onward moves (Warnsdorff),
+# the number of free cells that only have two ways left, how close the head is to the end cell while many cells are
+# still free, and the number of bends.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from . import path_generator
+except ImportError:
+    import path_generator
+
+default_weights = {'onward': 1.0, 'tight': 4.0, 'closeness': 2.0, 'bends': 0.5, 'noise': 0.5}
+num_candidates = 0 # number of extensions scored by the last search
+
+# Row and column steps for the directions 0: +X, 1: +Y, 2: -X, 3: -Y
+row_steps = [0, -1, 0, 1]
+col_steps = [1, 0, -1, 0]
+
+
+def is_available():
+    return np is not None
+
+
+# Number of set neighbors of every cell. The grids have a border of unset cells, so the border is left at 0
+def neighbor_count(grids):
+    counts = np.zeros(grids.shape, dtype=np.int8)
+    counts[:, 1:-1, 1:-1] = (grids[:, :-2, 1:-1].astype(np.int8) + grids[:, 2:, 1:-1] + grids[:, 1:-1, :-2]
+                             + grids[:, 1:-1, 2:])
+    return counts
+
+
+# True for the heads whose free neighbors are not connected around the head. Only those moves can split the free
+# cells into separate parts, so only they need the full check.
+def may_split(free, rows, cols):
+    index = np.arange(len(rows))
+    orthogonal = [free[index, rows-1, cols], free[index, rows, cols+1], free[index, rows+1, cols], free[index, rows, cols-1]]
+    diagonal = [free[index, rows-1, cols+1], free[index, rows+1, cols+1], free[index, rows+1, cols-1], free[index, rows-1, cols-1]]
+    num_groups = sum(cell.astype(np.int8) for cell in orthogonal)
+    for i in range(4):
+        num_groups = num_groups - (orthogonal[i] & orthogonal[(i+1) % 4] & diagonal[i])
+    return num_groups > 1
+
+
+# True for the grids whose set cells are all connected. Labels spread to their neighbors until nothing changes
+def is_connected(free):
+    big = np.iinfo(np.int32).max
+    cells = np.arange(free[0].size, dtype=np.int32).reshape(free[0].shape)
+    labels = np.where(free, cells, big)
+    while True:
+        spread = labels.copy()
+        inner = spread[:, 1:-1, 1:-1]
+        np.minimum(inner, labels[:, :-2, 1:-1], out=inner)
+        np.minimum(inner, labels[:, 2:, 1:-1], out=inner)
+        np.minimum(inner, labels[:, 1:-1, :-2], out=inner)
+        np.minimum(inner, labels[:, 1:-1, 2:], out=inner)
+        spread = np.where(free, spread, big)
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    lowest = labels.min(axis=(1, 2))
+    highest = np.where(free, labels, -1).max(axis=(1, 2))
+    return (lowest == highest) | (highest == -1)
+
+
+def generate_path_beam(x_size, y_size, beam_width=64, seed=None, mask=None, weights=None):
+    global num_candidates
+    if np is None:
+        raise ImportError('The beam search engine needs NumPy')
+    weights = dict(default_weights, **(weights or {}))
+    rng = np.random.default_rng(seed)
+    path_generator.create_matrix(x_size, y_size, mask)
+    if path_generator.infeasible_reason:
+        raise ValueError(path_generator.infeasible_reason)
+    num_candidates = 0
+
+    # Grids are padded with a border of used cells, so neighbors never leave the array
+    height, width = y_size + 2, x_size + 2
+    start = (y_size, 3) # (2, ySize-1) in padded (row, col)
+    end_x, end_y = path_generator.get_end_cell()
+    end = (end_y + 1, end_x + 1)
+    last_num = path_generator.num_cells - 4
+    free_cells = np.zeros((height, width), dtype=bool)
+    free_cells[1:-1, 1:-1] = np.array(path_generator.matrix) == 0
+    free_cells[start] = False
+    end_distance = np.abs(np.arange(height)[:, None] - end[0]) + np.abs(np.arange(width)[None, :] - end[1])
+    max_distance = end_distance[1:-1, 1:-1].max()
+
+    free = free_cells[None]
+    rows = np.array([start[0]])
+    cols = np.array([start[1]])
+    last_directions = np.array([1]) # the marble enters the start cell moving +Y
+    bends = np.zeros(1, dtype=np.int32)
+    history = [] # for every step: the beam entry each new entry came from, and its head
+
+    for num in range(2, last_num + 1):
+        parents = np.repeat(np.arange(len(rows)), 4)
+        directions = np.tile(np.arange(4), len(rows))
+        new_rows = rows[parents] + np.take(row_steps, directions)
+        new_cols = cols[parents] + np.take(col_steps, directions)
+        is_end = (new_rows == end[0]) & (new_cols == end[1])
+        # The end cell is entered last and only then
+        valid = free[parents, new_rows, new_cols] & (is_end == (num == last_num))
+        parents, directions, new_rows, new_cols = parents[valid], directions[valid], new_rows[valid], new_cols[valid]
+        num_candidates += len(parents)
+        if len(parents) == 0:
+            return None
+        index = np.arange(len(parents))
+        new_free = free[parents].copy()
+        new_free[index, new_rows, new_cols] = False
+        new_bends = bends[parents] + (directions != last_directions[parents])
+
+        if num < last_num:
+            heads = np.zeros_like(new_free)
+            heads[index, new_rows, new_cols] = True
+            degrees = neighbor_count(new_free | heads)
+            onward = neighbor_count(new_free)[index, new_rows, new_cols]
+            passing = new_free.copy() # free cells the path has to enter and leave again
+            passing[:, end[0], end[1]] = False
+            valid = (~(passing & (degrees < 2)).any(axis=(1, 2)) & (degrees[:, end[0], end[1]] >= 1) & (onward >= 1))
+            splits = valid & may_split(new_free, new_rows, new_cols)
+            if splits.any():
+                valid[splits] = is_connected(new_free[splits])
+            tight = (passing & (degrees == 2)).sum(axis=(1, 2))
+            remaining = (last_num - num) / last_num
+            closeness = 1 - end_distance[new_rows, new_cols] / max_distance
+            scores = (weights['onward'] * onward + weights['tight'] * tight / last_num
+                      + weights['closeness'] * closeness * remaining + weights['bends'] * new_bends / num
+                      + weights['noise'] * rng.random(len(parents)))
+            scores[~valid] = np.inf
+            order = np.argsort(scores, kind='stable')
+            order = order[np.isfinite(scores[order])]
+        else:
+            order = index
+        if len(order) == 0:
+            return None
+
+        # Different partial paths can cover the same cells and end at the same head. Only the best of them is kept
+        keys = np.packbits(new_free[order].reshape(len(order), -1), axis=1)
+        selected = []
+        seen = set()
+        for position, candidate in enumerate(order):
+            key = (int(new_rows[candidate]), int(new_cols[candidate]), keys[position].tobytes())
+            if key not in seen:
+                seen.add(key)
+                selected.append(candidate)
+                if len(selected) == beam_width:
+                    break
+        selected = np.array(selected)
+        free = new_free[selected]
+        rows = new_rows[selected]
+        cols = new_cols[selected]
+        last_directions = directions[selected]
+        bends = new_bends[selected]
+        history.append((parents[selected], rows, cols))
+
+    # Walk back from the best finished path
+    cells = []
+    entry = 0
+    for parents, step_rows, step_cols in reversed(history):
+        cells.append((int(step_cols[entry]) - 1, int(step_rows[entry]) - 1))
+        entry = parents[entry]
+    cells.append((start[1] - 1, start[0] - 1))
+    cells.reverse()
+    # create_matrix already placed the end block, so only the cells up to the end cell are set
+    return path_generator.set_path(x_size, y_size, cells, mask)
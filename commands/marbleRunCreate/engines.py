@@ -0,0 +1,134 @@
+# Registry of the path generation engines and automatic selection.
+# Every engine declares what it can do: whether it handles masked cells, whether it is exact (can prove that a run has
+# no path) and the range of run sizes it is meant for. generate_path picks the suitable engines for a request, orders
+# them by the time they are expected to take according to the cost table written by
+# tools/benchmark_path_generator.py --write-costs, and runs them until one of them returns a path.
+import json
+import math
+import os
+
+try:
+    from . import path_generator
+    from . import beam_search
+    from . import path_partition
+    from . import sat_backend
+except ImportError:
+    import path_generator
+    import beam_search
+    import path_partition
+    import sat_backend
+
+engines = {}
+cost_table_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'engine_costs.json')
+cost_table = None
+last_engine = None # name of the engine that generated the last path
+
+
+# generate(x_size, y_size, seed, mask) returns the path matrix, or None if the engine gave up.
+# An exact engine raises ValueError when the run has no path.
+def register_engine(name, generate, is_available=None, supports_mask=True, is_exact=False, min_cells=0,
+                    max_cells=None, priority=0):
+    engines[name] = {
+        'generate': generate,
+        'is_available': is_available or (lambda: True),
+        'supports_mask': supports_mask,
+        'is_exact': is_exact,
+        'min_cells': min_cells,
+        'max_cells': max_cells,
+        'priority': priority, # used to order engines that the cost table doesn't know
+    }
+
+
+def generate_backtracking(x_size, y_size, seed, mask):
+    return path_generator.generate_path(x_size, y_size, seed, mask, max_attempts=50)
+
+
+def generate_beam(x_size, y_size, seed, mask):
+    # A wider beam rarely needs a second try, a narrow one is much faster
+    for beam_width in [16, 128]:
+        matrix = beam_search.generate_path_beam(x_size, y_size, beam_width, seed, mask)
+        if matrix is not None:
+            return matrix
+    return None
+
+
+def generate_partitioned(x_size, y_size, seed, mask):
+    matrix = path_partition.find_path(x_size, y_size, processes=1, mask=mask) # no worker processes inside Fusion
+    if matrix is None:
+        raise ValueError('There is no path through all cells of this run')
+    return matrix
+
+
+def generate_sat(x_size, y_size, seed, mask):
+    return sat_backend.generate_path_sat(x_size, y_size, seed, mask)
+
+
+register_engine('beam', generate_beam, beam_search.is_available, priority=3)
+register_engine('sat', generate_sat, sat_backend.is_available, is_exact=True, max_cells=2500, priority=2)
+register_engine('backtracking', generate_backtracking, max_cells=400, priority=1)
+# The exhaustive search only finishes in reasonable time on small runs
+register_engine('partitioned', generate_partitioned, is_exact=True, max_cells=49, priority=0)
+
+
+def load_cost_table():
+    global cost_table
+    if cost_table is None:
+        try:
+            with open(cost_table_file) as file:
+                cost_table = json.load(file)['costs']
+        except (OSError, ValueError, KeyError):
+            cost_table = {}
+    return cost_table
+
+
+# Expected seconds for the engine on a run with num_cells cells, interpolated between the measured sizes.
+# Returns None if the engine was never measured.
+def estimate_cost(name, num_cells):
+    measured = sorted((int(cells), cost) for cells, cost in load_cost_table().get(name, {}).items())
+    if not measured:
+        return None
+    if num_cells <= measured[0][0]:
+        return measured[0][1]
+    for (cells_1, cost_1), (cells_2, cost_2) in zip(measured, measured[1:]):
+        if num_cells <= cells_2:
+            t = (num_cells - cells_1) / (cells_2 - cells_1)
+            return cost_1 + t * (cost_2 - cost_1)
+    # Past the largest measured size assume the cost grows with the square of the number of cells
+    cells, cost = measured[-1]
+    return cost * (num_cells / cells)**2
+
+
+# The suitable engines for the request, fastest expected first
+def select_engines(x_size, y_size, mask=None, require_exact=False):
+    num_cells = x_size * y_size - len(mask or ())
+    candidates = []
+    for name, engine in engines.items():
+        if not engine['is_available']():
+            continue
+        if mask and not engine['supports_mask']:
+            continue
+        if require_exact and not engine['is_exact']:
+            continue
+        if num_cells < engine['min_cells'] or (engine['max_cells'] is not None and num_cells > engine['max_cells']):
+            continue
+        cost = estimate_cost(name, num_cells)
+        candidates.append((cost if cost is not None else math.inf, -engine['priority'], name))
+    candidates.sort()
+    return [name for _, _, name in candidates]
+
+
+# The single entry point for generating a path. Raises ValueError if the run has no path.
+def generate_path(x_size, y_size, seed=None, mask=None, require_exact=False):
+    global last_engine
+    path_generator.create_matrix(x_size, y_size, mask)
+    if path_generator.infeasible_reason:
+        raise ValueError(path_generator.infeasible_reason)
+    names = select_engines(x_size, y_size, mask, require_exact)
+    for name in names:
+        matrix = engines[name]['generate'](x_size, y_size, seed, mask)
+        if matrix is not None:
+            last_engine = name
+            return matrix
+    if not names:
+        raise ValueError(f'No path engine can handle a {x_size}x{y_size} run')
+    raise ValueError('No path was found in time. Please try again')
@@ -0,0 +1,52 @@
+# Lookup of the planar faces of a body or feature by the direction they face, so that the build doesn't scan the
+# topology for every query. The faces are read once: curved faces (the ball paths, most of the faces of a joined run)
+# are skipped after one surface type check, and every planar face is put into the bucket of its normal together with
+# the center of its bounding box.
+import math
+
+import adsk.core
+import adsk.fusion
+
+normal_digits = 3 # faces whose normals agree to this many digits share a bucket
+
+
+class FaceIndex:
+    def __init__(self, faces):
+        self.faces_by_normal = {} # rounded normal -> [(face, center of the bounding box)]
+        plane_type = adsk.core.SurfaceTypes.PlaneSurfaceType
+        parameter = adsk.core.Point2D.create(0.5, 0.5)
+        for face in faces:
+            if face.geometry.surfaceType != plane_type:
+                continue
+            # The normal of the face evaluator points out of the body, the normal of the plane may not
+            success, normal = face.evaluator.getNormalAtParameter(parameter)
+            if not success:
+                continue
+            box = face.boundingBox
+            center = tuple((a + b)/2 for a, b in zip(box.minPoint.asArray(), box.maxPoint.asArray()))
+            key = tuple(round(c, normal_digits) + 0.0 for c in (normal.x, normal.y, normal.z)) # + 0.0 turns -0.0 into 0.0
+            self.faces_by_normal.setdefault(key, []).append((face, center))
+
+    def faces_facing(self, direction, tolerance=1e-3):
+        """Return the planar faces whose normal is within tolerance (1 - cosine of the angle) of direction."""
+        length = math.sqrt(sum(c*c for c in direction))
+        direction = [c/length for c in direction]
+        faces = []
+        for normal, entries in self.faces_by_normal.items():
+            # Compare with every bucket instead of looking up the rounded direction, so a normal that was rounded the
+            # other way is still found. There are only a few dozen buckets
+            normal_length = math.sqrt(sum(c*c for c in normal))
+            if sum(a*b for a, b in zip(normal, direction)) / normal_length > 1 - tolerance:
+                faces.extend(entries)
+        return faces
+
+    def outermost_face(self, direction, tolerance=1e-3):
+        """Return the face facing direction that lies farthest in that direction, e.g. the bottom face for (0, 0, -1).
+
+        Returns None if no planar face faces direction.
+        """
+        faces = self.faces_facing(direction, tolerance)
+        if not faces:
+            return None
+        face, _ = max(faces, key=lambda entry: sum(a*b for a, b in zip(entry[1], direction)))
+        return face
@@ -1,8 +1,16 @@
 import adsk.core
 import adsk.fusion
 from . import path_generator
+from . import path_edit
+from . import engines
+from . import tile_geometry
+from . import tile_cache
+from . import face_index
+from . import run_state
 import math
 import os
+import random
+import re
 import json
 import time
 from ...lib import fusionAddInUtils as futil
@@ -10,10 +18,21 @@ from ...lib import fusionAddInUtils as futil
 app = adsk.core.Application.get()
 ui = app.userInterface
 skipValidate = False
+build_modes = ['Per Cell', 'By Tile Type', 'Instanced', 'Direct']
+last_build_times = {} # seconds spent in each stage of the last build, see HandleExecute
+# How the placed tiles are joined into one body, see union_bodies
+union_strategies = ['One Shot', 'By Row', 'Pairwise Tree', 'K-Way Tree']
+base_track_body_names = ['Track +X+X', 'Track +Y+Y', 'Track -X-X', 'Track -Y-Y', 'Track +Y+X', 'Track -X+Y',
+                         'Track -Y-X', 'Track +X-Y', 'Track +Y-X', 'Track -X-Y', 'Track -Y+X', 'Track +X+Y'] # by track type
+tree_group_size = 8 # number of bodies joined at once by the K-Way Tree strategy
+# A new run only adapts the path of the last run if its width and depth differ by at most this many cells, i.e. one step
+# of a slider to the next size that has a path. Larger changes make an unrelated run, which gets a path of its own
+max_resize_step = 2
+last_union_stats = {} # strategy, number of joins, largest number of tool bodies in one join and seconds of the last union
 
 
 class MarbleRunLogic():
-    def __init__(self, des: adsk.fusion.Design):
+    def __init__(self, des: adsk.fusion.Design, is_edit=False):
         # Read the cached values, if they exist.
         settings = None
         settingAttribute = des.attributes.itemByName('MarbleRun', 'settings')
@@ -35,15 +54,64 @@ class MarbleRunLogic():
         if settings:
             self.diameter = settings['Diameter']
 
+        # The path of the last run, so that a resized run can keep most of it
+        self.last_path = None
+        if settings:
+            self.last_path = settings.get('Path')
+
+        # The layout of the last run if it was built with the Instanced build mode and hasn't been merged yet
+        self.settings = settings
+        self.instanced_run = None
+        if settings:
+            self.instanced_run = settings.get('InstancedRun')
+
+        # How the track tiles are placed, see build_modes
+        self.build_mode = build_modes[0]
+        if settings and settings.get('BuildMode') in build_modes:
+            self.build_mode = settings['BuildMode']
+
+        # Draw the base tiles without constraints and dimensions
+        self.fast_build = False
+        if settings:
+            self.fast_build = settings.get('FastBuild', False)
+
+        # How the tiles are joined, see union_strategies
+        self.union_strategy = union_strategies[0]
+        if settings and settings.get('UnionStrategy') in union_strategies:
+            self.union_strategy = settings['UnionStrategy']
+
+        # The stored states of the runs in the design by group name. The Edit Marble Run command opens the dialog with
+        # the state of the selected run, or of the last run if no run is selected
+        self.run_states = {}
+        self.edit_state = None
+        if is_edit:
+            self.run_states = load_run_states(des)
+            group_name = selected_run_group(ui.activeSelections)
+            if group_name not in self.run_states and self.run_states:
+                group_name = list(self.run_states)[-1]
+            if group_name in self.run_states:
+                self.select_edit_run(group_name)
+
         # self.ignoreArcCenters = True
         # if settings:
         #     self.ignoreArcCenters = settings['IgnoreArcCenters']
 
 
+    def select_edit_run(self, group_name):
+        # A resize or a re-roll in the edit changes the path of the edited run, not the one of the last run
+        self.edit_state = self.run_states[group_name]
+        self.last_path = state_path(self.edit_state)
+
     def CreateCommandInputs(self, inputs: adsk.core.CommandInputs):
         global skipValidate
         skipValidate = True
 
+        if self.edit_state:
+            self.editRunInput = inputs.addDropDownCommandInput('edit_run', 'Run', adsk.core.DropDownStyles.TextListDropDownStyle)
+            for group_name in self.run_states:
+                self.editRunInput.listItems.add(group_name, self.run_states[group_name] is self.edit_state)
+            self.editRunInput.tooltip = 'The run to edit, by the name of its timeline group'
+
         # Create the command inputs to define the contents of the command dialog.
         self.widthValueInput = inputs.addIntegerSliderCommandInput('num_x_cells', 'Width', 2, 15, False)
         self.widthValueInput.tooltip = "Number of cells in the X direction"
@@ -51,12 +119,36 @@ class MarbleRunLogic():
         self.depthValueInput = inputs.addIntegerSliderCommandInput('num_y_cells', 'Depth', 2, 15, False)
         self.depthValueInput.tooltip = "Number of cells in the Y direction"
         self.depthValueInput.valueOne = 13 # set default value
+        self.maskValueInput = inputs.addStringValueInput('masked_cells', 'Masked Cells', '')
+        self.maskValueInput.tooltip = 'Cells to leave out of the run, e.g. "5,0; 10-14,0-3" (x,y with 0,0 at the back left)'
+        self.rerollValueInput = inputs.addStringValueInput('reroll_region', 'Re-roll Region', '')
+        self.rerollValueInput.tooltip = 'Cells where the last path should be changed, e.g. "3-7,2-6". The rest of the path stays as it is'
+
+        self.buildModeInput = inputs.addDropDownCommandInput('build_mode', 'Build Mode', adsk.core.DropDownStyles.TextListDropDownStyle)
+        for build_mode in build_modes:
+            self.buildModeInput.listItems.add(build_mode, build_mode == self.build_mode)
+        self.buildModeInput.tooltip = ('Per Cell: one copy and one move feature per cell. By Tile Type: one base feature per track type, much shorter timeline. '
+                                       'Instanced: one component per track type and one occurrence per cell, join them later with Merge Instanced Run. '
+                                       'Direct: the run is joined in memory and added as one base feature, fastest but not parametric')
+        self.mergeInstancesInput = inputs.addBoolValueInput('merge_instances', 'Merge Instanced Run', True, '', False)
+        self.mergeInstancesInput.tooltip = 'Only join the tiles of the last instanced run into one printable body, e.g. before exporting. No new run is built'
+        self.fastBuildInput = inputs.addBoolValueInput('fast_build', 'Fast Build', True, '', self.fast_build)
+        self.fastBuildInput.tooltip = ('Draw the base tiles at their final size without sketch constraints and dimensions. '
+                                       'Builds faster, but editing the diameter, clearance or slope later doesn\'t update the tiles')
+        self.unionStrategyInput = inputs.addDropDownCommandInput('union_strategy', 'Union Strategy', adsk.core.DropDownStyles.TextListDropDownStyle)
+        for union_strategy in union_strategies:
+            self.unionStrategyInput.listItems.add(union_strategy, union_strategy == self.union_strategy)
+        self.unionStrategyInput.tooltip = ('How the tiles are joined into one body. One Shot: a single join of all tiles. By Row: one join per row of cells, then one join of the rows. '
+                                           f'Pairwise Tree and K-Way Tree: neighbouring tiles are joined in groups of 2 or {tree_group_size}, then the groups, until one body is left. '
+                                           'Smaller joins are often faster and more robust for large runs')
 
         self.diameterValueInput = inputs.addValueInput('diameter', 'Marble Diameter', 'mm', adsk.core.ValueInput.createByReal(float(self.diameter)))
         self.clearanceValueInput = inputs.addValueInput('clearance', 'Clearance', 'mm', adsk.core.ValueInput.createByReal(0.015))
         self.clearanceValueInput.tooltip = "Clearance between the marble and the track"
 
         self.slopeValueInput = inputs.addValueInput('slope', 'Slope', '', adsk.core.ValueInput.createByReal(0.06))
+        if self.edit_state:
+            set_input_values(inputs, self.edit_state['Inputs'])
         slope = self.slopeValueInput.value
         angle = abs(math.degrees(math.atan2(slope, 1.0)))
         angle_text = f'{angle:.2f} deg' # display angle to two decimal places
@@ -72,6 +164,9 @@ class MarbleRunLogic():
         changedInput = args.input
         if not skipValidate:
             # self.ignoreArcCenters = self.ignoreArcCentersValueInput.value
+            if changedInput.id == 'edit_run':
+                self.select_edit_run(changedInput.selectedItem.name)
+                set_input_values(args.inputs, self.edit_state['Inputs'])
             if changedInput.id == 'slope':
                 slope = self.slopeValueInput.value
                 angle = abs(math.degrees(math.atan2(slope, 1.0)))
@@ -87,6 +182,36 @@ class MarbleRunLogic():
                 self.errorMessageTextInput.text = 'The slope must be greater than 0'
                 args.areInputsValid = False
                 return
+            try:
+                masked_cells = path_generator.parse_masked_cells(self.maskValueInput.value)
+                reroll_cells = path_generator.parse_masked_cells(self.rerollValueInput.value)
+                # Catch runs without any path (e.g. an even width or depth) before the search starts
+                path_generator.create_matrix(self.widthValueInput.valueOne, self.depthValueInput.valueOne, masked_cells)
+                path_edit.check_reroll_region(reroll_cells, self.widthValueInput.valueOne, self.depthValueInput.valueOne, masked_cells)
+            except ValueError as error:
+                self.errorMessageTextInput.text = str(error)
+                args.areInputsValid = False
+                return
+            if path_generator.infeasible_reason:
+                self.errorMessageTextInput.text = path_generator.infeasible_reason
+                args.areInputsValid = False
+                return
+            if reroll_cells:
+                # A re-roll changes the last path in place, it can't also resize it or route it around other cells
+                last_path = self.last_path
+                if not last_path:
+                    self.errorMessageTextInput.text = 'There is no path to re-roll'
+                    args.areInputsValid = False
+                    return
+                if ((last_path['Width'], last_path['Depth']) != (self.widthValueInput.valueOne, self.depthValueInput.valueOne)
+                        or {tuple(cell) for cell in last_path['MaskedCells']} != masked_cells):
+                    self.errorMessageTextInput.text = 'Clear the re-roll region to change the size or the masked cells of the run'
+                    args.areInputsValid = False
+                    return
+            if self.mergeInstancesInput.value and not self.instanced_run:
+                self.errorMessageTextInput.text = 'There is no instanced run to merge'
+                args.areInputsValid = False
+                return
 
     def HandleExecute(self, args: adsk.core.CommandEventArgs):
         inputs = args.command.commandInputs
@@ -113,6 +238,29 @@ class MarbleRunLogic():
         num_y_cells = inputs.itemById('num_y_cells').valueOne # int
         num_x_cells_text = inputs.itemById('num_x_cells').expressionOne # Str
         num_y_cells_text = inputs.itemById('num_y_cells').expressionOne # Str
+        masked_cells = path_generator.parse_masked_cells(inputs.itemById('masked_cells').value)
+        reroll_cells = path_generator.parse_masked_cells(inputs.itemById('reroll_region').value)
+        build_mode = inputs.itemById('build_mode').selectedItem.name
+        is_fast_build = inputs.itemById('fast_build').value
+        union_strategy = inputs.itemById('union_strategy').selectedItem.name
+
+        if inputs.itemById('merge_instances').value:
+            # Only join the tiles of the last instanced run, nothing new is built
+            if not merge_instanced_run(des, self.instanced_run, union_strategy):
+                futil.log('the tiles of the instanced run weren\'t found, nothing was merged')
+            settings = dict(self.settings)
+            del settings['InstancedRun']
+            des.attributes.add('MarbleRun', 'settings', json.dumps(settings))
+            return
+
+        run_input_values = input_values(inputs)
+        edit_stages = None
+        if self.edit_state:
+            edit_stages = run_state.changed_stages(self.edit_state, run_input_values, reroll_cells)
+            if 'layout' not in edit_stages:
+                futil.log('the run is unchanged, nothing to redo')
+                return
+            futil.log(f'redoing the run for changes of: {", ".join(sorted(edit_stages))}')
 
         slope = inputs.itemById('slope').value
         slope_text = inputs.itemById('slope').expression
@@ -129,517 +277,608 @@ class MarbleRunLogic():
         diameter_text = f'({ball_diameter_text} + 2 * {clearance_text})' # String
 
         super_z_drop = slope*(diameter/2) + super_slope*(ball_diameter/4) + slope*(diameter/2-ball_diameter/4) # float
-
-        # Straight track sketch
-        straight_track_sketch = sketches.add(xzPlane)
-        straight_track_sketch.name = 'Straight Track'
-        lines = straight_track_sketch.sketchCurves.sketchLines
-        points = straight_track_sketch.sketchPoints
-        origin_point = straight_track_sketch.originPoint
-        constraints = straight_track_sketch.geometricConstraints
-        dimensions = straight_track_sketch.sketchDimensions
-
-        # Create ball path line
-        startPoint = adsk.core.Point3D.create(-1*diameter/2-0.5, -1*slope*(diameter/2+0.5), 0)
-        endPoint = adsk.core.Point3D.create(diameter/2+0.5, slope*(diameter/2+0.5), 0)
-        # point = points.add(startPoint)
-        ball_path_line = lines.addByTwoPoints(startPoint, endPoint)
-        constraints.addMidPoint(origin_point, ball_path_line)
-
-        # Create the top line
-        # startPointX = ball_path_line.startSketchPoint.geometry.copy().x + 0.5
-        # startPoint = adsk.core.Point3D.create(startPointX, 1.0, 0)
-        # endPointX = ball_path_line.endSketchPoint.geometry.copy().x - 0.5
-        # endPoint = adsk.core.Point3D.create(endPointX, 1.0, 0)
-        startPoint = adsk.core.Point3D.create(-1*diameter/2, 1, 0)
-        endPoint = adsk.core.Point3D.create(diameter/2, 1+diameter*slope, 0)
-        top_line = lines.addByTwoPoints(startPoint, endPoint)
-
-        # Add dimensions to the top line
-        textPoint = top_line.startSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(-0.25,0.25,0))
-        top_line_v_dim = dimensions.addDistanceDimension(top_line.startSketchPoint, top_line.endSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
-        # top_line_v_dim.parameter.expression = f'{diameter} cm * 0.09'
-        top_line_v_dim.parameter.expression = f'{diameter_text} * {slope_text}'
-        textPoint = top_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0,0.25,0))
-        top_line_h_dim = dimensions.addDistanceDimension(top_line.startSketchPoint, top_line.endSketchPoint, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
-        top_line_h_dim.parameter.expression = f'{diameter_text}'
-
-        # Create the left vertical line
-        startPointCopy = top_line.startSketchPoint.geometry.copy()
-        endPoint = adsk.core.Point3D.create(startPointCopy.x, startPointCopy.y+1, 0)
-        left_line = lines.addByTwoPoints(top_line.startSketchPoint, endPoint)
-        constraints.addVertical(left_line)
-
-        # Create the right vertical line
-        endPointCopy = top_line.endSketchPoint.geometry.copy()
-        endPoint = adsk.core.Point3D.create(endPointCopy.x, endPointCopy.y+1, 0)
-        right_line = lines.addByTwoPoints(top_line.endSketchPoint, endPoint)
-        constraints.addVertical(right_line)
-
-        # Create the bottom line
-        bottom_line = lines.addByTwoPoints(left_line.endSketchPoint, right_line.endSketchPoint)
-
-        # Add parallel constraints with the top line
-        constraints.addParallel(top_line, ball_path_line)
-        constraints.addParallel(top_line, bottom_line)
-
-        # Add dimensions
-        # left margin
-        textPoint = ball_path_line.startSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.25, -0.1, 0))
-        left_margin_dim = dimensions.addOffsetDimension(left_line, ball_path_line.startSketchPoint, textPoint)
-        left_margin_dim.parameter.expression = '5 mm'
-        # right margin
-        textPoint = ball_path_line.endSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(-0.25, -0.1, 0))
-        right_margin_dim = dimensions.addOffsetDimension(right_line, ball_path_line.endSketchPoint, textPoint)
-        right_margin_dim.parameter.expression = '5 mm'
-        # bottom line
-        textPoint = bottom_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0, -0.1, 0))
-        bottom_line_dim = dimensions.addOffsetDimension(ball_path_line, bottom_line, textPoint)
-        bottom_line_dim.parameter.expression = f'{diameter_text} / 2 + 2.5 mm'
-        # top line
-        textPoint = top_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(-0.1, -0.1, 0))
-        top_line_dim = dimensions.addOffsetDimension(ball_path_line, top_line, textPoint)
-        top_line_dim.parameter.expression = f'{diameter_text} / 4'
-
-        # Extrude sketch profile
-        prof = straight_track_sketch.profiles.item(0)
-        extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        extrude_distance = adsk.core.ValueInput.createByString(diameter_text)
-        extrude_input.setSymmetricExtent(extrude_distance, True)
-        straight_track_extrude = extrudes.add(extrude_input)
-        track_PXPX_body = straight_track_extrude.bodies.item(0)
-        track_PXPX_body.name = "Track +X+X"
-        
-        # Cut ball path using pipe feature
-        path = adsk.fusion.Path.create(ball_path_line, adsk.fusion.ChainedCurveOptions.noChainedCurves)
-        pipe_input = pipes.createInput(path, adsk.fusion.FeatureOperations.CutFeatureOperation)
-        pipe_input.sectionSize = adsk.core.ValueInput.createByReal(diameter)
-        pipe = pipes.add(pipe_input)
-        pipe.sectionSize.expression = diameter_text # must set this equal to a string
-
-        # Make the track tall so that it easily combines into a 3D printable solid later
-        track_footprint_sketch = sketches.add(xyPlane)
-        track_footprint_sketch.name = 'Track Unit Footprint'
-        lines = track_footprint_sketch.sketchCurves.sketchLines
-        points = track_footprint_sketch.sketchPoints
-        origin_point = track_footprint_sketch.originPoint
-        constraints = track_footprint_sketch.geometricConstraints
-        dimensions = track_footprint_sketch.sketchDimensions
-
-        rectangle_point = adsk.core.Point3D.create(-1*diameter/2, diameter/2, 0)
-        rec_lines = lines.addCenterPointRectangle(origin_point.geometry.copy(), rectangle_point)
-        for i in range(rec_lines.count):
-            rec_line = rec_lines.item(i)
-            if i%2 == 0:
-                constraints.addHorizontal(rec_line)
+        # The same drops as expressions, so that the tile heights and the placement of the tiles follow later changes of
+        # the user parameters that the inputs refer to
+        straight_z_drop_text = f'{diameter_text} * {slope_text}'
+        super_z_drop_text = f'({slope_text} * {diameter_text} / 2 + {super_slope} * {ball_diameter_text} / 4 + {slope_text} * ({diameter_text} / 2 - {ball_diameter_text} / 4))'
+
+        last_build_times.clear()
+        stage_start_time = time.perf_counter()
+        # The base tiles only depend on these values (the number of cells sets their height), so a run with the same
+        # values reuses the tiles that an earlier run stored in the design or, in a new design, in the tile cache
+        base_tiles_key = json.dumps({'Version': tile_geometry.version, 'BallDiameter': round(ball_diameter, 6),
+                                     'Clearance': round(clearance, 6), 'Slope': round(slope, 6),
+                                     'Cells': num_x_cells * num_y_cells})
+        timeline_start_index = des.timeline.count
+        # Stored tiles are static copies, which wouldn't follow the user parameters
+        is_tile_reuse_allowed = not references_user_parameters(des, [ball_diameter_text, clearance_text, slope_text])
+        base_track_bodies = find_base_tiles(des, base_tiles_key) if is_tile_reuse_allowed else None
+        if base_track_bodies is not None:
+            futil.log('reusing the base tiles of an earlier run')
+        elif is_tile_reuse_allowed and tile_cache.is_enabled:
+            cached_tiles = tile_cache.load(base_tiles_key, len(base_track_body_names))
+            if cached_tiles:
+                add_cached_base_tiles(comp, cached_tiles, base_tiles_key)
+                base_track_bodies = find_base_tiles(des, base_tiles_key)
+                futil.log('loaded the base tiles from the tile cache')
+        is_base_tiles_built = base_track_bodies is None
+        if is_base_tiles_built:
+            if is_fast_build:
+                # Fusion solves every sketch after each added curve, constraint and dimension. Draw the tiles at the
+                # coordinates the solver would find instead and compute each sketch once at the end
+                straight_track_points = tile_geometry.straight_track(ball_diameter, clearance, slope)
+                bent_track_input_points = tile_geometry.bent_track_input(ball_diameter, clearance, slope)
+                bent_track_output_points = tile_geometry.bent_track_output(ball_diameter, clearance, slope)
+
+            # Straight track sketch
+            straight_track_sketch = sketches.add(xzPlane)
+            straight_track_sketch.name = 'Straight Track'
+            lines = straight_track_sketch.sketchCurves.sketchLines
+            points = straight_track_sketch.sketchPoints
+            origin_point = straight_track_sketch.originPoint
+            constraints = straight_track_sketch.geometricConstraints
+            dimensions = straight_track_sketch.sketchDimensions
+
+            if is_fast_build:
+                straight_track_sketch.isComputeDeferred = True
+                ball_path_line = add_line(lines, *straight_track_points['ball_path'])
+                top_line = add_line(lines, *straight_track_points['top'])
+                bottom_start, bottom_end = straight_track_points['bottom']
+                left_line = lines.addByTwoPoints(top_line.startSketchPoint, adsk.core.Point3D.create(bottom_start[0], bottom_start[1], 0))
+                right_line = lines.addByTwoPoints(top_line.endSketchPoint, adsk.core.Point3D.create(bottom_end[0], bottom_end[1], 0))
+                bottom_line = lines.addByTwoPoints(left_line.endSketchPoint, right_line.endSketchPoint)
+                straight_track_sketch.isComputeDeferred = False
             else:
-                constraints.addVertical(rec_line)
-        top_rec_line = rec_lines.item(0)
-        right_rec_line = rec_lines.item(1)
-        constraints.addEqual(top_rec_line, right_rec_line)
-        textPoint = top_rec_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0, 0.1, 0))
-        dimension = dimensions.addDistanceDimension(top_rec_line.startSketchPoint, top_rec_line.endSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, textPoint)
-        dimension.parameter.expression = f'{diameter_text}'
-        textPoint = top_rec_line.endSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(-0.2, 0.2, 0))
-        dimension = dimensions.addDistanceDimension(top_rec_line.endSketchPoint, origin_point, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
-        dimension.parameter.expression = f'{diameter_text} / 2'
-        textPoint = top_rec_line.endSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.2, -0.2, 0))
-        dimension = dimensions.addDistanceDimension(top_rec_line.endSketchPoint, origin_point, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
-        dimension.parameter.expression = f'{diameter_text} / 2'
-
-        prof = track_footprint_sketch.profiles.item(0)
-        extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.JoinFeatureOperation)
-        extrude_offset_text = f'-1 * ({num_x_cells_text} * {num_y_cells_text} * {super_z_drop} cm + {diameter_text} / 2 + 10 mm)'
-        start_offset = adsk.core.ValueInput.createByString(extrude_offset_text)
-        extrude_input.startExtent = adsk.fusion.OffsetStartDefinition.create(start_offset)
-        # Extract the extrude target face by finding the face created by the bottom line of the straight track sketch
-        # Could also extrude to the body instead of the face, which would be much simpler to implement. That didn't occur to me until after writing this code.
-        # extrude_target_face = bent_track_extrude.sideFaces.item(1) # This method does not reliably extract the correct face
-        extrude_target_face = None
-        straight_track_extrude_faces = straight_track_extrude.sideFaces
-        bottom_line_vertex_1 = list(bottom_line.startSketchPoint.geometry.asArray()) # the documentation says asArray returns a list but it appears to actually return a tuple
-        bottom_line_vertex_2 = list(bottom_line.endSketchPoint.geometry.asArray())
-        # Convert the sketch's coordinates to design's coordinates
-        bottom_line_vertex_1[2] = -1*bottom_line_vertex_1[1]
-        bottom_line_vertex_1[1] = 0
-        bottom_line_vertex_2[2] = -1*bottom_line_vertex_2[1]
-        bottom_line_vertex_2[1] = 0
-        # futil.log(f'bottom line start vertex: {bottom_line_vertex_1}')
-        # futil.log(f'bottom line end vertex: {bottom_line_vertex_2}')
-        for straight_track_extrude_face in straight_track_extrude_faces:
-            # futil.log(f'face area: {straight_track_extrude_face.area}')
-            for edge in straight_track_extrude_face.edges:
-                # futil.log(f'edge length: {edge.length}')
-                edge_vertex_1 = list(edge.startVertex.geometry.asArray())
-                edge_vertex_2 = list(edge.endVertex.geometry.asArray())
-                edge_vertex_1[1] = 0.0
-                edge_vertex_2[1] = 0.0
-                # futil.log(f'edge start vertex: {edge_vertex_1}')
-                # futil.log(f'edge end vertex: {edge_vertex_2}')
-                if (
-                    (are_points_close(edge_vertex_1, bottom_line_vertex_1) and are_points_close(edge_vertex_2, bottom_line_vertex_2))
-                    or (are_points_close(edge_vertex_1, bottom_line_vertex_2) and are_points_close(edge_vertex_2, bottom_line_vertex_1))
-                ):
-                    extrude_target_face = straight_track_extrude_face
-            if extrude_target_face:
-                break
-        # futil.log(f'final face area: {extrude_target_face.area}')
-        extrude_input.setOneSideExtent(
-            adsk.fusion.ToEntityExtentDefinition.create(extrude_target_face, False),  # False = don't chain faces
-            adsk.fusion.ExtentDirections.PositiveExtentDirection
-        )
-        extrudes.add(extrude_input)
-
-        track_PXPX_body.isVisible = False # hide the body so that it isn't cut by later features
-
-
-        # Bent track input path sketch
-        bent_track_input_path_sketch = sketches.add(yzPlane) # if you want a point to be at (a, b), you must input (-b, -a)
-        bent_track_input_path_sketch.name = 'Bent Track Input'
-        lines = bent_track_input_path_sketch.sketchCurves.sketchLines
-        points = bent_track_input_path_sketch.sketchPoints
-        origin_point = bent_track_input_path_sketch.originPoint
-        constraints = bent_track_input_path_sketch.geometricConstraints
-        dimensions = bent_track_input_path_sketch.sketchDimensions
-
-        start_point = origin_point
-        end_point = adsk.core.Point3D.create(-1, -2, 0)
-        input_path_line = lines.addByTwoPoints(start_point, end_point)
-
-        # Add dimensions to the input path line
-        textPoint = input_path_line.endSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.1,-0.1,0))
-        input_path_line_v_dim = dimensions.addDistanceDimension(input_path_line.endSketchPoint, input_path_line.startSketchPoint, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
-        input_path_line_v_dim.parameter.expression = f'{slope_text} * ( {diameter_text} / 2 + 5 mm )'
-        textPoint = input_path_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(-0.25,0,0))
-        input_path_line_h_dim = dimensions.addDistanceDimension(input_path_line.endSketchPoint, input_path_line.startSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
-        input_path_line_h_dim.parameter.expression = f'{diameter_text} / 2 + 5 mm'
-
-        # Create and dimension the extrude reference point
-        extrude_ref_point = points.add(adsk.core.Point3D.create(1, -1, 0))
-        textPoint = input_path_line.startSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.1, -0.3, 0))
-        extrude_ref_point_h_dim = dimensions.addDistanceDimension(extrude_ref_point, input_path_line.startSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
-        extrude_ref_point_h_dim.parameter.expression = f'{diameter_text} / 2'
-        textPoint = extrude_ref_point.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(-0.2, 0.2, 0))
-        extrude_ref_point_dist_dim = dimensions.addOffsetDimension(input_path_line, extrude_ref_point, textPoint)
-        extrude_ref_point_dist_dim.parameter.expression = f'{diameter_text} / 4'
-
-        # Bent track output path sketch
-        bent_track_output_path_sketch = sketches.add(xzPlane) # if you want a point to be at (a, b), you must input (a, -b)
-        bent_track_output_path_sketch.name = 'Bent Track Output'
-        lines = bent_track_output_path_sketch.sketchCurves.sketchLines
-        points = bent_track_output_path_sketch.sketchPoints
-        origin_point = bent_track_output_path_sketch.originPoint
-        constraints = bent_track_output_path_sketch.geometricConstraints
-        dimensions = bent_track_output_path_sketch.sketchDimensions
-
-        # Project a sketch point from sourceSketch into targetSketch
-        projectedEntities = bent_track_output_path_sketch.project2([extrude_ref_point], True)
-        if len(projectedEntities) > 0:
-            projected_extr_ref_point = projectedEntities[0]
+                # Create ball path line
+                startPoint = adsk.core.Point3D.create(-1*diameter/2-0.5, -1*slope*(diameter/2+0.5), 0)
+                endPoint = adsk.core.Point3D.create(diameter/2+0.5, slope*(diameter/2+0.5), 0)
+                # point = points.add(startPoint)
+                ball_path_line = lines.addByTwoPoints(startPoint, endPoint)
+                constraints.addMidPoint(origin_point, ball_path_line)
+
+                # Create the top line
+                # startPointX = ball_path_line.startSketchPoint.geometry.copy().x + 0.5
+                # startPoint = adsk.core.Point3D.create(startPointX, 1.0, 0)
+                # endPointX = ball_path_line.endSketchPoint.geometry.copy().x - 0.5
+                # endPoint = adsk.core.Point3D.create(endPointX, 1.0, 0)
+                startPoint = adsk.core.Point3D.create(-1*diameter/2, 1, 0)
+                endPoint = adsk.core.Point3D.create(diameter/2, 1+diameter*slope, 0)
+                top_line = lines.addByTwoPoints(startPoint, endPoint)
+
+                # Add dimensions to the top line
+                textPoint = top_line.startSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(-0.25,0.25,0))
+                top_line_v_dim = dimensions.addDistanceDimension(top_line.startSketchPoint, top_line.endSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
+                # top_line_v_dim.parameter.expression = f'{diameter} cm * 0.09'
+                top_line_v_dim.parameter.expression = f'{diameter_text} * {slope_text}'
+                textPoint = top_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0,0.25,0))
+                top_line_h_dim = dimensions.addDistanceDimension(top_line.startSketchPoint, top_line.endSketchPoint, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
+                top_line_h_dim.parameter.expression = f'{diameter_text}'
+
+                # Create the left vertical line
+                startPointCopy = top_line.startSketchPoint.geometry.copy()
+                endPoint = adsk.core.Point3D.create(startPointCopy.x, startPointCopy.y+1, 0)
+                left_line = lines.addByTwoPoints(top_line.startSketchPoint, endPoint)
+                constraints.addVertical(left_line)
+
+                # Create the right vertical line
+                endPointCopy = top_line.endSketchPoint.geometry.copy()
+                endPoint = adsk.core.Point3D.create(endPointCopy.x, endPointCopy.y+1, 0)
+                right_line = lines.addByTwoPoints(top_line.endSketchPoint, endPoint)
+                constraints.addVertical(right_line)
+
+                # Create the bottom line
+                bottom_line = lines.addByTwoPoints(left_line.endSketchPoint, right_line.endSketchPoint)
+
+                # Add parallel constraints with the top line
+                constraints.addParallel(top_line, ball_path_line)
+                constraints.addParallel(top_line, bottom_line)
+
+                # Add dimensions
+                # left margin
+                textPoint = ball_path_line.startSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.25, -0.1, 0))
+                left_margin_dim = dimensions.addOffsetDimension(left_line, ball_path_line.startSketchPoint, textPoint)
+                left_margin_dim.parameter.expression = '5 mm'
+                # right margin
+                textPoint = ball_path_line.endSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(-0.25, -0.1, 0))
+                right_margin_dim = dimensions.addOffsetDimension(right_line, ball_path_line.endSketchPoint, textPoint)
+                right_margin_dim.parameter.expression = '5 mm'
+                # bottom line
+                textPoint = bottom_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0, -0.1, 0))
+                bottom_line_dim = dimensions.addOffsetDimension(ball_path_line, bottom_line, textPoint)
+                bottom_line_dim.parameter.expression = f'{diameter_text} / 2 + 2.5 mm'
+                # top line
+                textPoint = top_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(-0.1, -0.1, 0))
+                top_line_dim = dimensions.addOffsetDimension(ball_path_line, top_line, textPoint)
+                top_line_dim.parameter.expression = f'{diameter_text} / 4'
+
+            # Extrude sketch profile
+            prof = straight_track_sketch.profiles.item(0)
+            extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+            extrude_distance = adsk.core.ValueInput.createByString(diameter_text)
+            extrude_input.setSymmetricExtent(extrude_distance, True)
+            straight_track_extrude = extrudes.add(extrude_input)
+            track_PXPX_body = straight_track_extrude.bodies.item(0)
+            track_PXPX_body.name = "Track +X+X"
         
-        rec_lines = lines.addTwoPointRectangle(adsk.core.Point3D.create(-1*diameter/2, 0.1, 0), adsk.core.Point3D.create(diameter/2, 0.5, 0))
-        # rectangle lines seem to be listed clockwise starting with the top line
-        for i in range(rec_lines.count):
-            rec_line = rec_lines.item(i)
-            if i%2 == 0:
-                constraints.addHorizontal(rec_line)
+            # Cut ball path using pipe feature
+            path = adsk.fusion.Path.create(ball_path_line, adsk.fusion.ChainedCurveOptions.noChainedCurves)
+            pipe_input = pipes.createInput(path, adsk.fusion.FeatureOperations.CutFeatureOperation)
+            pipe_input.sectionSize = adsk.core.ValueInput.createByReal(diameter)
+            pipe = pipes.add(pipe_input)
+            pipe.sectionSize.expression = diameter_text # must set this equal to a string
+
+            # Make the track tall so that it easily combines into a 3D printable solid later
+            track_footprint_sketch = sketches.add(xyPlane)
+            track_footprint_sketch.name = 'Track Unit Footprint'
+            lines = track_footprint_sketch.sketchCurves.sketchLines
+            points = track_footprint_sketch.sketchPoints
+            origin_point = track_footprint_sketch.originPoint
+            constraints = track_footprint_sketch.geometricConstraints
+            dimensions = track_footprint_sketch.sketchDimensions
+
+            rectangle_point = adsk.core.Point3D.create(-1*diameter/2, diameter/2, 0)
+            rec_lines = lines.addCenterPointRectangle(origin_point.geometry.copy(), rectangle_point)
+            if not is_fast_build:
+                for i in range(rec_lines.count):
+                    rec_line = rec_lines.item(i)
+                    if i%2 == 0:
+                        constraints.addHorizontal(rec_line)
+                    else:
+                        constraints.addVertical(rec_line)
+                top_rec_line = rec_lines.item(0)
+                right_rec_line = rec_lines.item(1)
+                constraints.addEqual(top_rec_line, right_rec_line)
+                textPoint = top_rec_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0, 0.1, 0))
+                dimension = dimensions.addDistanceDimension(top_rec_line.startSketchPoint, top_rec_line.endSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, textPoint)
+                dimension.parameter.expression = f'{diameter_text}'
+                textPoint = top_rec_line.endSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(-0.2, 0.2, 0))
+                dimension = dimensions.addDistanceDimension(top_rec_line.endSketchPoint, origin_point, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
+                dimension.parameter.expression = f'{diameter_text} / 2'
+                textPoint = top_rec_line.endSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.2, -0.2, 0))
+                dimension = dimensions.addDistanceDimension(top_rec_line.endSketchPoint, origin_point, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
+                dimension.parameter.expression = f'{diameter_text} / 2'
+
+            prof = track_footprint_sketch.profiles.item(0)
+            extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.JoinFeatureOperation)
+            extrude_offset_text = f'-1 * ({num_x_cells_text} * {num_y_cells_text} * {super_z_drop_text} + {diameter_text} / 2 + 10 mm)'
+            start_offset = adsk.core.ValueInput.createByString(extrude_offset_text)
+            extrude_input.startExtent = adsk.fusion.OffsetStartDefinition.create(start_offset)
+            # Extract the extrude target face by finding the face created by the bottom line of the straight track sketch
+            # Could also extrude to the body instead of the face, which would be much simpler to implement. That didn't occur to me until after writing this code.
+            # extrude_target_face = bent_track_extrude.sideFaces.item(1) # This method does not reliably extract the correct face
+            # The bottom face slopes down along +X like the ball path, so it is the lowest face facing (-slope, 0, -1)
+            extrude_target_face = face_index.FaceIndex(straight_track_extrude.sideFaces).outermost_face((-1*slope, 0, -1))
+            # futil.log(f'final face area: {extrude_target_face.area}')
+            extrude_input.setOneSideExtent(
+                adsk.fusion.ToEntityExtentDefinition.create(extrude_target_face, False),  # False = don't chain faces
+                adsk.fusion.ExtentDirections.PositiveExtentDirection
+            )
+            extrudes.add(extrude_input)
+
+            track_PXPX_body.isVisible = False # hide the body so that it isn't cut by later features
+
+
+            # Bent track input path sketch
+            bent_track_input_path_sketch = sketches.add(yzPlane) # if you want a point to be at (a, b), you must input (-b, -a)
+            bent_track_input_path_sketch.name = 'Bent Track Input'
+            lines = bent_track_input_path_sketch.sketchCurves.sketchLines
+            points = bent_track_input_path_sketch.sketchPoints
+            origin_point = bent_track_input_path_sketch.originPoint
+            constraints = bent_track_input_path_sketch.geometricConstraints
+            dimensions = bent_track_input_path_sketch.sketchDimensions
+
+            if is_fast_build:
+                input_path_line = add_line(lines, *bent_track_input_points['input_path'])
+                ref_x, ref_y = bent_track_input_points['extrude_ref_point']
+                extrude_ref_point = points.add(adsk.core.Point3D.create(ref_x, ref_y, 0))
+            else:
+                start_point = origin_point
+                end_point = adsk.core.Point3D.create(-1, -2, 0)
+                input_path_line = lines.addByTwoPoints(start_point, end_point)
+
+                # Add dimensions to the input path line
+                textPoint = input_path_line.endSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.1,-0.1,0))
+                input_path_line_v_dim = dimensions.addDistanceDimension(input_path_line.endSketchPoint, input_path_line.startSketchPoint, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
+                input_path_line_v_dim.parameter.expression = f'{slope_text} * ( {diameter_text} / 2 + 5 mm )'
+                textPoint = input_path_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(-0.25,0,0))
+                input_path_line_h_dim = dimensions.addDistanceDimension(input_path_line.endSketchPoint, input_path_line.startSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
+                input_path_line_h_dim.parameter.expression = f'{diameter_text} / 2 + 5 mm'
+
+                # Create and dimension the extrude reference point
+                extrude_ref_point = points.add(adsk.core.Point3D.create(1, -1, 0))
+                textPoint = input_path_line.startSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.1, -0.3, 0))
+                extrude_ref_point_h_dim = dimensions.addDistanceDimension(extrude_ref_point, input_path_line.startSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
+                extrude_ref_point_h_dim.parameter.expression = f'{diameter_text} / 2'
+                textPoint = extrude_ref_point.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(-0.2, 0.2, 0))
+                extrude_ref_point_dist_dim = dimensions.addOffsetDimension(input_path_line, extrude_ref_point, textPoint)
+                extrude_ref_point_dist_dim.parameter.expression = f'{diameter_text} / 4'
+
+            # Bent track output path sketch
+            bent_track_output_path_sketch = sketches.add(xzPlane) # if you want a point to be at (a, b), you must input (a, -b)
+            bent_track_output_path_sketch.name = 'Bent Track Output'
+            lines = bent_track_output_path_sketch.sketchCurves.sketchLines
+            points = bent_track_output_path_sketch.sketchPoints
+            origin_point = bent_track_output_path_sketch.originPoint
+            constraints = bent_track_output_path_sketch.geometricConstraints
+            dimensions = bent_track_output_path_sketch.sketchDimensions
+
+            if is_fast_build:
+                bent_track_output_path_sketch.isComputeDeferred = True
+                rectangle_corner_1, rectangle_corner_2 = bent_track_output_points['rectangle']
+                rec_lines = lines.addTwoPointRectangle(adsk.core.Point3D.create(rectangle_corner_1[0], rectangle_corner_1[1], 0),
+                                                       adsk.core.Point3D.create(rectangle_corner_2[0], rectangle_corner_2[1], 0))
+                output_path_steep_line = add_line(lines, *bent_track_output_points['steep_path'])
+                output_end_point = bent_track_output_points['output_path'][1]
+                output_path_line = lines.addByTwoPoints(output_path_steep_line.endSketchPoint, adsk.core.Point3D.create(output_end_point[0], output_end_point[1], 0))
+                trimming_line = add_line(lines, *bent_track_output_points['trimming_line'])
+                trimming_line.isConstruction = True
+                bent_track_output_path_sketch.isComputeDeferred = False
             else:
-                constraints.addVertical(rec_line)
-            # start_point = rec_line.startSketchPoint.geometry.getData()
-            # end_point = rec_line.endSketchPoint.geometry.getData()
-            # futil.log(f'rectangle line {i} starts at {start_point} and ends at {end_point}')
-        top_rec_line = rec_lines.item(0)
-        constraints.addMidPoint(projected_extr_ref_point, top_rec_line)
-
-        # Create output path lines
-        start_point = origin_point
-        end_point = adsk.core.Point3D.create(1, 1, 0)
-        output_path_steep_line = lines.addByTwoPoints(start_point, end_point)
-        textPoint = output_path_steep_line.startSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.2,-0.1,0))
-        output_path_steep_line_h_dim = dimensions.addDistanceDimension(output_path_steep_line.startSketchPoint, output_path_steep_line.endSketchPoint, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
-        output_path_steep_line_h_dim.parameter.expression = f'{ball_diameter_text} / 4'
-        textPoint = output_path_steep_line.endSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.1,-0.1,0))
-        output_path_steep_line_v_dim = dimensions.addDistanceDimension(output_path_steep_line.startSketchPoint, output_path_steep_line.endSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
-        output_path_steep_line_v_dim.parameter.expression = f'{super_slope} * {ball_diameter_text} / 4'
-
-        start_point = output_path_steep_line.endSketchPoint
-        end_point = start_point.geometry.copy()
-        end_point.translateBy(adsk.core.Vector3D.create(1, 1, 0))
-        output_path_line = lines.addByTwoPoints(start_point, end_point)
-        textPoint = output_path_line.startSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.2,-0.1,0))
-        output_path_line_h_dim = dimensions.addDistanceDimension(output_path_line.startSketchPoint, output_path_line.endSketchPoint, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
-        output_path_line_h_dim.parameter.expression = f'{ball_diameter_text} / 2'
-        textPoint = output_path_line.endSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.1,-0.1,0))
-        output_path_line_v_dim = dimensions.addDistanceDimension(output_path_line.startSketchPoint, output_path_line.endSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
-        output_path_line_v_dim.parameter.expression = f'{slope_text} * ( {ball_diameter_text} / 2 )'
-
-        # Add the main dimensions
-        bottom_rec_line = rec_lines.item(2)
-        textPoint = bottom_rec_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0, 0.1, 0))
-        dimension = dimensions.addDistanceDimension(bottom_rec_line.startSketchPoint, bottom_rec_line.endSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, textPoint)
-        dimension.parameter.expression = f'{diameter_text}'
-        textPoint = bottom_rec_line.startSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.1,-0.1,0))
-        dimension = dimensions.addOffsetDimension(output_path_line, bottom_rec_line.startSketchPoint, textPoint)
-        dimension.parameter.expression = f'{diameter_text} / 2 + 2.5 mm'
+                # Project a sketch point from sourceSketch into targetSketch
+                projectedEntities = bent_track_output_path_sketch.project2([extrude_ref_point], True)
+                if len(projectedEntities) > 0:
+                    projected_extr_ref_point = projectedEntities[0]
         
-        # Add construction line for trimming later
-        start_point = projected_extr_ref_point
-        end_point = adsk.core.Point3D.create(1, 1, 0)
-        trimming_line = lines.addByTwoPoints(start_point, end_point)
-        trimming_line.isConstruction = True
-        right_rec_line = rec_lines.item(1)
-        constraints.addCoincident(trimming_line.endSketchPoint, right_rec_line)
-        textPoint = trimming_line.endSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.1, -0.1, 0))
-        dimension = dimensions.addOffsetDimension(output_path_line, trimming_line.endSketchPoint, textPoint)
-        dimension.parameter.expression = f'{diameter_text} / 4'
-
-        # Extrude sketch profile
-        prof = bent_track_output_path_sketch.profiles.item(0)
-        extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        extrude_distance = adsk.core.ValueInput.createByString(diameter_text)
-        extrude_input.setSymmetricExtent(extrude_distance, True)
-        bent_track_extrude = extrudes.add(extrude_input)
-        track_PYPX_body = bent_track_extrude.bodies.item(0)
-        track_PYPX_body.name = "Track +Y+X"
-
-        # Cut ball paths using pipe features
-        path = adsk.fusion.Path.create(input_path_line, adsk.fusion.ChainedCurveOptions.noChainedCurves)
-        pipe_input = pipes.createInput(path, adsk.fusion.FeatureOperations.CutFeatureOperation)
-        pipe_input.sectionSize = adsk.core.ValueInput.createByReal(diameter)
-        pipe = pipes.add(pipe_input)
-        pipe.sectionSize.expression = diameter_text
-
-        path = adsk.fusion.Path.create(output_path_steep_line, adsk.fusion.ChainedCurveOptions.noChainedCurves)
-        pipe_input = pipes.createInput(path, adsk.fusion.FeatureOperations.CutFeatureOperation)
-        pipe_input.sectionSize = adsk.core.ValueInput.createByReal(diameter)
-        pipe = pipes.add(pipe_input)
-        pipe.sectionSize.expression = diameter_text
-
-        path = adsk.fusion.Path.create(output_path_line, adsk.fusion.ChainedCurveOptions.noChainedCurves)
-        pipe_input = pipes.createInput(path, adsk.fusion.FeatureOperations.CutFeatureOperation)
-        pipe_input.sectionSize = adsk.core.ValueInput.createByReal(diameter)
-        pipe = pipes.add(pipe_input)
-        pipe.sectionSize.expression = diameter_text
-
-        # Cut the track with a sphere
-        sphere_sketch = sketches.add(xyPlane)
-        sphere_sketch.name = 'Bent Track Sphere'
-        arcs = sphere_sketch.sketchCurves.sketchArcs
-        lines = sphere_sketch.sketchCurves.sketchLines
-        origin_point = sphere_sketch.originPoint
-        constraints = sphere_sketch.geometricConstraints
-        dimensions = sphere_sketch.sketchDimensions
+                rec_lines = lines.addTwoPointRectangle(adsk.core.Point3D.create(-1*diameter/2, 0.1, 0), adsk.core.Point3D.create(diameter/2, 0.5, 0))
+                # rectangle lines seem to be listed clockwise starting with the top line
+                for i in range(rec_lines.count):
+                    rec_line = rec_lines.item(i)
+                    if i%2 == 0:
+                        constraints.addHorizontal(rec_line)
+                    else:
+                        constraints.addVertical(rec_line)
+                    # start_point = rec_line.startSketchPoint.geometry.getData()
+                    # end_point = rec_line.endSketchPoint.geometry.getData()
+                    # futil.log(f'rectangle line {i} starts at {start_point} and ends at {end_point}')
+                top_rec_line = rec_lines.item(0)
+                constraints.addMidPoint(projected_extr_ref_point, top_rec_line)
+
+                # Create output path lines
+                start_point = origin_point
+                end_point = adsk.core.Point3D.create(1, 1, 0)
+                output_path_steep_line = lines.addByTwoPoints(start_point, end_point)
+                textPoint = output_path_steep_line.startSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.2,-0.1,0))
+                output_path_steep_line_h_dim = dimensions.addDistanceDimension(output_path_steep_line.startSketchPoint, output_path_steep_line.endSketchPoint, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
+                output_path_steep_line_h_dim.parameter.expression = f'{ball_diameter_text} / 4'
+                textPoint = output_path_steep_line.endSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.1,-0.1,0))
+                output_path_steep_line_v_dim = dimensions.addDistanceDimension(output_path_steep_line.startSketchPoint, output_path_steep_line.endSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
+                output_path_steep_line_v_dim.parameter.expression = f'{super_slope} * {ball_diameter_text} / 4'
+
+                start_point = output_path_steep_line.endSketchPoint
+                end_point = start_point.geometry.copy()
+                end_point.translateBy(adsk.core.Vector3D.create(1, 1, 0))
+                output_path_line = lines.addByTwoPoints(start_point, end_point)
+                textPoint = output_path_line.startSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.2,-0.1,0))
+                output_path_line_h_dim = dimensions.addDistanceDimension(output_path_line.startSketchPoint, output_path_line.endSketchPoint, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
+                output_path_line_h_dim.parameter.expression = f'{ball_diameter_text} / 2'
+                textPoint = output_path_line.endSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.1,-0.1,0))
+                output_path_line_v_dim = dimensions.addDistanceDimension(output_path_line.startSketchPoint, output_path_line.endSketchPoint, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
+                output_path_line_v_dim.parameter.expression = f'{slope_text} * ( {ball_diameter_text} / 2 )'
+
+                # Add the main dimensions
+                bottom_rec_line = rec_lines.item(2)
+                textPoint = bottom_rec_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0, 0.1, 0))
+                dimension = dimensions.addDistanceDimension(bottom_rec_line.startSketchPoint, bottom_rec_line.endSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, textPoint)
+                dimension.parameter.expression = f'{diameter_text}'
+                textPoint = bottom_rec_line.startSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.1,-0.1,0))
+                dimension = dimensions.addOffsetDimension(output_path_line, bottom_rec_line.startSketchPoint, textPoint)
+                dimension.parameter.expression = f'{diameter_text} / 2 + 2.5 mm'
         
-        center = origin_point
-        start_point = adsk.core.Point3D.create(0, diameter/2.0, 0)
-        end_point = adsk.core.Point3D.create(0, -1*diameter/2.0, 0)
-        diameter_line = lines.addByTwoPoints(start_point, end_point)
-        arc = arcs.addByCenterStartEnd(center, diameter_line.startSketchPoint, diameter_line.endSketchPoint)
-
-        textPoint = arc.centerSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.2,0.2,0))
-        dimension = dimensions.addDiameterDimension(arc, textPoint, True)
-        dimension.parameter.expression = diameter_text
-
-        circle_center = arc.centerSketchPoint
-        constraints.addCoincident(circle_center, origin_point)
-        constraints.addCoincident(circle_center, diameter_line)
-        constraints.addVertical(diameter_line)
-
-        prof = sphere_sketch.profiles.item(0)
-        revInput = revolves.createInput(prof, diameter_line, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
-        revInput.setAngleExtent(False, adsk.core.ValueInput.createByReal(math.pi * 2))
-        revolve = revolves.add(revInput)
-        sphere_body = revolve.bodies.item(0)
-
-        target_body = track_PYPX_body
-        tool_bodies = adsk.core.ObjectCollection.create()
-        tool_bodies.add(sphere_body)
-        combine_feature_input = combines.createInput(target_body, tool_bodies)
-        combine_feature_input.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
-        combine_feature_input.isKeepToolBodies = True
-        combine = combines.add(combine_feature_input)
-
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(sphere_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsPointToPoint(bent_track_input_path_sketch.originPoint, output_path_line.startSketchPoint)
-        moves.add(move_input)
+                # Add construction line for trimming later
+                start_point = projected_extr_ref_point
+                end_point = adsk.core.Point3D.create(1, 1, 0)
+                trimming_line = lines.addByTwoPoints(start_point, end_point)
+                trimming_line.isConstruction = True
+                right_rec_line = rec_lines.item(1)
+                constraints.addCoincident(trimming_line.endSketchPoint, right_rec_line)
+                textPoint = trimming_line.endSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.1, -0.1, 0))
+                dimension = dimensions.addOffsetDimension(output_path_line, trimming_line.endSketchPoint, textPoint)
+                dimension.parameter.expression = f'{diameter_text} / 4'
+
+            # Extrude sketch profile
+            prof = bent_track_output_path_sketch.profiles.item(0)
+            extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+            extrude_distance = adsk.core.ValueInput.createByString(diameter_text)
+            extrude_input.setSymmetricExtent(extrude_distance, True)
+            bent_track_extrude = extrudes.add(extrude_input)
+            track_PYPX_body = bent_track_extrude.bodies.item(0)
+            track_PYPX_body.name = "Track +Y+X"
+
+            # Cut ball paths using pipe features
+            path = adsk.fusion.Path.create(input_path_line, adsk.fusion.ChainedCurveOptions.noChainedCurves)
+            pipe_input = pipes.createInput(path, adsk.fusion.FeatureOperations.CutFeatureOperation)
+            pipe_input.sectionSize = adsk.core.ValueInput.createByReal(diameter)
+            pipe = pipes.add(pipe_input)
+            pipe.sectionSize.expression = diameter_text
+
+            path = adsk.fusion.Path.create(output_path_steep_line, adsk.fusion.ChainedCurveOptions.noChainedCurves)
+            pipe_input = pipes.createInput(path, adsk.fusion.FeatureOperations.CutFeatureOperation)
+            pipe_input.sectionSize = adsk.core.ValueInput.createByReal(diameter)
+            pipe = pipes.add(pipe_input)
+            pipe.sectionSize.expression = diameter_text
+
+            path = adsk.fusion.Path.create(output_path_line, adsk.fusion.ChainedCurveOptions.noChainedCurves)
+            pipe_input = pipes.createInput(path, adsk.fusion.FeatureOperations.CutFeatureOperation)
+            pipe_input.sectionSize = adsk.core.ValueInput.createByReal(diameter)
+            pipe = pipes.add(pipe_input)
+            pipe.sectionSize.expression = diameter_text
+
+            # Cut the track with a sphere
+            sphere_sketch = sketches.add(xyPlane)
+            sphere_sketch.name = 'Bent Track Sphere'
+            arcs = sphere_sketch.sketchCurves.sketchArcs
+            lines = sphere_sketch.sketchCurves.sketchLines
+            origin_point = sphere_sketch.originPoint
+            constraints = sphere_sketch.geometricConstraints
+            dimensions = sphere_sketch.sketchDimensions
+        
+            center = origin_point
+            start_point = adsk.core.Point3D.create(0, diameter/2.0, 0)
+            end_point = adsk.core.Point3D.create(0, -1*diameter/2.0, 0)
+            diameter_line = lines.addByTwoPoints(start_point, end_point)
+            arc = arcs.addByCenterStartEnd(center, diameter_line.startSketchPoint, diameter_line.endSketchPoint)
+
+            if not is_fast_build:
+                textPoint = arc.centerSketchPoint.geometry.copy()
+                textPoint.translateBy(adsk.core.Vector3D.create(0.2,0.2,0))
+                dimension = dimensions.addDiameterDimension(arc, textPoint, True)
+                dimension.parameter.expression = diameter_text
+
+                circle_center = arc.centerSketchPoint
+                constraints.addCoincident(circle_center, origin_point)
+                constraints.addCoincident(circle_center, diameter_line)
+                constraints.addVertical(diameter_line)
+
+            prof = sphere_sketch.profiles.item(0)
+            revInput = revolves.createInput(prof, diameter_line, adsk.fusion.FeatureOperations.NewBodyFeatureOperation)
+            revInput.setAngleExtent(False, adsk.core.ValueInput.createByReal(math.pi * 2))
+            revolve = revolves.add(revInput)
+            sphere_body = revolve.bodies.item(0)
+
+            target_body = track_PYPX_body
+            tool_bodies = adsk.core.ObjectCollection.create()
+            tool_bodies.add(sphere_body)
+            combine_feature_input = combines.createInput(target_body, tool_bodies)
+            combine_feature_input.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
+            combine_feature_input.isKeepToolBodies = True
+            combine = combines.add(combine_feature_input)
 
-        combine_feature_input = combines.createInput(target_body, tool_bodies)
-        combine_feature_input.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
-        combine_feature_input.isKeepToolBodies = False
-        combine = combines.add(combine_feature_input)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(sphere_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsPointToPoint(bent_track_input_path_sketch.originPoint, output_path_line.startSketchPoint)
+            moves.add(move_input)
 
-        # Bent track trim sketch
-        bent_track_trim_sketch = sketches.add(xzPlane) # if you want a point to be at (a, b), you must input (a, -b)
-        bent_track_trim_sketch.name = 'Bent Track Trim'
-        lines = bent_track_trim_sketch.sketchCurves.sketchLines
-        points = bent_track_trim_sketch.sketchPoints
-        origin_point = bent_track_trim_sketch.originPoint
-        constraints = bent_track_trim_sketch.geometricConstraints
-        dimensions = bent_track_trim_sketch.sketchDimensions
-
-        projectedEntities = bent_track_trim_sketch.project2([trimming_line], True)
-        projected_trimming_line = projectedEntities[0]
+            combine_feature_input = combines.createInput(target_body, tool_bodies)
+            combine_feature_input.operation = adsk.fusion.FeatureOperations.CutFeatureOperation
+            combine_feature_input.isKeepToolBodies = False
+            combine = combines.add(combine_feature_input)
+
+            # Bent track trim sketch
+            bent_track_trim_sketch = sketches.add(xzPlane) # if you want a point to be at (a, b), you must input (a, -b)
+            bent_track_trim_sketch.name = 'Bent Track Trim'
+            lines = bent_track_trim_sketch.sketchCurves.sketchLines
+            points = bent_track_trim_sketch.sketchPoints
+            origin_point = bent_track_trim_sketch.originPoint
+            constraints = bent_track_trim_sketch.geometricConstraints
+            dimensions = bent_track_trim_sketch.sketchDimensions
+
+            projectedEntities = bent_track_trim_sketch.project2([trimming_line], True)
+            projected_trimming_line = projectedEntities[0]
         
-        intermediate_point = adsk.core.Point3D.create(projected_trimming_line.endSketchPoint.geometry.x, projected_trimming_line.startSketchPoint.geometry.y, 0)
-        # points.add(intermediate_point)
-        # Must add coincident constraints or else the the horizontal and vertical lines won't stay attached to the projected line if it moves
-        # I also have to use a Point3D copy of the projected line endpoints
-        h_line = lines.addByTwoPoints(projected_trimming_line.startSketchPoint.geometry.copy(), intermediate_point)
-        v_line = lines.addByTwoPoints(h_line.endSketchPoint, projected_trimming_line.endSketchPoint.geometry.copy())
-        constraints.addHorizontal(h_line)
-        constraints.addVertical(v_line)
-        constraints.addCoincident(h_line.startSketchPoint, projected_trimming_line.startSketchPoint)
-        constraints.addCoincident(v_line.endSketchPoint, projected_trimming_line.endSketchPoint)
-
-        # Trim the bent track
-        prof = bent_track_trim_sketch.profiles.item(0)
-        extrude_distance = adsk.core.ValueInput.createByString(diameter_text)
-        extrude = extrudes.addSimple(prof, extrude_distance, adsk.fusion.FeatureOperations.CutFeatureOperation)
-
-        # Make the track tall so that it easily combines into a 3D printable solid later
-        prof = track_footprint_sketch.profiles.item(0)
-        extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.JoinFeatureOperation)
-        # extrude_distance_value_input = adsk.core.ValueInput.createByString(diameter_text)
-        # extrude_distance_extent = adsk.fusion.DistanceExtentDefinition.create(extrude_distance_value_input)
-        # straight_track_extrude = extrudes.add(extrude_input)
-        extrude_offset_text = f'-1 * ({num_x_cells_text} * {num_y_cells_text} * {super_z_drop} cm + {diameter_text} / 2 + 10 mm)'
-        start_offset = adsk.core.ValueInput.createByString(extrude_offset_text)
-        extrude_input.startExtent = adsk.fusion.OffsetStartDefinition.create(start_offset)
-        extent_definition = adsk.fusion.ToEntityExtentDefinition.create(track_PYPX_body, True)
-        extrude_input.setOneSideExtent(
-            extent_definition,
-            adsk.fusion.ExtentDirections.PositiveExtentDirection
-        )
-        extrudes.add(extrude_input)
-
-        track_PYPX_body.isVisible = False
-
-        # Create the base tracks
-        track_PYPY = copy_pastes.add(track_PXPX_body)
-        track_PYPY_body = track_PYPY.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_PYPY_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('90 deg'))
-        moves.add(move_input)
-        track_PYPY_body.name = 'Track +Y+Y'
-        track_PYPY_body.isVisible = False
-        track_NXNX = copy_pastes.add(track_PXPX_body)
-        track_NXNX_body = track_NXNX.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_NXNX_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('180 deg'))
-        moves.add(move_input)
-        track_NXNX_body.name = 'Track -X-X'
-        track_NXNX_body.isVisible = False
-        track_NYNY = copy_pastes.add(track_PXPX_body)
-        track_NYNY_body = track_NYNY.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_NYNY_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('270 deg'))
-        moves.add(move_input)
-        track_NYNY_body.name = 'Track -Y-Y'
-        track_NYNY_body.isVisible = False
-
-        track_NXPY = copy_pastes.add(track_PYPX_body)
-        track_NXPY_body = track_NXPY.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_NXPY_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('90 deg'))
-        moves.add(move_input)
-        track_NXPY_body.name = 'Track -X+Y'
-        track_NXPY_body.isVisible = False
-        track_NYNX = copy_pastes.add(track_PYPX_body)
-        track_NYNX_body = track_NYNX.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_NYNX_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('180 deg'))
-        moves.add(move_input)
-        track_NYNX_body.name = 'Track -Y-X'
-        track_NYNX_body.isVisible = False
-        track_PXNY = copy_pastes.add(track_PYPX_body)
-        track_PXNY_body = track_PXNY.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_PXNY_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('270 deg'))
-        moves.add(move_input)
-        track_PXNY_body.name = 'Track +X-Y'
-        track_PXNY_body.isVisible = False
-
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_PYPX_body)
-        mirrorInput = mirrors.createInput(object_collection, yzPlane)
-        track_PYNX = mirrors.add(mirrorInput)
-        track_PYNX_body = track_PYNX.bodies.item(0)
-        track_PYNX_body.name = 'Track +Y-X'
-        track_PYNX_body.isVisible = False
-
-        track_NXNY = copy_pastes.add(track_PYNX_body)
-        track_NXNY_body = track_NXNY.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_NXNY_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('90 deg'))
-        moves.add(move_input)
-        track_NXNY_body.name = 'Track -X-Y'
-        track_NXNY_body.isVisible = False
-        track_NYPX = copy_pastes.add(track_PYNX_body)
-        track_NYPX_body = track_NYPX.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_NYPX_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('180 deg'))
-        moves.add(move_input)
-        track_NYPX_body.name = 'Track -Y+X'
-        track_NYPX_body.isVisible = False
-        track_PXPY = copy_pastes.add(track_PYNX_body)
-        track_PXPY_body = track_PXPY.bodies.item(0)
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(track_PXPY_body)
-        move_input = moves.createInput2(object_collection)
-        move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('270 deg'))
-        moves.add(move_input)
-        track_PXPY_body.name = 'Track +X+Y'
-        track_PXPY_body.isVisible = False
+            intermediate_point = adsk.core.Point3D.create(projected_trimming_line.endSketchPoint.geometry.x, projected_trimming_line.startSketchPoint.geometry.y, 0)
+            # points.add(intermediate_point)
+            # Must add coincident constraints or else the the horizontal and vertical lines won't stay attached to the projected line if it moves
+            # I also have to use a Point3D copy of the projected line endpoints
+            h_line = lines.addByTwoPoints(projected_trimming_line.startSketchPoint.geometry.copy(), intermediate_point)
+            v_line = lines.addByTwoPoints(h_line.endSketchPoint, projected_trimming_line.endSketchPoint.geometry.copy())
+            if not is_fast_build:
+                constraints.addHorizontal(h_line)
+                constraints.addVertical(v_line)
+                constraints.addCoincident(h_line.startSketchPoint, projected_trimming_line.startSketchPoint)
+                constraints.addCoincident(v_line.endSketchPoint, projected_trimming_line.endSketchPoint)
+
+            # Trim the bent track
+            prof = bent_track_trim_sketch.profiles.item(0)
+            extrude_distance = adsk.core.ValueInput.createByString(diameter_text)
+            extrude = extrudes.addSimple(prof, extrude_distance, adsk.fusion.FeatureOperations.CutFeatureOperation)
+
+            # Make the track tall so that it easily combines into a 3D printable solid later
+            prof = track_footprint_sketch.profiles.item(0)
+            extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.JoinFeatureOperation)
+            # extrude_distance_value_input = adsk.core.ValueInput.createByString(diameter_text)
+            # extrude_distance_extent = adsk.fusion.DistanceExtentDefinition.create(extrude_distance_value_input)
+            # straight_track_extrude = extrudes.add(extrude_input)
+            extrude_offset_text = f'-1 * ({num_x_cells_text} * {num_y_cells_text} * {super_z_drop_text} + {diameter_text} / 2 + 10 mm)'
+            start_offset = adsk.core.ValueInput.createByString(extrude_offset_text)
+            extrude_input.startExtent = adsk.fusion.OffsetStartDefinition.create(start_offset)
+            extent_definition = adsk.fusion.ToEntityExtentDefinition.create(track_PYPX_body, True)
+            extrude_input.setOneSideExtent(
+                extent_definition,
+                adsk.fusion.ExtentDirections.PositiveExtentDirection
+            )
+            extrudes.add(extrude_input)
+
+            track_PYPX_body.isVisible = False
+
+            # Create the base tracks
+            track_PYPY = copy_pastes.add(track_PXPX_body)
+            track_PYPY_body = track_PYPY.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_PYPY_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('90 deg'))
+            moves.add(move_input)
+            track_PYPY_body.name = 'Track +Y+Y'
+            track_PYPY_body.isVisible = False
+            track_NXNX = copy_pastes.add(track_PXPX_body)
+            track_NXNX_body = track_NXNX.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_NXNX_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('180 deg'))
+            moves.add(move_input)
+            track_NXNX_body.name = 'Track -X-X'
+            track_NXNX_body.isVisible = False
+            track_NYNY = copy_pastes.add(track_PXPX_body)
+            track_NYNY_body = track_NYNY.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_NYNY_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('270 deg'))
+            moves.add(move_input)
+            track_NYNY_body.name = 'Track -Y-Y'
+            track_NYNY_body.isVisible = False
+
+            track_NXPY = copy_pastes.add(track_PYPX_body)
+            track_NXPY_body = track_NXPY.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_NXPY_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('90 deg'))
+            moves.add(move_input)
+            track_NXPY_body.name = 'Track -X+Y'
+            track_NXPY_body.isVisible = False
+            track_NYNX = copy_pastes.add(track_PYPX_body)
+            track_NYNX_body = track_NYNX.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_NYNX_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('180 deg'))
+            moves.add(move_input)
+            track_NYNX_body.name = 'Track -Y-X'
+            track_NYNX_body.isVisible = False
+            track_PXNY = copy_pastes.add(track_PYPX_body)
+            track_PXNY_body = track_PXNY.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_PXNY_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('270 deg'))
+            moves.add(move_input)
+            track_PXNY_body.name = 'Track +X-Y'
+            track_PXNY_body.isVisible = False
+
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_PYPX_body)
+            mirrorInput = mirrors.createInput(object_collection, yzPlane)
+            track_PYNX = mirrors.add(mirrorInput)
+            track_PYNX_body = track_PYNX.bodies.item(0)
+            track_PYNX_body.name = 'Track +Y-X'
+            track_PYNX_body.isVisible = False
+
+            track_NXNY = copy_pastes.add(track_PYNX_body)
+            track_NXNY_body = track_NXNY.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_NXNY_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('90 deg'))
+            moves.add(move_input)
+            track_NXNY_body.name = 'Track -X-Y'
+            track_NXNY_body.isVisible = False
+            track_NYPX = copy_pastes.add(track_PYNX_body)
+            track_NYPX_body = track_NYPX.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_NYPX_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('180 deg'))
+            moves.add(move_input)
+            track_NYPX_body.name = 'Track -Y+X'
+            track_NYPX_body.isVisible = False
+            track_PXPY = copy_pastes.add(track_PYNX_body)
+            track_PXPY_body = track_PXPY.bodies.item(0)
+            object_collection = adsk.core.ObjectCollection.create()
+            object_collection.add(track_PXPY_body)
+            move_input = moves.createInput2(object_collection)
+            move_input.defineAsRotate(zAxis, adsk.core.ValueInput.createByString('270 deg'))
+            moves.add(move_input)
+            track_PXPY_body.name = 'Track +X+Y'
+            track_PXPY_body.isVisible = False
+
+            base_track_bodies = [
+                track_PXPX_body, track_PYPY_body, track_NXNX_body, track_NYNY_body, 
+                track_PYPX_body, track_NXPY_body, track_NYNX_body, track_PXNY_body,
+                track_PYNX_body, track_NXNY_body, track_NYPX_body, track_PXPY_body
+            ]
+            if is_tile_reuse_allowed:
+                store_base_tiles(comp, base_track_bodies, base_tiles_key)
+                if tile_cache.is_enabled and not tile_cache.store(base_tiles_key, base_track_bodies):
+                    futil.log('the base tiles could not be stored in the tile cache')
+                # Place the stored tiles, like a later run would, so that the run doesn't depend on the features above
+                # and an edit can delete the run and keep the tiles
+                for body in base_track_bodies:
+                    removes.add(body)
+                base_track_bodies = find_base_tiles(des, base_tiles_key)
+
+        # The tile features get their own group when the tiles are stored, so that an edit keeps them
+        timeline_groups = des.timeline.timelineGroups
+        run_start_index = timeline_start_index
+        if is_tile_reuse_allowed and des.timeline.count > timeline_start_index:
+            timeline_group = timeline_groups.add(timeline_start_index, des.timeline.count - 1)
+            timeline_group.name = unique_group_name(timeline_groups, 'Marble Run Base Tiles')
+            run_start_index = des.timeline.count
+            find_base_tiles_component(des, base_tiles_key).attributes.add('MarbleRun', 'baseTilesGroup', timeline_group.name)
+
+        last_build_times['base tiles'] = time.perf_counter() - stage_start_time
+        stage_start_time = time.perf_counter()
 
         # Create a matrix that represents the track path
-        matrix = path_generator.generate_path(num_x_cells, num_y_cells)
+        last_path = self.last_path
+        if last_path:
+            last_mask = {tuple(cell) for cell in last_path['MaskedCells']}
+            path_generator.set_path(last_path['Width'], last_path['Depth'], [tuple(cell) for cell in last_path['Cells']], last_mask)
+        seed = random.randrange(2**31) # stored with the run
+        matrix = None # set by the edits of the last path below, otherwise a new path is generated
+        if edit_stages is not None and 'path' not in edit_stages:
+            # Only the layout of the edited run changed: keep its path
+            seed = self.edit_state['Seed']
+            engine_name = self.edit_state['Engine']
+            path_generator.set_path(num_x_cells, num_y_cells, run_state.decode_path(self.edit_state['Path']), masked_cells)
+            matrix = path_generator.matrix
+        elif last_path and (last_path['Width'], last_path['Depth']) != (num_x_cells, num_y_cells) and (
+                self.edit_state or max(abs(last_path['Width'] - num_x_cells), abs(last_path['Depth'] - num_y_cells)) <= max_resize_step):
+            # The size of the edited run changed, or the size of the last run was tuned: adapt its path instead of
+            # starting over
+            matrix = path_edit.resize_path(num_x_cells, num_y_cells, seed=seed, mask=masked_cells)
+            if matrix is not None:
+                engine_name = f'resize ({path_edit.last_resize_method})'
+                futil.log(f'path resized with {path_edit.last_resize_method}')
+        elif last_path and reroll_cells and last_mask == masked_cells:
+            # Keep the last path and only search the selected region again
+            engine_name = 're-roll'
+            changes = path_edit.reroll_region(reroll_cells, seed=seed)
+            if changes is None:
+                futil.log('the path can\'t be routed differently inside the re-roll region')
+            else:
+                retyped, lowered = changes
+                futil.log(f're-rolled region: {len(retyped)} cells with new tiles, {len(lowered)} cells at new heights')
+            matrix = path_generator.matrix
+        if matrix is None:
+            matrix = engines.generate_path(num_x_cells, num_y_cells, seed=seed, mask=masked_cells)
+            engine_name = engines.last_engine
+            futil.log(f'path generated with {engines.last_engine}')
         futil.log(f'matrix: {matrix}')
         # Create a matrix showing what type of track should be used
         type_matrix = path_generator.generate_type_matrix()
-        base_track_bodies = [
-            track_PXPX_body, track_PYPY_body, track_NXNX_body, track_NYNY_body, 
-            track_PYPX_body, track_NXPY_body, track_NYNX_body, track_PXNY_body,
-            track_PYNX_body, track_NXNY_body, track_NYPX_body, track_PXPY_body
-        ]
 
         # Copy and move the base tracks to the positions specified in the matrix
 
@@ -659,7 +898,10 @@ class MarbleRunLogic():
         z_pos = 0.0
         next_z_pos = 0.0
         # z_drop = diameter*slope # float that represents how much the height drops after each cell
-        copied_track_bodies = []
+        placements = [] # (track type, x, y, z) of every cell in the order of the path
+        placement_expressions = [] # (x, y, z) of every cell as expressions of the inputs
+        num_straight_cells = 0 # straight and bent cells before the current one
+        num_bent_cells = 0
         is_next_cell_found = True
         while is_next_cell_found:
             cell_val = matrix[row][col]
@@ -668,24 +910,15 @@ class MarbleRunLogic():
             x_pos = col * diameter
             y_pos = -1 * row * diameter
             z_pos = next_z_pos
+            placements.append((cell_type, x_pos, y_pos, z_pos))
+            placement_expressions.append((f'{col} * {diameter_text}', f'-1 * {row} * {diameter_text}',
+                                          f'-1 * ({num_straight_cells} * {straight_z_drop_text} + {num_bent_cells} * {super_z_drop_text})'))
             if cell_type in [0, 1, 2, 3]:
                 next_z_pos = z_pos - diameter*slope
+                num_straight_cells += 1
             else:
                 next_z_pos = z_pos - super_z_drop
-            cell_body = base_track_bodies[cell_type]
-            track_copy = copy_pastes.add(cell_body)
-            track_copy_body = track_copy.bodies.item(0)
-
-            object_collection = adsk.core.ObjectCollection.create()
-            object_collection.add(track_copy_body)
-            move_input = moves.createInput2(object_collection)
-            x_delta = adsk.core.ValueInput.createByReal(x_pos)
-            y_delta = adsk.core.ValueInput.createByReal(y_pos)
-            z_delta = adsk.core.ValueInput.createByReal(z_pos)
-            move_input.defineAsTranslateXYZ(x_delta, y_delta, z_delta, True)
-            moves.add(move_input)
-
-            copied_track_bodies.append(track_copy_body)
+                num_bent_cells += 1
 
             is_next_cell_found = False
             for next_row, next_col in [(row-1, col), (row+1, col), (row, col-1), (row, col+1)]:
@@ -695,7 +928,42 @@ class MarbleRunLogic():
                         col = next_col
                         is_next_cell_found = True
         final_z_pos = next_z_pos
-
+        run_layout = {'Width': num_x_cells, 'Depth': num_y_cells, 'WidthText': num_x_cells_text,
+                      'DepthText': num_y_cells_text, 'MaskedCells': sorted(masked_cells), 'CellSize': diameter,
+                      'CellSizeText': diameter_text, 'SuperZDrop': super_z_drop, 'FinalZ': final_z_pos,
+                      'SuperZDropText': super_z_drop_text,
+                      'FinalZText': f'-1 * ({num_straight_cells} * {straight_z_drop_text} + {num_bent_cells} * {super_z_drop_text})',
+                      'FastBuild': is_fast_build}
+        last_build_times['path'] = time.perf_counter() - stage_start_time
+        stage_start_time = time.perf_counter()
+
+        if build_mode == 'By Tile Type':
+            # One base feature per track type instead of a copy and a move per cell
+            copied_track_bodies = place_tiles_by_type(comp, base_track_bodies, placements)
+        elif build_mode == 'Instanced':
+            instanced_tiles_component = place_tile_instances(comp, base_track_bodies, placements)
+        elif build_mode == 'Direct':
+            # Place, join and flatten the tiles in memory and add the result as a single base feature
+            combine_body = build_run_direct(comp, base_track_bodies, placements, run_layout, union_strategy)
+        else:
+            # The moves are expressions of the inputs: when a user parameter that the inputs refer to changes, Fusion
+            # only recomputes the moves and the tiles move with their new size, without a new path or a rebuild
+            copied_track_bodies = []
+            for (cell_type, _, _, _), (x_text, y_text, z_text) in zip(placements, placement_expressions):
+                cell_body = base_track_bodies[cell_type]
+                track_copy = copy_pastes.add(cell_body)
+                track_copy_body = track_copy.bodies.item(0)
+
+                object_collection = adsk.core.ObjectCollection.create()
+                object_collection.add(track_copy_body)
+                move_input = moves.createInput2(object_collection)
+                x_delta = adsk.core.ValueInput.createByString(x_text)
+                y_delta = adsk.core.ValueInput.createByString(y_text)
+                z_delta = adsk.core.ValueInput.createByString(z_text)
+                move_input.defineAsTranslateXYZ(x_delta, y_delta, z_delta, True)
+                moves.add(move_input)
+
+                copied_track_bodies.append(track_copy_body)
 
         # for row in range(len(matrix)):
         #     y_pos = -1 * row * diameter
@@ -725,107 +993,46 @@ class MarbleRunLogic():
         #         copied_track_bodies.append(track_copy_body)
         # final_z_pos = next_z_pos
                 
-        # Combine all the track segments together
-        target_body = copied_track_bodies[0]
-        tool_bodies = adsk.core.ObjectCollection.create()
-        for i in range(1, len(copied_track_bodies)):
-            tool_body = copied_track_bodies[i]
-            tool_bodies.add(tool_body)
-        combine_feature_input = combines.createInput(target_body, tool_bodies)
-        combine_feature_input.operation = adsk.fusion.FeatureOperations.JoinFeatureOperation
-        combine_feature_input.isKeepToolBodies = False
-        combine = combines.add(combine_feature_input)
-        combine_body = combine.bodies.item(0)
-        combine_body.name = 'Marble Run'
-
-        # Remove the base track bodies to declutter the body folder
-        for body in base_track_bodies:
-            removes.add(body)
-
-        # Trim the track so that it has a flat base
-        track_base_trimmer_sketch = sketches.add(xyPlane)
-        track_base_trimmer_sketch.name = 'Base Flattener'
-        lines = track_base_trimmer_sketch.sketchCurves.sketchLines
-        points = track_base_trimmer_sketch.sketchPoints
-        origin_point = track_base_trimmer_sketch.originPoint
-        constraints = track_base_trimmer_sketch.geometricConstraints
-        dimensions = track_base_trimmer_sketch.sketchDimensions
-
-        rectangle_point_1 = adsk.core.Point3D.create(-1*diameter/2, diameter/2, 0)
-        rectangle_point_2 = adsk.core.Point3D.create(num_x_cells*diameter-1*diameter/2, -1*num_y_cells*diameter+diameter/2, 0)
-        rec_lines = lines.addTwoPointRectangle(rectangle_point_1, rectangle_point_2)
-        for i in range(rec_lines.count):
-            rec_line = rec_lines.item(i)
-            if i%2 == 0:
-                constraints.addHorizontal(rec_line)
+        last_build_times['placement'] = time.perf_counter() - stage_start_time
+        stage_start_time = time.perf_counter()
+
+        if build_mode in ['Per Cell', 'By Tile Type']:
+            # The cells of a row have the same y position
+            combine_body = join_bodies(comp, copied_track_bodies, union_strategy, [y_pos for _, _, y_pos, _ in placements])
+        last_build_times['join'] = time.perf_counter() - stage_start_time
+        stage_start_time = time.perf_counter()
+        if build_mode != 'Instanced':
+            combine_body.name = 'Marble Run'
+
+        # Remove the base track bodies to declutter the body folder. Stored base tiles stay hidden in their component
+        if is_base_tiles_built and not is_tile_reuse_allowed:
+            for body in base_track_bodies:
+                removes.add(body)
+
+        # In the Instanced mode the flat base and the shell need a single body, they are made when the run is merged
+        if build_mode == 'Direct':
+            # The base was already flattened in memory
+            shell_run(comp, combine_body)
+        elif build_mode != 'Instanced':
+            flatten_and_shell(comp, combine_body, run_layout)
+
+        # Put the timeline features of this run into a group
+        timeline_end_index = des.timeline.count - 1
+        timeline_group = timeline_groups.add(run_start_index, timeline_end_index)
+        timeline_group.name = unique_group_name(timeline_groups, 'Marble Run')
+        if self.edit_state:
+            # The edited run is only deleted once the new one is built, so a failed build leaves it as it was. The
+            # stored base tiles aren't part of the run's group, so they are kept for the new run if their key didn't change
+            if delete_run(des, self.edit_state):
+                timeline_group.name = self.edit_state['Group']
             else:
-                constraints.addVertical(rec_line)
-        top_rec_line = rec_lines.item(0)
-        left_rec_line = rec_lines.item(3)
-        textPoint = top_rec_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0, 0.1, 0))
-        dimension = dimensions.addDistanceDimension(top_rec_line.startSketchPoint, top_rec_line.endSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, textPoint)
-        dimension.parameter.expression = f'{num_x_cells} * {diameter_text}'
-        textPoint = left_rec_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(-0.1, 0, 0))
-        dimension = dimensions.addDistanceDimension(left_rec_line.startSketchPoint, left_rec_line.endSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, textPoint)
-        dimension.parameter.expression = f'{num_y_cells} * {diameter_text}'
-        textPoint = top_rec_line.startSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(0.2, 0.2, 0))
-        dimension = dimensions.addDistanceDimension(top_rec_line.startSketchPoint, origin_point, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
-        dimension.parameter.expression = f'{diameter_text} / 2'
-        textPoint = top_rec_line.startSketchPoint.geometry.copy()
-        textPoint.translateBy(adsk.core.Vector3D.create(-0.2, -0.2, 0))
-        dimension = dimensions.addDistanceDimension(top_rec_line.startSketchPoint, origin_point, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
-        dimension.parameter.expression = f'{diameter_text} / 2'
-
-        prof = track_base_trimmer_sketch.profiles.item(0)
-        extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.CutFeatureOperation)
-        # extrude_distance_value_input = adsk.core.ValueInput.createByString(diameter_text)
-        # extrude_distance_extent = adsk.fusion.DistanceExtentDefinition.create(extrude_distance_value_input)
-        # straight_track_extrude = extrudes.add(extrude_input)
-        # extrude_offset_text = f'-1 * ({final_z_pos} + {diameter_text} / 2 + 10 mm)'
-        extrude_offset_text = f'{final_z_pos} cm - ({diameter_text} / 2 + 10 mm)'
-        start_offset = adsk.core.ValueInput.createByString(extrude_offset_text)
-        extrude_input.startExtent = adsk.fusion.OffsetStartDefinition.create(start_offset)
-        extrude_distance = adsk.core.ValueInput.createByString(f'-1 * ({num_x_cells_text} * {num_y_cells_text} * {super_z_drop} cm + {diameter_text} / 2 + 10 mm)')
-        extrude_input.setOneSideExtent(
-            adsk.fusion.DistanceExtentDefinition.create(extrude_distance),  # False = don't chain faces
-            adsk.fusion.ExtentDirections.PositiveExtentDirection
-        )
-        flat_base_extrude = extrudes.add(extrude_input)
-
-        # Shell the body to reduce material during 3D printing
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(combine_body)
-        shell_input = shells.createInput(object_collection)
-        shell_input.insideThickness = adsk.core.ValueInput.createByReal(0.3)
-        # Extract the face to remove. In the future, try to figure out if you can extract the face from one of the previous features
-        # face_to_remove = flat_base_extrude.endFaces.item(0) # this doesn't work. Seems like endFaces might be empty
-        faces = combine_body.faces
-        face_to_remove = None
-        negative_Z = adsk.core.Vector3D.create(0, 0, -1)
-        for face in faces:
-            (success, normal) = face.evaluator.getNormalAtParameter(adsk.core.Point2D.create(0.5, 0.5))
-            if success:
-                dot_product = normal.dotProduct(negative_Z)
-                if dot_product > (1.0 - 1e-6):
-                    face_to_remove = face
-            if face_to_remove:
-                break
-        object_collection = adsk.core.ObjectCollection.create()
-        object_collection.add(face_to_remove)
-        shell_input.inputEntities = object_collection
-        shell = shells.add(shell_input)
-
-        # Put the timeline features into a group
-        timeline_groups = des.timeline.timelineGroups
-        first_timeline_feature = straight_track_sketch
-        last_timeline_feature = shell
-        timeline_start_index = first_timeline_feature.timelineObject.index
-        timeline_end_index = last_timeline_feature.timelineObject.index
-        timeline_group = timeline_groups.add(timeline_start_index, timeline_end_index)
-        timeline_group.name = 'Marble Run'
+                futil.log('the timeline group of the edited run wasn\'t found, the new run is added next to it')
+        if build_mode == 'Instanced':
+            # Tag the tiles with the run's group, so that Merge Instanced Run finds the tiles of this run
+            instanced_tiles_component.attributes.add('MarbleRun', 'instancedTiles', timeline_group.name)
+            run_layout['Group'] = timeline_group.name
+        last_build_times['finish'] = time.perf_counter() - stage_start_time
+        futil.log('build times: ' + ', '.join(f'{stage} {seconds:.2f} s' for stage, seconds in last_build_times.items()))
 
 
 
@@ -912,7 +1119,14 @@ class MarbleRunLogic():
 
         
         # Save the current values as attributes.
-        settings = {'Diameter': str(self.diameterValueInput.value)}
+        settings = {'Diameter': str(self.diameterValueInput.value),
+                    'BuildMode': build_mode,
+                    'FastBuild': is_fast_build,
+                    'UnionStrategy': union_strategy,
+                    'Path': {'Width': num_x_cells, 'Depth': num_y_cells, 'MaskedCells': sorted(masked_cells),
+                             'Cells': path_generator.path_cells()}}
+        if build_mode == 'Instanced':
+            settings['InstancedRun'] = run_layout
         # settings = {'Diameter': str(self.diameterValueInput.value),
         #             'IgnoreArcCenters': self.ignoreArcCentersValueInput.value}
 
@@ -920,12 +1134,561 @@ class MarbleRunLogic():
 
         attribs = des.attributes
         attribs.add('MarbleRun', 'settings', jsonSettings)
+        tiles_key = base_tiles_key if is_tile_reuse_allowed else None
+        state = run_state.make_state(run_input_values, seed, engine_name, path_generator.path_cells(), timeline_group.name, tiles_key)
+        if self.edit_state and self.edit_state['Group'] != timeline_group.name:
+            # The group of the edited run wasn't found, its state is replaced by the one of the new run
+            delete_run_state(des, self.edit_state)
+        store_run_state(des, state)
+        # Tag the result, so that selecting it picks this run in Edit Marble Run
+        if build_mode != 'Instanced':
+            combine_body.attributes.add('MarbleRun', 'runGroup', timeline_group.name)
+
+        # Each edit with new tile values would otherwise leave the tiles of the edited run behind
+        if tiles_key:
+            add_base_tiles_run(des, tiles_key, timeline_group.name)
+        if self.edit_state and self.edit_state.get('Tiles'):
+            if remove_base_tiles_run(des, self.edit_state['Tiles'], self.edit_state['Group']):
+                futil.log('deleted the base tiles of the edited run, no other run uses them')
+
+
+def input_values(inputs: adsk.core.CommandInputs):
+    """Return the values of the dialog inputs that are stored with a run, see run_state."""
+    return {
+        'num_x_cells': inputs.itemById('num_x_cells').valueOne,
+        'num_y_cells': inputs.itemById('num_y_cells').valueOne,
+        'masked_cells': inputs.itemById('masked_cells').value,
+        'diameter': inputs.itemById('diameter').expression,
+        'clearance': inputs.itemById('clearance').expression,
+        'slope': inputs.itemById('slope').expression,
+        'build_mode': inputs.itemById('build_mode').selectedItem.name,
+        'fast_build': inputs.itemById('fast_build').value,
+        'union_strategy': inputs.itemById('union_strategy').selectedItem.name,
+    }
+
+
+def set_input_values(inputs: adsk.core.CommandInputs, values):
+    """Set the dialog inputs to values returned by input_values."""
+    for id, value in values.items():
+        command_input = inputs.itemById(id)
+        if command_input is None:
+            continue
+        if id in ['num_x_cells', 'num_y_cells']:
+            command_input.valueOne = value
+        elif id in ['diameter', 'clearance', 'slope']:
+            command_input.expression = value
+        elif id in ['build_mode', 'union_strategy']:
+            for list_item in command_input.listItems:
+                list_item.isSelected = list_item.name == value
+        else:
+            command_input.value = value
+
+
+def state_path(state):
+    """Return the path of a stored run state in the form of the 'Path' of the settings."""
+    values = state['Inputs']
+    return {'Width': values['num_x_cells'], 'Depth': values['num_y_cells'],
+            'MaskedCells': sorted(path_generator.parse_masked_cells(values['masked_cells'])),
+            'Cells': run_state.decode_path(state['Path'])}
+
+
+def store_run_state(design: adsk.fusion.Design, state):
+    """Store the state of a run under the name of its timeline group."""
+    design.attributes.add(run_state.attribute_group, state['Group'], run_state.dumps(state))
+
+
+def delete_run_state(design: adsk.fusion.Design, state):
+    attribute = design.attributes.itemByName(run_state.attribute_group, state['Group'])
+    if attribute is not None:
+        attribute.deleteMe()
+
+
+def load_run_states(design: adsk.fusion.Design):
+    """Return the stored states of the runs whose timeline group is still in the design by group name, in timeline order.
+
+    Designs from before the states were stored per run have the state of their last run in the 'run' attribute.
+    """
+    legacy_state = None
+    legacy_attribute = design.attributes.itemByName('MarbleRun', 'run')
+    if legacy_attribute is not None:
+        legacy_state = run_state.loads(legacy_attribute.value)
+    states = {}
+    for timeline_group in design.timeline.timelineGroups:
+        attribute = design.attributes.itemByName(run_state.attribute_group, timeline_group.name)
+        state = run_state.loads(attribute.value) if attribute is not None else None
+        if state is None and legacy_state and legacy_state['Group'] == timeline_group.name:
+            state = legacy_state
+        if state is not None:
+            states[timeline_group.name] = state
+    return states
+
+
+def selected_run_group(selections: adsk.core.Selections):
+    """Return the group name of the run that the first selected run body or instanced tile belongs to, or None."""
+    for selection in selections:
+        body = adsk.fusion.BRepBody.cast(selection.entity)
+        if body is not None:
+            attribute = body.attributes.itemByName('MarbleRun', 'runGroup')
+            if attribute is not None:
+                return attribute.value
+        occurrence = adsk.fusion.Occurrence.cast(selection.entity)
+        # A tile occurrence sits in the tiles component of the run, which is tagged with the group name
+        while occurrence is not None:
+            attribute = occurrence.component.attributes.itemByName('MarbleRun', 'instancedTiles')
+            if attribute is not None:
+                return attribute.value
+            occurrence = occurrence.assemblyContext
+    return None
+
+
+def unique_group_name(timeline_groups, name):
+    """Return name, or name with the first free number after it if a timeline group already has that name."""
+    names = {timeline_group.name for timeline_group in timeline_groups}
+    unique_name = name
+    number = 2
+    while unique_name in names:
+        unique_name = f'{name} {number}'
+        number += 1
+    return unique_name
+
+
+def delete_run(design: adsk.fusion.Design, state):
+    """Delete the timeline group of a stored run with its features. Returns False if the group doesn't exist anymore."""
+    for timeline_group in design.timeline.timelineGroups:
+        if timeline_group.name == state['Group']:
+            timeline_group.deleteMe(True)
+            return True
+    return False
 
 
 def are_points_close(p1, p2, tol=1e-6):
     return math.dist(p1, p2) < tol
 
 
+def add_footprint_profiles(sketch: adsk.fusion.Sketch, num_x_cells, num_y_cells, masked_cells, cell_size):
+    """Draw one rectangle for each run of unmasked cells in a row and return the profiles of those rectangles.
+
+    Holes in the mask also become closed profiles in the sketch, so the profiles are picked by matching their
+    centroids to the centers of the rectangles.
+    """
+    lines = sketch.sketchCurves.sketchLines
+    run_centers = []
+    for row in range(num_y_cells):
+        col = 0
+        while col < num_x_cells:
+            if (col, row) in masked_cells:
+                col += 1
+                continue
+            first_col = col
+            while col < num_x_cells and (col, row) not in masked_cells:
+                col += 1
+            corner_1 = adsk.core.Point3D.create(first_col*cell_size - cell_size/2, -1*row*cell_size + cell_size/2, 0)
+            corner_2 = adsk.core.Point3D.create(col*cell_size - cell_size/2, -1*row*cell_size - cell_size/2, 0)
+            lines.addTwoPointRectangle(corner_1, corner_2)
+            run_centers.append(((first_col + col - 1)*cell_size/2, -1*row*cell_size))
+
+    profiles = adsk.core.ObjectCollection.create()
+    for profile in sketch.profiles:
+        centroid = profile.areaProperties().centroid
+        for center in run_centers:
+            if are_points_close((centroid.x, centroid.y), center, cell_size/10):
+                profiles.add(profile)
+                break
+    return profiles
+
+
+def add_line(lines: adsk.fusion.SketchLines, start, end):
+    """Add a sketch line between two (x, y) points."""
+    return lines.addByTwoPoints(adsk.core.Point3D.create(start[0], start[1], 0), adsk.core.Point3D.create(end[0], end[1], 0))
+
+
+def add_base_tiles_component(component: adsk.fusion.Component, key):
+    """Add an empty 'Marble Run Base Tiles' component tagged with key, see find_base_tiles, and return its occurrence."""
+    tiles_occurrence = component.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+    tiles_component = tiles_occurrence.component
+    tiles_component.name = 'Marble Run Base Tiles'
+    tiles_component.attributes.add('MarbleRun', 'baseTiles', key)
+    return tiles_occurrence
+
+
+def references_user_parameters(design: adsk.fusion.Design, expressions):
+    """Return True if any of the expressions uses a user parameter of the design."""
+    for parameter in design.userParameters:
+        if any(re.search(rf'\b{re.escape(parameter.name)}\b', expression) for expression in expressions):
+            return True
+    return False
+
+
+def store_base_tiles(component: adsk.fusion.Component, base_track_bodies, key):
+    """Copy the base tiles into a hidden base tiles component tagged with key."""
+    tiles_occurrence = add_base_tiles_component(component, key)
+    for body, name in zip(base_track_bodies, base_track_body_names):
+        tile_body = body.copyToComponent(tiles_occurrence)
+        tile_body.name = name
+    tiles_occurrence.isLightBulbOn = False
+
+
+def add_cached_base_tiles(component: adsk.fusion.Component, tiles, key):
+    """Add the temporary bodies loaded from the tile cache to a hidden base tiles component tagged with key."""
+    tiles_occurrence = add_base_tiles_component(component, key)
+    tiles_component = tiles_occurrence.component
+    base_feature = tiles_component.features.baseFeatures.add()
+    base_feature.startEdit()
+    for tile in tiles:
+        tiles_component.bRepBodies.add(tile, base_feature)
+    base_feature.finishEdit()
+    base_feature.name = 'Cached Base Tiles'
+    for i, name in enumerate(base_track_body_names):
+        base_feature.bodies.item(i).name = name
+    tiles_occurrence.isLightBulbOn = False
+
+
+def find_base_tiles_component(design: adsk.fusion.Design, key):
+    """Return the base tiles component tagged with key that is still in the design, or None."""
+    component = design.activeComponent
+    for attribute in design.findAttributes('MarbleRun', 'baseTiles'):
+        if attribute.value == key and component.allOccurrencesByComponent(attribute.parent).item(0) is not None:
+            return attribute.parent
+    return None
+
+
+def add_base_tiles_run(design: adsk.fusion.Design, key, group_name):
+    """Record on the base tiles component tagged with key that the run with the timeline group group_name uses them."""
+    tiles_component = find_base_tiles_component(design, key)
+    if tiles_component is None:
+        return
+    runs_attribute = tiles_component.attributes.itemByName('MarbleRun', 'baseTilesRuns')
+    runs = json.loads(runs_attribute.value) if runs_attribute is not None else []
+    tiles_component.attributes.add('MarbleRun', 'baseTilesRuns', json.dumps(runs + [group_name]))
+
+
+def remove_base_tiles_run(design: adsk.fusion.Design, key, group_name):
+    """Undo add_base_tiles_run and delete the timeline group of the tiles, with the tiles, if no run uses them anymore.
+
+    Returns True if the tiles were deleted. Tiles stored before the runs were recorded are never deleted, and neither
+    are tiles that were loaded from the design without building them, which have no group of their own.
+    """
+    tiles_component = find_base_tiles_component(design, key)
+    if tiles_component is None:
+        return False
+    runs_attribute = tiles_component.attributes.itemByName('MarbleRun', 'baseTilesRuns')
+    group_attribute = tiles_component.attributes.itemByName('MarbleRun', 'baseTilesGroup')
+    if runs_attribute is None or group_attribute is None:
+        return False
+    runs = json.loads(runs_attribute.value)
+    if group_name in runs:
+        runs.remove(group_name)
+    tiles_component.attributes.add('MarbleRun', 'baseTilesRuns', json.dumps(runs))
+    if runs:
+        return False
+    for timeline_group in design.timeline.timelineGroups:
+        if timeline_group.name == group_attribute.value:
+            timeline_group.deleteMe(True)
+            return True
+    return False
+
+
+def find_base_tiles(design: adsk.fusion.Design, key):
+    """Return the base tiles that an earlier run stored with the same key, in the order of the track types, or None.
+
+    The bodies are proxies in the context of the active component, so they can be copied and moved like the bodies
+    that a new build makes.
+    """
+    component = design.activeComponent
+    for attribute in design.findAttributes('MarbleRun', 'baseTiles'):
+        if attribute.value != key:
+            continue
+        tiles_occurrence = component.allOccurrencesByComponent(attribute.parent).item(0)
+        if tiles_occurrence is None:
+            continue
+        bodies = [tiles_occurrence.bRepBodies.itemByName(name) for name in base_track_body_names]
+        if None not in bodies: # the user may have deleted some of them
+            return bodies
+    return None
+
+
+def union_bodies(bodies, join, strategy, rows=None):
+    """Join the bodies into one in the order of the union strategy and return the result.
+
+    join(target, tools) joins a list of tool bodies into the target and returns the joined body. rows holds the row of
+    every body for the By Row strategy; without it the bodies are split into about sqrt(n) rows in their order.
+    The bodies are expected in path order, so the groups of the tree strategies are neighbouring tiles.
+    """
+    start_time = time.perf_counter()
+    last_union_stats.clear()
+    last_union_stats.update({'strategy': strategy, 'joins': 0, 'max_tools': 0})
+
+    def join_group(group):
+        if len(group) == 1:
+            return group[0]
+        last_union_stats['joins'] += 1
+        last_union_stats['max_tools'] = max(last_union_stats['max_tools'], len(group) - 1)
+        return join(group[0], group[1:])
+
+    if strategy == 'By Row':
+        if rows is None:
+            row_length = max(1, round(math.sqrt(len(bodies))))
+            rows = [i // row_length for i in range(len(bodies))]
+        bodies_by_row = {}
+        for body, row in zip(bodies, rows):
+            bodies_by_row.setdefault(row, []).append(body)
+        result = join_group([join_group(row_bodies) for row_bodies in bodies_by_row.values()])
+    elif strategy in ['Pairwise Tree', 'K-Way Tree']:
+        group_size = 2 if strategy == 'Pairwise Tree' else tree_group_size
+        level = list(bodies)
+        while len(level) > 1:
+            level = [join_group(level[i:i + group_size]) for i in range(0, len(level), group_size)]
+        result = level[0]
+    else:
+        result = join_group(list(bodies))
+
+    last_union_stats['seconds'] = time.perf_counter() - start_time
+    futil.log(f'{strategy} union of {len(bodies)} bodies: {last_union_stats["joins"]} joins, '
+              f'at most {last_union_stats["max_tools"]} tool bodies per join, {last_union_stats["seconds"]:.2f} s')
+    return result
+
+
+def join_bodies(component: adsk.fusion.Component, bodies, strategy=union_strategies[0], rows=None):
+    """Join the bodies with combine features and return the joined body. See union_bodies for strategy and rows."""
+    combines = component.features.combineFeatures
+
+    def join(target_body, tool_body_list):
+        tool_bodies = adsk.core.ObjectCollection.create()
+        for tool_body in tool_body_list:
+            tool_bodies.add(tool_body)
+        combine_feature_input = combines.createInput(target_body, tool_bodies)
+        combine_feature_input.operation = adsk.fusion.FeatureOperations.JoinFeatureOperation
+        combine_feature_input.isKeepToolBodies = False
+        combine = combines.add(combine_feature_input)
+        return combine.bodies.item(0)
+
+    return union_bodies(bodies, join, strategy, rows)
+
+
+def flatten_and_shell(component: adsk.fusion.Component, combine_body, run):
+    """Trim the joined run so that it has a flat base and shell it from below. Returns the shell feature.
+
+    run holds the size of the run and the layout values that the build computed (see run_layout in HandleExecute).
+    """
+    sketches = component.sketches
+    xyPlane = component.xYConstructionPlane
+    extrudes = component.features.extrudeFeatures
+    num_x_cells = run['Width']
+    num_y_cells = run['Depth']
+    num_x_cells_text = run['WidthText']
+    num_y_cells_text = run['DepthText']
+    masked_cells = {tuple(cell) for cell in run['MaskedCells']}
+    diameter = run['CellSize']
+    diameter_text = run['CellSizeText']
+    # Runs stored before the expressions were kept only have the values
+    super_z_drop_text = run.get('SuperZDropText', f'{run["SuperZDrop"]} cm')
+    final_z_text = run.get('FinalZText', f'{run["FinalZ"]} cm')
+
+    # Trim the track so that it has a flat base
+    track_base_trimmer_sketch = sketches.add(xyPlane)
+    track_base_trimmer_sketch.name = 'Base Flattener'
+    lines = track_base_trimmer_sketch.sketchCurves.sketchLines
+    points = track_base_trimmer_sketch.sketchPoints
+    origin_point = track_base_trimmer_sketch.originPoint
+    constraints = track_base_trimmer_sketch.geometricConstraints
+    dimensions = track_base_trimmer_sketch.sketchDimensions
+
+    if masked_cells:
+        # Follow the outline of the masked footprint with one rectangle per run of unmasked cells in each row
+        prof = add_footprint_profiles(track_base_trimmer_sketch, num_x_cells, num_y_cells, masked_cells, diameter)
+    else:
+        rectangle_point_1 = adsk.core.Point3D.create(-1*diameter/2, diameter/2, 0)
+        rectangle_point_2 = adsk.core.Point3D.create(num_x_cells*diameter-1*diameter/2, -1*num_y_cells*diameter+diameter/2, 0)
+        rec_lines = lines.addTwoPointRectangle(rectangle_point_1, rectangle_point_2)
+        if not run.get('FastBuild'):
+            for i in range(rec_lines.count):
+                rec_line = rec_lines.item(i)
+                if i%2 == 0:
+                    constraints.addHorizontal(rec_line)
+                else:
+                    constraints.addVertical(rec_line)
+            top_rec_line = rec_lines.item(0)
+            left_rec_line = rec_lines.item(3)
+            textPoint = top_rec_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
+            textPoint.translateBy(adsk.core.Vector3D.create(0, 0.1, 0))
+            dimension = dimensions.addDistanceDimension(top_rec_line.startSketchPoint, top_rec_line.endSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, textPoint)
+            dimension.parameter.expression = f'{num_x_cells} * {diameter_text}'
+            textPoint = left_rec_line.geometry.evaluator.getPointAtParameter(0.5)[1].copy()
+            textPoint.translateBy(adsk.core.Vector3D.create(-0.1, 0, 0))
+            dimension = dimensions.addDistanceDimension(left_rec_line.startSketchPoint, left_rec_line.endSketchPoint, adsk.fusion.DimensionOrientations.AlignedDimensionOrientation, textPoint)
+            dimension.parameter.expression = f'{num_y_cells} * {diameter_text}'
+            textPoint = top_rec_line.startSketchPoint.geometry.copy()
+            textPoint.translateBy(adsk.core.Vector3D.create(0.2, 0.2, 0))
+            dimension = dimensions.addDistanceDimension(top_rec_line.startSketchPoint, origin_point, adsk.fusion.DimensionOrientations.HorizontalDimensionOrientation, textPoint)
+            dimension.parameter.expression = f'{diameter_text} / 2'
+            textPoint = top_rec_line.startSketchPoint.geometry.copy()
+            textPoint.translateBy(adsk.core.Vector3D.create(-0.2, -0.2, 0))
+            dimension = dimensions.addDistanceDimension(top_rec_line.startSketchPoint, origin_point, adsk.fusion.DimensionOrientations.VerticalDimensionOrientation, textPoint)
+            dimension.parameter.expression = f'{diameter_text} / 2'
+
+        prof = track_base_trimmer_sketch.profiles.item(0)
+    extrude_input = extrudes.createInput(prof, adsk.fusion.FeatureOperations.CutFeatureOperation)
+    # extrude_distance_value_input = adsk.core.ValueInput.createByString(diameter_text)
+    # extrude_distance_extent = adsk.fusion.DistanceExtentDefinition.create(extrude_distance_value_input)
+    # straight_track_extrude = extrudes.add(extrude_input)
+    # extrude_offset_text = f'-1 * ({final_z_pos} + {diameter_text} / 2 + 10 mm)'
+    extrude_offset_text = f'{final_z_text} - ({diameter_text} / 2 + 10 mm)'
+    start_offset = adsk.core.ValueInput.createByString(extrude_offset_text)
+    extrude_input.startExtent = adsk.fusion.OffsetStartDefinition.create(start_offset)
+    extrude_distance = adsk.core.ValueInput.createByString(f'-1 * ({num_x_cells_text} * {num_y_cells_text} * {super_z_drop_text} + {diameter_text} / 2 + 10 mm)')
+    extrude_input.setOneSideExtent(
+        adsk.fusion.DistanceExtentDefinition.create(extrude_distance),  # False = don't chain faces
+        adsk.fusion.ExtentDirections.PositiveExtentDirection
+    )
+    flat_base_extrude = extrudes.add(extrude_input)
+    return shell_run(component, combine_body)
+
+
+def shell_run(component: adsk.fusion.Component, combine_body):
+    """Shell the run from its flat bottom face to reduce material during 3D printing. Returns the shell feature."""
+    shells = component.features.shellFeatures
+    object_collection = adsk.core.ObjectCollection.create()
+    object_collection.add(combine_body)
+    shell_input = shells.createInput(object_collection)
+    shell_input.insideThickness = adsk.core.ValueInput.createByReal(0.3)
+    # Extract the face to remove. In the future, try to figure out if you can extract the face from one of the previous features
+    # face_to_remove = flat_base_extrude.endFaces.item(0) # this doesn't work. Seems like endFaces might be empty
+    face_to_remove = face_index.FaceIndex(combine_body.faces).outermost_face((0, 0, -1), 1e-6)
+    object_collection = adsk.core.ObjectCollection.create()
+    object_collection.add(face_to_remove)
+    shell_input.inputEntities = object_collection
+    shell = shells.add(shell_input)
+    return shell
+
+
+def place_tiles_by_type(component: adsk.fusion.Component, base_track_bodies, placements):
+    """Place the track tiles with one base feature per track type and return the placed bodies in path order.
+
+    The copies are made and moved in memory with the temporary BRep manager, so the timeline grows with the number of
+    track types instead of the number of cells. The placed tiles don't follow later parameter changes.
+    """
+    temp_brep_manager = adsk.fusion.TemporaryBRepManager.get()
+    cells_by_type = {}
+    for i, (cell_type, x_pos, y_pos, z_pos) in enumerate(placements):
+        cells_by_type.setdefault(cell_type, []).append(i)
+
+    placed_bodies = [None] * len(placements)
+    for cell_type, cell_indices in cells_by_type.items():
+        base_body = base_track_bodies[cell_type]
+        base_feature = component.features.baseFeatures.add()
+        base_feature.startEdit()
+        for i in cell_indices:
+            _, x_pos, y_pos, z_pos = placements[i]
+            tile = temp_brep_manager.copy(base_body)
+            transform = adsk.core.Matrix3D.create()
+            transform.translation = adsk.core.Vector3D.create(x_pos, y_pos, z_pos)
+            temp_brep_manager.transform(tile, transform)
+            component.bRepBodies.add(tile, base_feature)
+        base_feature.finishEdit()
+        base_feature.name = f'{base_body.name} Tiles'
+        # The bodies of a base feature keep the order in which they were added
+        for j, i in enumerate(cell_indices):
+            placed_bodies[i] = base_feature.bodies.item(j)
+    return placed_bodies
+
+
+def build_run_direct(component: adsk.fusion.Component, base_track_bodies, placements, run, strategy=union_strategies[0]):
+    """Build the joined run with a flat base in memory and add it to the component as a single base feature.
+
+    Much faster than the parametric build modes since nothing is recomputed in the timeline, but the run doesn't
+    follow later parameter changes. The tiles are joined in the order of the union strategy. Returns the body of the run.
+    """
+    temp_brep_manager = adsk.fusion.TemporaryBRepManager.get()
+    tiles = []
+    for cell_type, x_pos, y_pos, z_pos in placements:
+        tile = temp_brep_manager.copy(base_track_bodies[cell_type])
+        transform = adsk.core.Matrix3D.create()
+        transform.translation = adsk.core.Vector3D.create(x_pos, y_pos, z_pos)
+        temp_brep_manager.transform(tile, transform)
+        tiles.append(tile)
+
+    def join(target_body, tool_bodies):
+        # booleanOperation changes the target body
+        for tool_body in tool_bodies:
+            temp_brep_manager.booleanOperation(target_body, tool_body, adsk.fusion.BooleanTypes.UnionBooleanType)
+        return target_body
+
+    run_body = union_bodies(tiles, join, strategy, [y_pos for _, _, y_pos, _ in placements])
+
+    # Cut off everything below the flat base, like the Base Flattener extrude of the parametric build
+    cell_size = run['CellSize']
+    base_z = run['FinalZ'] - (cell_size/2 + 1.0)
+    box_height = run['Width'] * run['Depth'] * run['SuperZDrop'] + cell_size + 2.0 # deeper than the bottom of the tiles
+    box_center = adsk.core.Point3D.create((run['Width'] - 1) * cell_size/2, -1*(run['Depth'] - 1) * cell_size/2, base_z - box_height/2)
+    box = temp_brep_manager.createBox(adsk.core.OrientedBoundingBox3D.create(
+        box_center, adsk.core.Vector3D.create(1, 0, 0), adsk.core.Vector3D.create(0, 1, 0),
+        (run['Width'] + 1) * cell_size, (run['Depth'] + 1) * cell_size, box_height))
+    temp_brep_manager.booleanOperation(run_body, box, adsk.fusion.BooleanTypes.DifferenceBooleanType)
+
+    base_feature = component.features.baseFeatures.add()
+    base_feature.startEdit()
+    component.bRepBodies.add(run_body, base_feature)
+    base_feature.finishEdit()
+    base_feature.name = 'Marble Run'
+    return base_feature.bodies.item(0)
+
+
+def place_tile_instances(component: adsk.fusion.Component, base_track_bodies, placements):
+    """Place the track tiles as occurrences: one component per track type and one occurrence per cell.
+
+    All occurrences go into a new 'Marble Run Tiles' component, which is returned. An occurrence only references the
+    body of its component, so the design stays small however large the run is. The component gets an 'instancedTiles'
+    attribute, whose value the caller sets to the run's timeline group, see merge_instanced_run.
+    """
+    tiles_occurrence = component.occurrences.addNewComponent(adsk.core.Matrix3D.create())
+    tiles_component = tiles_occurrence.component
+    tiles_component.name = 'Marble Run Tiles'
+    tiles_component.attributes.add('MarbleRun', 'instancedTiles', '')
+    type_components = {}
+    for cell_type, x_pos, y_pos, z_pos in placements:
+        transform = adsk.core.Matrix3D.create()
+        transform.translation = adsk.core.Vector3D.create(x_pos, y_pos, z_pos)
+        if cell_type in type_components:
+            tiles_component.occurrences.addExistingComponent(type_components[cell_type], transform)
+        else:
+            base_body = base_track_bodies[cell_type]
+            occurrence = tiles_component.occurrences.addNewComponent(transform)
+            occurrence.component.name = base_body.name
+            tile_body = base_body.copyToComponent(occurrence)
+            tile_body.isVisible = True # the base bodies are hidden
+            type_components[cell_type] = occurrence.component
+    return tiles_component
+
+
+def merge_instanced_run(design: adsk.fusion.Design, run, strategy=union_strategies[0]):
+    """Join the tiles of the last instanced run into one body with a flat base and a shell, like the other build modes.
+
+    The copies of the tiles are made here, so the timeline only grows with the number of cells when a run is merged.
+    The tile occurrences are hidden afterwards. The tiles are the ones tagged with the timeline group of run. Returns
+    False if they aren't in the design anymore.
+    """
+    component = design.activeComponent
+    copy_pastes = component.features.copyPasteBodies
+    tiles_occurrence = None
+    for attribute in design.findAttributes('MarbleRun', 'instancedTiles'):
+        if attribute.value == run.get('Group'):
+            tiles_occurrence = component.allOccurrencesByComponent(attribute.parent).item(0)
+            if tiles_occurrence is not None:
+                break
+    if tiles_occurrence is None:
+        return False
+    copied_track_bodies = []
+    for tile_occurrence in tiles_occurrence.childOccurrences:
+        # The body of an occurrence in the context of the run is a proxy that includes the occurrence's transform
+        track_copy = copy_pastes.add(tile_occurrence.bRepBodies.item(0))
+        copied_track_bodies.append(track_copy.bodies.item(0))
+    tiles_occurrence.isLightBulbOn = False
+    combine_body = join_bodies(component, copied_track_bodies, strategy)
+    combine_body.name = 'Marble Run'
+    flatten_and_shell(component, combine_body, run)
+    return True
+
+
 def create_pipe(component, path, sectionSize: str):
     """Create pipe feature along the sketch curve or line"""
     features = component.features
@@ -0,0 +1,144 @@
+# Modular runs: a large run split into printable modules that are chained together.
+# Each module is a small grid with an entry port and an exit port on its boundary. A port is (x, y, direction): the
+# boundary cell and the direction the marble moves in when it enters or leaves the module through that cell.
+# The modules' paths are searched independently in worker processes (one small search per module instead of one big
+# one), then the modules are placed so that every exit port lines up with the next module's entry port and the
+# heights continue from module to module.
+import multiprocessing
+import os
+import random
+
+try:
+    from . import path_edit
+    from . import track_layout
+except ImportError:
+    import path_edit
+    import track_layout
+
+
+def make_module_spec(width, depth, entry, exit, max_height=None):
+    return {'width': width, 'depth': depth, 'entry': tuple(entry), 'exit': tuple(exit), 'max_height': max_height}
+
+
+def is_inside(spec, cell):
+    return 0 <= cell[0] < spec['width'] and 0 <= cell[1] < spec['depth']
+
+
+# Returns a description of what is wrong with the spec, or None if it is fine
+def check_module_spec(spec):
+    entry_x, entry_y, entry_direction = spec['entry']
+    exit_x, exit_y, exit_direction = spec['exit']
+    if not is_inside(spec, (entry_x, entry_y)) or not is_inside(spec, (exit_x, exit_y)):
+        return 'The entry and exit ports have to be cells of the module'
+    step = track_layout.steps[entry_direction]
+    if is_inside(spec, (entry_x - step[0], entry_y - step[1])):
+        return 'The entry port has to be on the side of the module the marble comes from'
+    step = track_layout.steps[exit_direction]
+    if is_inside(spec, (exit_x + step[0], exit_y + step[1])):
+        return 'The exit port has to be on the side of the module the marble leaves through'
+    # A path alternates between the two colours of a checkerboard, so its ends decide how many cells of each colour
+    # it can visit
+    num_cells = spec['width'] * spec['depth']
+    entry_colour = (entry_x + entry_y) % 2
+    exit_colour = (exit_x + exit_y) % 2
+    if num_cells % 2 == 0 and entry_colour == exit_colour:
+        return 'On a module with an even number of cells, x + y has to be even for one port and odd for the other'
+    if num_cells % 2 == 1 and (entry_colour != 0 or exit_colour != 0):
+        return 'On a module with an odd number of cells, x + y has to be even for both ports'
+    return None
+
+
+# Search the path of one module. Tries up to the given number of routes and keeps the one that loses the least
+# height, returns None if no route fits under the module's max_height.
+def generate_module(task):
+    spec, seed, ball_diameter, clearance, slope, attempts, max_nodes = task
+    rng = random.Random(seed)
+    cells = [(x, y) for y in range(spec['depth']) for x in range(spec['width'])]
+    entry = spec['entry'][:2]
+    exit = spec['exit'][:2]
+    best = None
+    for _ in range(attempts):
+        routes = path_edit.route_segments(cells, [(entry, exit)], max_nodes, rng)
+        if routes is None:
+            continue
+        route = routes[0]
+        types = track_layout.tile_types(route, spec['entry'][2], spec['exit'][2])
+        drop = track_layout.total_drop(types, ball_diameter, clearance, slope)
+        if best is None or drop < best[1]:
+            best = (route, drop)
+        if spec['max_height'] is None:
+            break
+    if best is None or (spec['max_height'] is not None and best[1] > spec['max_height']):
+        return None
+    return best[0]
+
+
+def generate_modules(specs, seed=None, ball_diameter=0.9525, clearance=0.015, slope=0.06, processes=None,
+                     attempts=10, max_nodes=50000):
+    for i, spec in enumerate(specs):
+        problem = check_module_spec(spec)
+        if problem:
+            raise ValueError(f'Module {i+1}: {problem}')
+    rng = random.Random(seed)
+    tasks = [(spec, rng.random(), ball_diameter, clearance, slope, attempts, max_nodes) for spec in specs]
+    processes = min(processes or os.cpu_count() or 1, len(specs))
+    if processes <= 1:
+        routes = list(map(generate_module, tasks))
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            routes = pool.map(generate_module, tasks, chunksize=1)
+    for i, route in enumerate(routes):
+        if route is None:
+            if specs[i]['max_height'] is not None:
+                raise ValueError(f'Module {i+1}: no path was found that stays under the maximum height. '
+                                 'Use a smaller module or a lower slope')
+            raise ValueError(f'Module {i+1}: no path was found between the entry and exit ports')
+    return routes
+
+
+# Place the modules one after the other. Every module starts one cell past the exit port of the module before it and
+# at the height where the marble left that module. Returns one dict per module with its origin (in grid cells), the
+# cells of its path in run coordinates, the tile types, the tile positions and the height range of the module.
+def assemble_chain(specs, routes, ball_diameter=0.9525, clearance=0.015, slope=0.06):
+    diameter = track_layout.cell_size(ball_diameter, clearance)
+    modules = []
+    origin = (0, 0)
+    z_pos = 0.0
+    for i, (spec, route) in enumerate(zip(specs, routes)):
+        if i > 0:
+            prev_spec = specs[i-1]
+            exit_x, exit_y, exit_direction = prev_spec['exit']
+            if spec['entry'][2] != exit_direction:
+                raise ValueError(f'Module {i+1}: the entry port has to face the exit port of module {i}')
+            step = track_layout.steps[exit_direction]
+            prev_origin = modules[-1]['origin']
+            origin = (prev_origin[0] + exit_x + step[0] - spec['entry'][0],
+                      prev_origin[1] + exit_y + step[1] - spec['entry'][1])
+        types = track_layout.tile_types(route, spec['entry'][2], spec['exit'][2])
+        cells = [(origin[0] + x, origin[1] + y) for x, y in route]
+        positions, exit_z = track_layout.layout_cells(cells, types, ball_diameter, clearance, slope, (0.0, 0.0, z_pos))
+        modules.append({'origin': origin, 'cells': cells, 'types': types, 'positions': positions,
+                        'top': z_pos, 'bottom': exit_z, 'size': (spec['width']*diameter, spec['depth']*diameter)})
+        z_pos = exit_z
+    # Modules must not overlap
+    used_cells = set()
+    for i, module in enumerate(modules):
+        if used_cells & set(module['cells']):
+            raise ValueError(f'Module {i+1} overlaps an earlier module')
+        used_cells.update(module['cells'])
+    return modules
+
+
+def generate_chain(specs, seed=None, ball_diameter=0.9525, clearance=0.015, slope=0.06, processes=None):
+    routes = generate_modules(specs, seed, ball_diameter, clearance, slope, processes)
+    return assemble_chain(specs, routes, ball_diameter, clearance, slope)
+
+
+if __name__ == '__main__':
+    import time
+    # Four 7x7 modules in a row, the marble crossing each one from left to right
+    specs = [make_module_spec(7, 7, (0, 2, 0), (6, 2, 0), max_height=4.0) for _ in range(4)]
+    start_time = time.perf_counter()
+    for i, module in enumerate(generate_chain(specs)):
+        print(f'module {i+1}: origin {module["origin"]}, height {module["top"] - module["bottom"]:.2f} cm')
+    print(f'{time.perf_counter() - start_time:.2f} s')
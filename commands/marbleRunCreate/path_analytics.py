@@ -0,0 +1,148 @@
+# Statistics over large path collections, to pick good runs from a library.
+# A collection (for example the JSON Lines written by tools/generate_paths.py) is loaded into an N x L array of
+# direction codes (0: +X, 1: +Y, 2: -X, 3: -Y, one per step between cells), and every metric is computed for all paths
+# at once with NumPy:
+# - bends: number of bent tiles
+# - longest_straight: longest run of straight tiles in a row
+# - total_drop: height lost along the run, from the slope and the super slope of the bends (see track_layout)
+# - turn_balance: (left turns - right turns) / bends, 0 for a run that turns both ways equally often
+# - coverage_evenness: the grid is split into 3x3 blocks and the passes of the path through each block are counted.
+#   1 means every block is visited equally often, lower values mean the path fills some blocks in one go and keeps
+#   coming back to others
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from . import track_layout
+except ImportError:
+    import track_layout
+
+step_x = [1, 0, -1, 0]
+step_y = [0, -1, 0, 1]
+
+
+def is_available():
+    return np is not None
+
+
+# Direction chains (strings of digits) of one grid size as an N x L array
+def chains_to_array(chains):
+    if np is None:
+        raise ImportError('The path analytics need NumPy')
+    if not chains:
+        return np.zeros((0, 0), dtype=np.uint8)
+    data = np.frombuffer(''.join(chains).encode('ascii'), dtype=np.uint8) - ord('0')
+    return data.reshape(len(chains), -1)
+
+
+# Load the paths of one size from a JSON Lines file. Without a size the most common one is used
+def load_collection(file_name, size=None):
+    records = []
+    with open(file_name) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('found'):
+                records.append(record)
+    if size is None:
+        sizes = [tuple(record['size']) for record in records]
+        size = max(set(sizes), key=sizes.count) if sizes else (0, 0)
+    records = [record for record in records if tuple(record['size']) == tuple(size)]
+    return {
+        'x_size': size[0],
+        'y_size': size[1],
+        'directions': chains_to_array([record['directions'] for record in records]),
+        'seeds': [record['seed'] for record in records],
+        'engines': [record.get('used_engine', record.get('engine')) for record in records],
+    }
+
+
+# Position of every cell of every path as two N x (L+1) arrays
+def cell_positions(directions, x_size, y_size):
+    dx = np.take(step_x, directions)
+    dy = np.take(step_y, directions)
+    start = np.zeros((len(directions), 1), dtype=np.int64)
+    xs = np.concatenate([start + 2, 2 + np.cumsum(dx, axis=1)], axis=1)
+    ys = np.concatenate([start + y_size - 1, y_size - 1 + np.cumsum(dy, axis=1)], axis=1)
+    return xs, ys
+
+
+def compute_metrics(collection, ball_diameter=0.9525, clearance=0.015, slope=0.06):
+    directions = collection['directions'].astype(np.int8)
+    num_paths = len(directions)
+    # The marble enters the first cell moving +Y and leaves the last one moving -Y, like the run's first and last tiles
+    incoming = np.concatenate([np.full((num_paths, 1), 1, dtype=np.int8), directions], axis=1)
+    outgoing = np.concatenate([directions, np.full((num_paths, 1), 3, dtype=np.int8)], axis=1)
+    is_straight = incoming == outgoing
+    bends = (~is_straight).sum(axis=1)
+
+    num_cells = is_straight.shape[1]
+    positions = np.arange(num_cells)
+    last_bend = np.maximum.accumulate(np.where(is_straight, -1, positions), axis=1)
+    longest_straight = (positions - last_bend).max(axis=1) if num_cells else np.zeros(num_paths, dtype=np.int64)
+
+    straight_drop, bend_drop = track_layout.z_drops(ball_diameter, clearance, slope)
+    total_drop = (num_cells - bends) * straight_drop + bends * bend_drop
+
+    turn = (outgoing - incoming) % 4
+    left_turns = (turn == 1).sum(axis=1)
+    right_turns = (turn == 3).sum(axis=1)
+    turn_balance = (left_turns - right_turns) / np.maximum(bends, 1)
+
+    xs, ys = cell_positions(directions, collection['x_size'], collection['y_size'])
+    blocks = (ys * 3 // collection['y_size']) * 3 + xs * 3 // collection['x_size']
+    is_pass_start = np.ones(blocks.shape, dtype=bool)
+    is_pass_start[:, 1:] = blocks[:, 1:] != blocks[:, :-1]
+    rows = np.broadcast_to(np.arange(num_paths)[:, None], blocks.shape)
+    passes = np.bincount((rows * 9 + blocks)[is_pass_start], minlength=num_paths * 9).reshape(num_paths, 9)
+    coverage_evenness = 1 - passes.std(axis=1) / np.maximum(passes.mean(axis=1), 1e-9)
+
+    return {
+        'bends': bends,
+        'longest_straight': longest_straight,
+        'total_drop': total_drop,
+        'turn_balance': turn_balance,
+        'coverage_evenness': coverage_evenness,
+    }
+
+
+# Mask of the paths whose metrics lie in the given (low, high) ranges, e.g. bends=(None, 80). None means no limit
+def filter_paths(metrics, **ranges):
+    mask = np.ones(len(next(iter(metrics.values()))), dtype=bool)
+    for name, (low, high) in ranges.items():
+        if low is not None:
+            mask &= metrics[name] >= low
+        if high is not None:
+            mask &= metrics[name] <= high
+    return mask
+
+
+# Indices of the k paths with the largest (or smallest) value of the metric, best first. An optional mask limits the
+# choice to the paths that passed a filter
+def top_k(metrics, name, k, largest=True, mask=None):
+    values = metrics[name].astype(float)
+    candidates = np.arange(len(values)) if mask is None else np.flatnonzero(mask)
+    keys = -values[candidates] if largest else values[candidates]
+    k = min(k, len(candidates))
+    if k == 0:
+        return candidates[:0]
+    best = np.argpartition(keys, k - 1)[:k]
+    return candidates[best[np.argsort(keys[best], kind='stable')]]
+
+
+if __name__ == '__main__':
+    import sys
+    collection = load_collection(sys.argv[1] if len(sys.argv) > 1 else 'paths.jsonl')
+    metrics = compute_metrics(collection)
+    print(f'{len(collection["directions"])} paths of {collection["x_size"]}x{collection["y_size"]}')
+    for name, values in metrics.items():
+        print(f'{name:>18}: min {values.min():.3f}, mean {values.mean():.3f}, max {values.max():.3f}')
+    for i in top_k(metrics, 'coverage_evenness', 5):
+        print(f'seed {collection["seeds"][i]} ({collection["engines"][i]}): ' +
+              ', '.join(f'{name} {values[i]:.3f}' for name, values in metrics.items()))
@@ -0,0 +1,272 @@
+# Local edits of a finished path.
+# Instead of searching the whole grid again, these functions change the path only where it has to change and keep the
+# rest of the run the way the user liked it. All of them leave the result in path_generator's matrix, so
+# path_generator.generate_type_matrix() works on it like after generate_path.
+import random
+
+try:
+    from . import path_generator
+except ImportError:
+    import path_generator
+
+last_resize_method = None # how the last resize_path call got its path: 'detours' or 'reroute', None if it failed
+
+
+def are_adjacent(cell_1, cell_2):
+    return abs(cell_1[0]-cell_2[0]) + abs(cell_1[1]-cell_2[1]) == 1
+
+
+def grid_neighbors(cell):
+    return [(cell[0]+dx, cell[1]+dy) for dx, dy in path_generator.directions]
+
+
+# Split the path into the runs of consecutive cells that lie inside the region. Returns (first index, last index) pairs.
+def find_segments(cells, region):
+    segments = []
+    first = None
+    for i, cell in enumerate(cells):
+        if cell in region:
+            if first is None:
+                first = i
+        elif first is not None:
+            segments.append((first, i-1))
+            first = None
+    if first is not None:
+        segments.append((first, len(cells)-1))
+    return segments
+
+
+# Find new routes through a region. Each route connects the same two end cells as before, the routes are walked in the
+# given order, and together they have to cover every cell of the region. Returns a list of routes (lists of cells) or
+# None if no routes were found within max_nodes search nodes. Routes equal to avoid (e.g. the current ones) don't count.
+def route_segments(region, endpoints, max_nodes=20000, rng=random, avoid=None):
+    # Colour the grid like a checkerboard: a route alternates colours, so its ends fix how many cells of each colour
+    # it covers. If the routes can't add up to the colours of the region, no search is needed.
+    balance = sum(1 if (x + y) % 2 else -1 for x, y in region)
+    for (x1, y1), (x2, y2) in endpoints:
+        if (x1 + y1) % 2 == (x2 + y2) % 2:
+            balance -= 1 if (x1 + y1) % 2 else -1
+    if balance != 0:
+        return None
+    routes = [[first] if first == last else None for first, last in endpoints]
+    open_segments = [i for i, (first, last) in enumerate(endpoints) if first != last]
+    free = set(region) - {cell for pair in endpoints for cell in pair}
+    nodes = [0]
+
+    def is_hopeless(segment, head):
+        # Ends that still need a connection: the head and target of this segment and both ends of later segments
+        target = endpoints[segment][1]
+        ends = {head, target}
+        for later in open_segments:
+            if later > segment:
+                ends.update(endpoints[later])
+        for cell in free:
+            if sum(neighbor in free or neighbor in ends for neighbor in grid_neighbors(cell)) < 2:
+                return True
+        for end in ends - {head}:
+            if not any(neighbor in free or neighbor in ends for neighbor in grid_neighbors(end)):
+                return True
+        # Every group of free cells has to touch an end, otherwise nothing can reach it
+        unvisited = set(free)
+        while unvisited:
+            stack = [unvisited.pop()]
+            touches_end = False
+            while stack:
+                cell = stack.pop()
+                for neighbor in grid_neighbors(cell):
+                    if neighbor in unvisited:
+                        unvisited.remove(neighbor)
+                        stack.append(neighbor)
+                    elif neighbor in ends:
+                        touches_end = True
+            if not touches_end:
+                return True
+        return False
+
+    def extend(position, route):
+        nodes[0] += 1
+        if nodes[0] > max_nodes:
+            return False
+        segment = open_segments[position]
+        head = route[-1]
+        target = endpoints[segment][1]
+        if is_hopeless(segment, head):
+            return False
+        candidates = [neighbor for neighbor in grid_neighbors(head) if neighbor in free]
+        # Fewest onward moves first, with some randomness so that repeated calls give different routes
+        candidates.sort(key=lambda cell: sum(neighbor in free for neighbor in grid_neighbors(cell)) + rng.random())
+        if are_adjacent(head, target) and (free or position < len(open_segments)-1 or not candidates):
+            candidates.append(target)
+        for cell in candidates:
+            if cell == target:
+                routes[segment] = route + [target]
+                if position == len(open_segments)-1:
+                    if not free and routes != avoid:
+                        return True
+                elif extend(position+1, [endpoints[open_segments[position+1]][0]]):
+                    return True
+                routes[segment] = None
+            else:
+                free.remove(cell)
+                if extend(position, route + [cell]):
+                    return True
+                free.add(cell)
+        return False
+
+    if not open_segments:
+        return routes if not free and routes != avoid else None
+    if extend(0, [endpoints[open_segments[0]][0]]):
+        return routes
+    return None
+
+
+# Re-route the path inside the region and return the new list of cells, or None if that failed.
+# Cells of the region that are not on the path yet (new cells after a resize) are added to the routes.
+# With is_change_required the current routes through the region are not accepted as a result.
+# The end block always stays where it is.
+def reroute(cells, region, max_nodes=20000, rng=random, is_change_required=False):
+    region = set(region) - set(cells[-4:])
+    segments = find_segments(cells, region)
+    if not segments:
+        return None
+    avoid = [cells[first:last+1] for first, last in segments] if is_change_required else None
+    routes = route_segments(region, [(cells[first], cells[last]) for first, last in segments], max_nodes, rng, avoid)
+    if routes is None:
+        return None
+    new_cells = []
+    previous_last = -1
+    for (first, last), route in zip(segments, routes):
+        new_cells += cells[previous_last+1:first] + route
+        previous_last = last
+    return new_cells + cells[previous_last+1:]
+
+
+# Absorb pairs of new cells next to the path: a path step a -> b next to two new cells u, v becomes a -> u -> v -> b
+def add_detours(cells, new_cells):
+    new_cells = set(new_cells)
+    is_changed = True
+    while new_cells and is_changed:
+        is_changed = False
+        for u in sorted(new_cells):
+            for v in grid_neighbors(u):
+                if v not in new_cells:
+                    continue
+                for i in range(len(cells)-5): # the steps into the end block can't take a detour
+                    a, b = cells[i], cells[i+1]
+                    if are_adjacent(a, u) and are_adjacent(b, v):
+                        cells[i+1:i+1] = [u, v]
+                        new_cells -= {u, v}
+                        is_changed = True
+                        break
+                if is_changed:
+                    break
+            if is_changed:
+                break
+    return cells, new_cells
+
+
+# Cells within the given distance (in either direction) of the damaged cells
+def grow_region(x_size, y_size, damaged, distance):
+    region = set()
+    for x, y in damaged:
+        for rx in range(max(0, x-distance), min(x_size, x+distance+1)):
+            for ry in range(max(0, y-distance), min(y_size, y+distance+1)):
+                region.add((rx, ry))
+    return region
+
+
+# Resize the current path of path_generator to new_x_size x new_y_size, keeping as much of it as possible.
+# Rows are added or removed at the back (row 0) and columns at the right, so the start cell and the end block in the
+# front left corner keep their place. Cells that the new mask leaves out are removed as well.
+# New cells are first absorbed with small detours. Whatever is left over, and every break left by removed cells, is
+# repaired by re-routing the path in a band around it that grows until the repair works. Returns None if that fails,
+# the caller then generates a new path with engines.generate_path. Raises ValueError if the new size has no path.
+def resize_path(new_x_size, new_y_size, seed=None, mask=None, max_band=4, max_nodes=5000):
+    global last_resize_method
+    rng = random.Random(seed)
+    old_y_size = path_generator.ySize
+    row_shift = new_y_size - old_y_size
+    cells = [(x, y + row_shift) for x, y in path_generator.path_cells()]
+
+    path_generator.create_matrix(new_x_size, new_y_size, mask)
+    if path_generator.infeasible_reason:
+        raise ValueError(path_generator.infeasible_reason)
+
+    def is_inside(cell):
+        return 0 <= cell[0] < new_x_size and 0 <= cell[1] < new_y_size and cell not in path_generator.masked_cells
+
+    kept_cells = [cell for cell in cells if is_inside(cell)]
+    removed_cells = [cell for cell in cells if not is_inside(cell)]
+    added_cells = {(x, y) for x in range(new_x_size) for y in range(new_y_size) if is_inside((x, y))} - set(kept_cells)
+
+    cells, added_cells = add_detours(kept_cells, added_cells)
+    last_resize_method = 'detours'
+    damaged = set(added_cells)
+    for cell_1, cell_2 in zip(cells, cells[1:]):
+        if not are_adjacent(cell_1, cell_2):
+            damaged.update((cell_1, cell_2))
+    if damaged:
+        last_resize_method = 'reroute'
+        # The old path was cut next to the removed cells
+        damaged.update(cell for cell in kept_cells if any(neighbor in removed_cells for neighbor in grid_neighbors(cell)))
+        new_cells = None
+        for distance in range(1, max_band+1):
+            new_cells = reroute(cells, grow_region(new_x_size, new_y_size, damaged, distance) - path_generator.masked_cells,
+                                max_nodes, rng)
+            if new_cells is not None:
+                break
+        cells = new_cells
+
+    if cells is not None:
+        path_generator.set_path(new_x_size, new_y_size, cells, mask)
+        if path_generator.is_complete_path():
+            return path_generator.matrix
+    last_resize_method = None
+    return None
+
+
+# Height of every cell, counted as the straight and bent cells in front of it (each kind drops by its own amount)
+def cell_drops(cells, type_matrix):
+    drops = {}
+    num_straight = 0
+    num_bent = 0
+    for x, y in cells:
+        drops[(x, y)] = (num_straight, num_bent)
+        if type_matrix[y][x] in [0, 1, 2, 3]:
+            num_straight += 1
+        else:
+            num_bent += 1
+    return drops
+
+
+# Raise a ValueError if the re-roll region doesn't fit the x_size by y_size grid with the masked cells, like
+# path_generator.create_matrix does for the mask
+def check_reroll_region(region, x_size, y_size, mask=None):
+    for x, y in region:
+        if not (0 <= x < x_size and 0 <= y < y_size):
+            raise ValueError(f'Re-roll cell ({x}, {y}) is outside of the {x_size}x{y_size} grid')
+    if region and not set(region) - set(mask or ()):
+        raise ValueError('The re-roll region only contains masked cells')
+
+
+# Search the current path again inside the region (a set of cells, e.g. a rectangle from parse_masked_cells) and keep
+# everything outside it. The cells where the path enters and leaves the region stay fixed, so the search only
+# depends on the size of the region. Returns (retyped, lowered): the cells that need a different track tile, and the
+# cells that keep their tile but moved to another height because the path in front of them got more or fewer bends.
+# Returns None and leaves the path alone if the region can't be routed any other way.
+def reroll_region(region, seed=None, max_nodes=20000):
+    rng = random.Random(seed)
+    cells = path_generator.path_cells()
+    region = set(region) - path_generator.masked_cells
+    old_types = path_generator.generate_type_matrix()
+    new_cells = reroute(cells, region, max_nodes, rng, is_change_required=True)
+    if new_cells is None:
+        return None
+
+    path_generator.set_path(path_generator.xSize, path_generator.ySize, new_cells, path_generator.masked_cells)
+    new_types = path_generator.generate_type_matrix()
+    retyped = {(x, y) for x, y in new_cells if new_types[y][x] != old_types[y][x]}
+    old_drops = cell_drops(cells, old_types)
+    new_drops = cell_drops(new_cells, new_types)
+    lowered = {cell for cell in new_cells if cell not in retyped and new_drops[cell] != old_drops[cell]}
+    return retyped, lowered
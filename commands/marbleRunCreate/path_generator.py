@@ -4,12 +4,27 @@
 
 # FIRST VERSION
 import random
+import os
+import json
 
 xSize = 5
 ySize = 5
 # matrix = [[0 for _ in range(xSize)] for _ in range(ySize)]
 matrix = None
 num_moves = 0
+num_backtracks = 0 # number of placed cells that were taken back, summed over all attempts
+num_attempts = 0 # number of times the search was restarted from scratch
+verbose = True # print the search progress. Batch tools turn this off
+
+# Masked footprints
+# Cells in the mask are not part of the run (notches, holes for a lift shaft or a pillar). They hold MASKED in the
+# matrix, so every check that looks for free (0) cells treats them like the outside of the grid.
+MASKED = -1
+masked_cells = set()
+num_cells = xSize * ySize # number of cells in the run, including the end block
+must_fill_before = {} # articulation point -> cells that have to be filled before the path may pass through it
+infeasible_reason = None # set by analyze_mask when the run can't have a path
+mask_analyses = {} # (x size, y size, masked cells) -> (must_fill_before, infeasible_reason), see analyze_mask
 
 # Directions: up, down, left, right
 directions = [(-1,0), (1,0), (0,-1), (0,1)]
@@ -22,30 +37,189 @@ directions = [(-1,0), (1,0), (0,-1), (0,1)]
 # 8:[1,2], 9:[2,3], 10:[3,0], 11:[0,1]
 track_type_dict = {(0,0): 0, (1,1): 1, (2,2): 2, (3,3): 3, (1,0): 4, (2,1): 5, (3,2): 6, (0,3): 7, (1,2): 8, (2,3): 9, (3,0): 10, (0,1): 11}
 
-def create_matrix(x_size, y_size):
+def create_matrix(x_size, y_size, mask=None):
     global xSize
     global ySize
     global matrix
+    global masked_cells
+    global num_cells
     xSize = x_size
     ySize = y_size
+    masked_cells = set(mask or ())
+    for x, y in masked_cells:
+        if not (0 <= x < xSize and 0 <= y < ySize):
+            raise ValueError(f'Masked cell ({x}, {y}) is outside of the {xSize}x{ySize} grid')
+    fixed_cells = {(2, ySize-1), (0, ySize-3), (0, ySize-2), (1, ySize-2), (0, ySize-1), (1, ySize-1)}
+    if masked_cells & fixed_cells:
+        raise ValueError('The start cell, the last cell and the end block of the run can\'t be masked')
+    num_cells = x_size*y_size - len(masked_cells)
     matrix = [[0 for _ in range(xSize)] for _ in range(ySize)]
-    matrix[ySize-2][0] = x_size*y_size-3
-    matrix[ySize-2][1] = x_size*y_size-2
-    matrix[ySize-1][0] = x_size*y_size
-    matrix[ySize-1][1] = x_size*y_size-1
+    for x, y in masked_cells:
+        matrix[y][x] = MASKED
+    matrix[ySize-2][0] = num_cells-3
+    matrix[ySize-2][1] = num_cells-2
+    matrix[ySize-1][0] = num_cells
+    matrix[ySize-1][1] = num_cells-1
+    analyze_mask()
     return matrix
 
+# Parse masked cells typed as "x,y" pairs or "x0-x1,y0-y1" ranges separated by semicolons, e.g. "5,0; 0-2,0-1"
+def parse_masked_cells(text):
+    cells = set()
+    for item in text.split(';'):
+        item = item.strip()
+        if not item:
+            continue
+        try:
+            x_text, y_text = item.split(',')
+            x_range = [int(value) for value in x_text.split('-')]
+            y_range = [int(value) for value in y_text.split('-')]
+        except ValueError:
+            raise ValueError(f'Can\'t read the masked cells "{item}". Use x,y or x0-x1,y0-y1')
+        if len(x_range) > 2 or len(y_range) > 2:
+            raise ValueError(f'Can\'t read the masked cells "{item}". Use x,y or x0-x1,y0-y1')
+        for x in range(x_range[0], x_range[-1] + 1):
+            for y in range(y_range[0], y_range[-1] + 1):
+                cells.add((x, y))
+    return cells
+
+def free_neighbors(x, y):
+    return [(x+dx, y+dy) for dx, dy in directions if is_valid(x+dx, y+dy)]
+
+# Precompute the pruning that only depends on the shape of the run. The free cells have to be covered by one path from
+# the start cell to the last cell, so:
+# - the free cells must be connected and have the right checkerboard color balance for the two fixed ends
+# - an articulation point (a cell that splits the free cells when removed) can be passed only once, so it may split
+#   them into at most two parts, the start and the last cell must be on different sides, and the start side has to be
+#   filled completely before the path passes through it
+# - cells with only two free neighbors form forced corridors, which must not contradict each other
+# The result only depends on the size and the mask, and the dialog validation and every generated path ask for it
+# again, so it is computed once per shape.
+def analyze_mask():
+    global must_fill_before
+    global infeasible_reason
+    key = (xSize, ySize, frozenset(masked_cells))
+    if key not in mask_analyses:
+        analyze_shape()
+        mask_analyses[key] = (must_fill_before, infeasible_reason)
+    must_fill_before, infeasible_reason = mask_analyses[key]
+
+def analyze_shape():
+    global must_fill_before
+    global infeasible_reason
+    must_fill_before = {}
+    infeasible_reason = None
+    start_cell = (2, ySize-1)
+    end_cell = get_end_cell()
+    free_cells = [(x, y) for y in range(ySize) for x in range(xSize) if matrix[y][x] == 0]
+
+    def components(removed):
+        unvisited = set(free_cells) - {removed}
+        groups = []
+        while unvisited:
+            stack = [unvisited.pop()]
+            group = set(stack)
+            while stack:
+                cell = stack.pop()
+                for neighbor in free_neighbors(*cell):
+                    if neighbor in unvisited:
+                        unvisited.remove(neighbor)
+                        group.add(neighbor)
+                        stack.append(neighbor)
+            groups.append(group)
+        return groups
+
+    if len(components(None)) > 1:
+        infeasible_reason = 'The cells of the run are not connected'
+        return
+
+    colors = [0, 0]
+    for x, y in free_cells:
+        colors[(x+y) % 2] += 1
+    start_color = sum(start_cell) % 2
+    end_color = sum(end_cell) % 2
+    if len(free_cells) % 2 == 1:
+        is_balanced = start_color == end_color and colors[start_color] == colors[1-start_color] + 1
+    else:
+        is_balanced = start_color != end_color and colors[0] == colors[1]
+    if not is_balanced:
+        infeasible_reason = 'No path can start and end at the fixed cells (checkerboard parity). Try an odd width and depth'
+        return
+
+    # A full rectangle of at least 2x2 cells has no articulation points
+    for cell in find_articulation_points(free_cells) if masked_cells else ():
+        groups = components(cell)
+        if cell == start_cell or cell == end_cell or len(groups) > 2:
+            infeasible_reason = f'Cell {cell} splits the run into parts that one path can\'t cover'
+            return
+        start_group = [group for group in groups if start_cell in group][0]
+        if end_cell in start_group:
+            infeasible_reason = f'Cell {cell} cuts off part of the run from both ends of the path'
+            return
+        must_fill_before[cell] = list(start_group)
+
+    matrix[start_cell[1]][start_cell[0]] = 1
+    if find_forced_edges(start_cell) is None:
+        infeasible_reason = 'The corridors of the run force a contradiction'
+    matrix[start_cell[1]][start_cell[0]] = 0
+
+# Tarjan's algorithm on the grid graph of the given cells
+# The depth-first search keeps its own stack, so large grids don't run into Python's recursion limit
+def find_articulation_points(cells):
+    cell_set = set(cells)
+    index = {}
+    low = {}
+    articulation_points = set()
+    if not cells:
+        return articulation_points
+
+    root = cells[0]
+    index[root] = low[root] = 0
+    root_children = 0
+    stack = [(root, None, iter(directions))]
+    while stack:
+        cell, parent, remaining = stack[-1]
+        for dx, dy in remaining:
+            neighbor = (cell[0]+dx, cell[1]+dy)
+            if neighbor not in cell_set:
+                continue
+            if neighbor not in index:
+                index[neighbor] = low[neighbor] = len(index)
+                stack.append((neighbor, cell, iter(directions)))
+                break
+            elif neighbor != parent:
+                low[cell] = min(low[cell], index[neighbor])
+        else:
+            stack.pop()
+            if parent is None:
+                continue
+            low[parent] = min(low[parent], low[cell])
+            if parent == root:
+                root_children += 1
+            elif low[cell] >= index[parent]:
+                articulation_points.add(parent)
+    if root_children > 1:
+        articulation_points.add(root)
+    return articulation_points
+
+# An articulation point can only be entered once everything on the start side of it is filled
+def violates_fill_order(x, y):
+    if (x, y) not in must_fill_before: # most masks have no articulation points at all
+        return False
+    return any(matrix[cell_y][cell_x] == 0 for cell_x, cell_y in must_fill_before.get((x, y), ()))
+
 def is_valid(x, y):
     return 0 <= x < xSize and 0 <= y < ySize and matrix[y][x] == 0
 
 def is_valid2(x, y, num):
     # If both spots are 0, return true
-    # If you're at one of the two spots and the other spot is not zero, then the spot you're at must be xSize*ySize-5
+    # If you're at one of the two spots and the other spot is not zero, then the spot you're at must be num_cells-5
     if (x, y) == (0, ySize-4) or (x, y) == (1, ySize-3):
         if matrix[ySize-4][0] == 0 and matrix[ySize-3][1] == 0:
             return True
-        elif num != xSize*ySize-5:
-            print("num: ", num)
+        elif num != num_cells-5:
+            if verbose:
+                print("num: ", num)
             return False
     # if (x, y) == (0, ySize-4):
     #     if num != xSize*ySize-5 and matrix[ySize-3][1] != xSize*ySize-5:
@@ -132,51 +306,386 @@ def accept_neighbor(x, y, num):
     valid = True
     if not is_valid(x, y):
         valid = False
-    if is_subdividing_space(x, y):
+    if use_subdividing_check and is_subdividing_space(x, y):
         valid = False
     # if num_dead_ends(x, y) > 1:
     #     valid = False
-    if has_invalid_dead_end(x, y):
+    if use_dead_end_check and has_invalid_dead_end(x, y):
         valid = False
     if not is_valid2(x, y, num):
         valid = False
+    if valid and must_fill_before and violates_fill_order(x, y):
+        valid = False
     return valid
 
+# Forced-move propagation
+# Every free cell except the end cell has to be entered and left again, so a free cell with exactly two available
+# neighbors (free cells or the current head of the path) must use both of them. The end cell only needs one edge.
+# Chains of these forced edges often decide a whole corridor, which can then be followed without branching.
+use_forced_moves = True
+num_forced_moves = 0 # number of cells placed by following a forced corridor
+num_branches_saved = 0 # forced placements at cells that would otherwise have had more than one candidate
+
+def get_end_cell():
+    return (0, ySize-3) # the last path cell, next to the end block
+
+def available_neighbors(x, y, head):
+    return [(x+dx, y+dy) for dx, dy in directions if is_valid(x+dx, y+dy) or (x+dx, y+dy) == head]
+
+# Returns a dict mapping each cell to the set of neighbors it is forced to connect to, or None if the forced edges contradict each other
+def find_forced_edges(head):
+    end_cell = get_end_cell()
+    if end_cell != head and not is_valid(*end_cell):
+        return None # the end cell was used before the end of the path
+    free_cells = [(cell_x, cell_y) for cell_y in range(ySize) for cell_x in range(xSize) if matrix[cell_y][cell_x] == 0]
+    forced = {}
+    # Union-find over forced edges to catch forced cycles and corridors that close the path too early
+    parent = {}
+    size = {}
+
+    def find(cell):
+        while parent.get(cell, cell) != cell:
+            cell = parent[cell]
+        return cell
+
+    def force(a, b):
+        if b in forced.get(a, ()):
+            return True
+        root_a = find(a)
+        root_b = find(b)
+        if root_a == root_b:
+            return False # forced cycle
+        parent[root_a] = root_b
+        size[root_b] = size.get(root_b, 1) + size.get(root_a, 1)
+        forced.setdefault(a, set()).add(b)
+        forced.setdefault(b, set()).add(a)
+        return True
+
+    for cell in free_cells:
+        neighbors = available_neighbors(cell[0], cell[1], head)
+        required_edges = 1 if cell == end_cell else 2
+        if len(neighbors) < required_edges:
+            return None
+        if len(neighbors) == required_edges:
+            for neighbor in neighbors:
+                if not force(cell, neighbor):
+                    return None
+
+    for cell, forced_neighbors in forced.items():
+        max_edges = 1 if cell == end_cell or cell == head else 2
+        if len(forced_neighbors) > max_edges:
+            return None
+    if find(head) == find(end_cell) and size.get(find(head), 1) < len(free_cells) + 1:
+        return None # a forced corridor joins the head to the end cell without visiting every free cell
+    return forced
+
+# Follow the forced edges away from the head and return the cells of the corridor in order
+def forced_chain(forced, head):
+    chain = []
+    prev_cell = None
+    cell = head
+    while True:
+        next_cells = [neighbor for neighbor in forced.get(cell, ()) if neighbor != prev_cell]
+        if not next_cells:
+            return chain
+        prev_cell = cell
+        cell = next_cells[0]
+        chain.append(cell)
+
+def is_saturated(forced, cell):
+    # A cell whose forced edges are all used up can't be entered from the head
+    return len(forced.get(cell, ())) >= (1 if cell == get_end_cell() else 2)
+
+# Place a forced corridor without branching, then continue the search from its last cell. Undo the corridor if that fails.
+def follow_forced_chain(x, y, num, chain):
+    global num_forced_moves
+    global num_branches_saved
+    global num_backtracks
+    global num_moves
+    placed = []
+    prev_x, prev_y = x, y
+    cell_num = num
+    for cell_x, cell_y in chain:
+        cell_num += 1
+        if not is_valid(cell_x, cell_y) or not is_valid2(cell_x, cell_y, cell_num):
+            break
+        if (cell_x, cell_y) != chain[-1]: # fill_path counts the last cell of the chain itself
+            # A forced placement is a move like any other, so long corridors still count toward the restart limit
+            num_moves += 1
+            if num_moves > max_moves:
+                break
+        num_forced_moves += 1
+        if sum(is_valid(prev_x+dx, prev_y+dy) for dx, dy in directions) > 1:
+            num_branches_saved += 1
+        if (cell_x, cell_y) == chain[-1]:
+            if fill_path(cell_x, cell_y, cell_num):
+                return True
+            break
+        matrix[cell_y][cell_x] = cell_num
+        if trace is not None:
+            trace.place(cell_x, cell_y)
+        placed.append((cell_x, cell_y))
+        prev_x, prev_y = cell_x, cell_y
+    for cell_x, cell_y in reversed(placed):
+        matrix[cell_y][cell_x] = 0 # Backtrack the corridor
+        if trace is not None:
+            trace.backtrack(cell_x, cell_y)
+    matrix[y][x] = 0
+    if trace is not None:
+        trace.backtrack(x, y)
+    num_backtracks += len(placed) + 1
+    return False
+
+# Learned move ordering
+# tools/train_move_ordering.py runs the generator many times and records which local features of a candidate move
+# ended up on the finished path. The resulting success rates are stored per grid size in move_ordering.json and are
+# used instead of the randomized Warnsdorff ordering when a table exists for the current grid size. The trainer also
+# measures every table against Warnsdorff on seeds it wasn't trained on, and a table that needed more backtracks is
+# not used.
+use_learned_ordering = True
+learned_ordering_noise = 0.6 # random jitter added to the scores so that restarts explore different paths
+move_ordering_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'move_ordering.json')
+move_ordering_tables = None
+move_ordering_evaluations = None # grid size -> mean backtracks of both orderings, see tools/train_move_ordering.py
+use_evaluations = True # the trainer turns this off to measure a table that has no evaluation yet
+feature_log = None # set to a list to record the candidate features of every branching node (used for training)
+trace = None # set to a search_trace.SearchTrace to record every placed and taken back cell (see tools/trace_viewer.py)
+
+def load_move_ordering():
+    global move_ordering_tables
+    global move_ordering_evaluations
+    if move_ordering_tables is None:
+        move_ordering_tables = {}
+        move_ordering_evaluations = {}
+        if os.path.exists(move_ordering_file):
+            with open(move_ordering_file) as f:
+                data = json.load(f)
+            move_ordering_tables = data['tables']
+            move_ordering_evaluations = data.get('evaluations', {})
+    return move_ordering_tables
+
+def is_learned_ordering_better(size):
+    evaluation = move_ordering_evaluations.get(size)
+    return evaluation is not None and evaluation['learned'] < evaluation['warnsdorff']
+
+def get_move_ordering_table():
+    if not use_learned_ordering:
+        return None
+    size = f'{xSize}x{ySize}'
+    table = load_move_ordering().get(size)
+    # Sizes where the table lost (or was never measured) keep the Warnsdorff ordering
+    if table is None or (use_evaluations and not is_learned_ordering_better(size)):
+        return None
+    return table
+
+# Describe a candidate move from the head (x, y) to (nx, ny) as a short string key:
+# onward degree, distance to the end cell (bucketed), number of walls next to the candidate, and whether the move turns
+def move_feature_key(x, y, nx, ny):
+    degree = sum(is_valid(nx+dx, ny+dy) for dx, dy in directions)
+    end_x, end_y = get_end_cell()
+    distance = abs(nx-end_x) + abs(ny-end_y)
+    if distance <= 1:
+        distance_bucket = 0
+    elif distance <= 3:
+        distance_bucket = 1
+    elif distance <= 7:
+        distance_bucket = 2
+    else:
+        distance_bucket = 3
+    walls = sum(not (0 <= nx+dx < xSize and 0 <= ny+dy < ySize) or matrix[ny+dy][nx+dx] == MASKED for dx, dy in directions)
+    # The start cell is entered from below (+Y), like the first track unit
+    prev_dx, prev_dy = 0, -1
+    for dx, dy in directions:
+        if 0 <= x-dx < xSize and 0 <= y-dy < ySize and matrix[y-dy][x-dx] == matrix[y][x] - 1:
+            prev_dx, prev_dy = dx, dy
+    is_turn = int((nx-x, ny-y) != (prev_dx, prev_dy))
+    return f'{degree}{distance_bucket}{walls}{is_turn}'
+
+# Tuned search parameters
+# tools/autotune.py sweeps these per grid size on seeded runs and writes the fastest combination to
+# tuned_profiles.json. generate_path loads the profile of the requested size and falls back to the defaults below.
+max_moves = 2000 # moves per attempt before the search starts over
+randomize_probability = 0.8 # chance that an onward move is counted in the randomized Warnsdorff ordering
+use_subdividing_check = True
+use_dead_end_check = True
+use_tuned_profiles = True # tools that set the parameters themselves turn this off
+tuned_profiles_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tuned_profiles.json')
+tuned_profiles = None
+tunable_parameters = ['max_moves', 'randomize_probability', 'use_subdividing_check', 'use_dead_end_check',
+                      'use_forced_moves', 'use_learned_ordering', 'learned_ordering_noise']
+default_parameters = None # the values before the first profile was applied
+
+def get_parameters():
+    return {name: globals()[name] for name in tunable_parameters}
+
+def set_parameters(parameters):
+    globals().update({name: value for name, value in parameters.items() if name in tunable_parameters})
+
+def load_tuned_profiles():
+    global tuned_profiles
+    if tuned_profiles is None:
+        tuned_profiles = {}
+        if os.path.exists(tuned_profiles_file):
+            with open(tuned_profiles_file) as f:
+                tuned_profiles = json.load(f)['profiles']
+    return tuned_profiles
+
+def apply_tuned_profile(x_size, y_size):
+    global default_parameters
+    if not use_tuned_profiles:
+        return
+    if default_parameters is None:
+        default_parameters = get_parameters()
+    set_parameters(dict(default_parameters, **load_tuned_profiles().get(f'{x_size}x{y_size}', {})))
+
 def fill_path(x, y, num):
     global num_moves
+    global num_backtracks
     num_moves += 1
-    print("num_moves: ", num_moves)
-    if (num_moves%10) == 0:
+    if verbose:
+        print("num_moves: ", num_moves)
+    if verbose and (num_moves%10) == 0:
         width = len(str(xSize * ySize))
         for row in matrix:
             print(' '.join(f"{cell:>{width}}" for cell in row))
-    if num_moves > 2000: # If the program is struggling with the current path, force the program to generate a new path from scratch
+    if num_moves > max_moves: # If the program is struggling with the current path, force the program to generate a new path from scratch
         return False
-    
+
     matrix[y][x] = num
-    if num == xSize * ySize - 4:
+    if trace is not None:
+        trace.place(x, y)
+    if num == num_cells - 4:
         return True
+    forced = None
+    if use_forced_moves:
+        forced = find_forced_edges((x, y))
+        if forced is None:
+            matrix[y][x] = 0  # Backtrack
+            num_backtracks += 1
+            if trace is not None:
+                trace.backtrack(x, y)
+            return False
+        chain = forced_chain(forced, (x, y))
+        if chain:
+            return follow_forced_chain(x, y, num, chain)
     neighbors = [(x+dx, y+dy) for dx, dy in directions if accept_neighbor(x+dx, y+dy, num+1)]
-    # Warnsdorff's heuristic: sort by number of onward moves (ascending)
-    # Also add some randomness to the sorting
-    neighbors.sort(key=lambda pos: onward_moves_randomized(*pos, 0.8))
+    if forced:
+        neighbors = [pos for pos in neighbors if not is_saturated(forced, pos)]
+    table = get_move_ordering_table()
+    if table or feature_log is not None:
+        keys = {pos: move_feature_key(x, y, *pos) for pos in neighbors}
+        if feature_log is not None and len(neighbors) > 1:
+            feature_log.append((num, (x, y), list(keys.items())))
+    if table:
+        # Try the moves that most often led to a finished path first
+        neighbors.sort(key=lambda pos: random.random()*learned_ordering_noise - table.get(keys[pos], 0.5))
+    else:
+        # Warnsdorff's heuristic: sort by number of onward moves (ascending)
+        # Also add some randomness to the sorting
+        neighbors.sort(key=lambda pos: onward_moves_randomized(*pos, randomize_probability))
     for nx, ny in neighbors:
         if fill_path(nx, ny, num + 1):
             return True
     matrix[y][x] = 0  # Backtrack
+    num_backtracks += 1
+    if trace is not None:
+        trace.backtrack(x, y)
     return False
 
-def generate_path(x_size, y_size):
+# Returns the path matrix. With max_attempts the search gives up after that many restarts and returns None
+def generate_path(x_size, y_size, seed=None, mask=None, max_attempts=None):
     # global matrix
     global num_moves
-    create_matrix(x_size, y_size)
+    global num_forced_moves
+    global num_branches_saved
+    global num_backtracks
+    global num_attempts
+    if seed is not None:
+        random.seed(seed)
+    create_matrix(x_size, y_size, mask)
+    if infeasible_reason:
+        raise ValueError(infeasible_reason)
+    apply_tuned_profile(x_size, y_size)
+    num_forced_moves = 0
+    num_branches_saved = 0
+    num_backtracks = 0
+    num_attempts = 0
     while True:
+        if max_attempts is not None and num_attempts >= max_attempts:
+            return None
         # matrix = [[0 for _ in range(xSize)] for _ in range(ySize)]
         num_moves = 0
+        num_attempts += 1
+        if feature_log is not None:
+            feature_log.clear() # only the successful attempt is used for training
+        if trace is not None:
+            trace.restart()
         if fill_path(2, y_size-1, 1):
             break
+    if verbose:
+        print("forced moves: ", num_forced_moves, " branching nodes saved: ", num_branches_saved)
+    return matrix
+
+# Exhaustive search
+# Used to count paths or prove that there is none (see path_partition.py). It uses the same pruning as fill_path but
+# visits every candidate in a fixed order and has no move limit.
+
+# The cells the path can continue to from the head (x, y), which must already hold num
+def next_cells(x, y, num):
+    forced = None
+    if use_forced_moves:
+        forced = find_forced_edges((x, y))
+        if forced is None:
+            return []
+        chain = forced_chain(forced, (x, y))
+        if chain:
+            nx, ny = chain[0]
+            return [(nx, ny)] if is_valid(nx, ny) and is_valid2(nx, ny, num+1) else []
+    neighbors = [(x+dx, y+dy) for dx, dy in directions if accept_neighbor(x+dx, y+dy, num+1)]
+    if forced:
+        neighbors = [pos for pos in neighbors if not is_saturated(forced, pos)]
+    return neighbors
+
+# Count the paths that continue from (x, y), stopping once limit paths are found. A copy of the first finished
+# matrix is appended to solutions if a list is given. The matrix is left unchanged.
+def search_all(x, y, num, limit=None, solutions=None):
+    matrix[y][x] = num
+    count = 0
+    if num == num_cells - 4:
+        count = 1
+        if solutions is not None and not solutions:
+            solutions.append([row[:] for row in matrix])
+    else:
+        for nx, ny in next_cells(x, y, num):
+            count += search_all(nx, ny, num + 1, None if limit is None else limit - count, solutions)
+            if limit is not None and count >= limit:
+                break
+    matrix[y][x] = 0
+    return count
+
+# The cells of the current path in order, including the end block
+def path_cells():
+    cells = [None] * num_cells
+    for y in range(ySize):
+        for x in range(xSize):
+            if matrix[y][x] > 0:
+                cells[matrix[y][x]-1] = (x, y)
+    return cells
+
+# Make the given cells (in path order, including the end block) the current path
+def set_path(x_size, y_size, cells, mask=None):
+    create_matrix(x_size, y_size, mask)
+    for num, (x, y) in enumerate(cells, start=1):
+        matrix[y][x] = num
     return matrix
 
+# Check that the current matrix holds one continuous path through every cell of the run
+def is_complete_path():
+    cells = path_cells()
+    if None in cells or cells[0] != (2, ySize-1):
+        return False
+    return all(abs(x1-x2) + abs(y1-y2) == 1 for (x1, y1), (x2, y2) in zip(cells, cells[1:]))
+
 def is_within_bounds(row, col):
     return 0 <= col < xSize and 0 <= row < ySize
 
@@ -218,31 +727,35 @@ def generate_type_matrix():
     for row in range(len(type_matrix)):
         for col in range(len(type_matrix[0])):
             cell_val = matrix[row][col]
+            if cell_val == MASKED:
+                type_matrix[row][col] = None # no track unit in masked cells
+                continue
             prev_cell_dir = 0
             next_cell_dir = 0
             if cell_val > 1:
                 prev_cell_dir = find_prev_cell([row, col])
-            if cell_val < len(type_matrix)*len(type_matrix[0]):
+            if cell_val < num_cells:
                 next_cell_dir = find_next_cell([row, col])
             if cell_val == 1:
                 prev_cell_dir = 1
-            if cell_val == len(type_matrix)*len(type_matrix[0]):
+            if cell_val == num_cells:
                 next_cell_dir = 3
             track_type_key = (prev_cell_dir, next_cell_dir)
             type_matrix[row][col] = track_type_dict[track_type_key]
     return type_matrix
 
-the_matrix = generate_path(xSize, ySize)
-type_matrix = generate_type_matrix()
+if __name__ == '__main__':
+    the_matrix = generate_path(xSize, ySize)
+    type_matrix = generate_type_matrix()
 
 
-width = len(str(xSize * ySize))
-print()
-for row in the_matrix:
-    print(' '.join(f"{cell:>{width}}" for cell in row))
-print()
-for row in type_matrix:
-    print(' '.join(f"{cell:>{width}}" for cell in row))
+    width = len(str(xSize * ySize))
+    print()
+    for row in the_matrix:
+        print(' '.join(f"{cell:>{width}}" for cell in row))
+    print()
+    for row in type_matrix:
+        print(' '.join(f"{cell:>{width}}" for cell in row))
 
 
 
@@ -0,0 +1,113 @@
+# Parallel subtree partitioning for exhaustive path searches.
+# The search tree of path_generator is cut at a fixed shallow depth. Every path prefix of that depth is an independent
+# subtree that is searched by a worker process with the same pruning rules as fill_path (accept_neighbor and the
+# forced-move propagation). Workers pull prefixes from a shared queue one at a time, so a worker that finishes a small
+# subtree immediately takes the next one, and the per-prefix results are merged as they arrive.
+# This is used to count paths exactly or to prove that an instance has no path, which random restarts can't do.
+import multiprocessing
+import os
+
+try:
+    from . import path_generator
+except ImportError:
+    import path_generator
+
+
+# Enumerate the path prefixes of the given length. Prefixes that already complete the path are returned as well.
+def enumerate_prefixes(x_size, y_size, depth, mask=None):
+    path_generator.verbose = False
+    path_generator.create_matrix(x_size, y_size, mask)
+    if path_generator.infeasible_reason:
+        return [] # the shape of the run already rules out every path
+    start_cell = (2, y_size-1)
+    prefixes = []
+
+    def extend(prefix):
+        x, y = prefix[-1]
+        num = len(prefix)
+        path_generator.matrix[y][x] = num
+        if len(prefix) == depth or num == path_generator.num_cells - 4:
+            prefixes.append(list(prefix))
+        else:
+            for neighbor in path_generator.next_cells(x, y, num):
+                extend(prefix + [neighbor])
+        path_generator.matrix[y][x] = 0
+
+    extend([start_cell])
+    return prefixes
+
+
+# Search the subtree below one prefix. Returns the number of paths found and the first finished matrix (or None)
+def search_prefix(task):
+    x_size, y_size, mask, prefix, limit = task
+    path_generator.verbose = False
+    path_generator.create_matrix(x_size, y_size, mask)
+    for num, (x, y) in enumerate(prefix[:-1], start=1):
+        path_generator.matrix[y][x] = num
+    solutions = []
+    x, y = prefix[-1]
+    count = path_generator.search_all(x, y, len(prefix), limit, solutions)
+    return count, (solutions[0] if solutions else None)
+
+
+def default_depth(x_size, y_size, processes, mask=None):
+    # Aim for several prefixes per process so that uneven subtrees even out
+    depth = 2
+    while depth < x_size * y_size - 4 and 0 < len(enumerate_prefixes(x_size, y_size, depth, mask)) < 8 * processes:
+        depth += 2
+    return depth
+
+
+def run_partitioned(x_size, y_size, limit=None, depth=None, processes=None, mask=None):
+    processes = processes or os.cpu_count() or 1
+    if depth is None:
+        depth = default_depth(x_size, y_size, processes, mask)
+    prefixes = enumerate_prefixes(x_size, y_size, depth, mask)
+    # Each prefix gets the full limit, the merged count is cut down to the limit afterwards
+    tasks = [(x_size, y_size, mask, prefix, limit) for prefix in prefixes]
+    total = 0
+    solution = None
+    if processes == 1:
+        results = map(search_prefix, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes)
+        results = pool.imap_unordered(search_prefix, tasks, chunksize=1)
+    try:
+        for count, prefix_solution in results:
+            total += count
+            if solution is None:
+                solution = prefix_solution
+            if limit is not None and total >= limit:
+                break
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if limit is not None:
+        total = min(total, limit)
+    return total, solution
+
+
+# Count every path of the grid that satisfies the generator's rules
+def count_paths(x_size, y_size, depth=None, processes=None, mask=None):
+    return run_partitioned(x_size, y_size, None, depth, processes, mask)[0]
+
+
+# Find one path, or prove that there is none. Returns the path matrix or None if the instance is infeasible.
+def find_path(x_size, y_size, depth=None, processes=None, mask=None):
+    count, solution = run_partitioned(x_size, y_size, 1, depth, processes, mask)
+    if count == 0:
+        return None
+    path_generator.create_matrix(x_size, y_size, mask)
+    path_generator.matrix[:] = solution
+    return path_generator.matrix
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    x_size = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    y_size = int(sys.argv[2]) if len(sys.argv) > 2 else x_size
+    start_time = time.perf_counter()
+    print(f'{x_size}x{y_size}: {count_paths(x_size, y_size)} paths in {time.perf_counter() - start_time:.2f} s')
@@ -0,0 +1,66 @@
+# State of a generated run, stored as a design attribute so that the Edit Marble Run command can reopen the run and redo
+# only what its changes affect. Every run has its own attribute in attribute_group, named after the run's timeline
+# group. The path is stored as a chain of directions from the start cell, 2 bits per cell
+# (the direction codes of track_layout.steps), packed four to a byte and base64 encoded.
+import base64
+import json
+
+try:
+    from . import track_layout
+except ImportError:
+    import track_layout
+
+version = 1
+attribute_group = 'MarbleRunStates'
+
+# Inputs of the dialog that affect the path. Every change redoes the layout (placing, joining and finishing the tiles),
+# and the path is only redone when one of these inputs changed. The tiles have no stage of their own: the build reuses
+# the stored tiles whose key (see the base tiles key in logic.py) matches the new values, which also covers changes
+# that don't alter the tiles, e.g. Fast Build or the same diameter typed in other units
+path_inputs = ['num_x_cells', 'num_y_cells', 'masked_cells']
+
+
+def encode_path(cells):
+    directions = [track_layout.direction_between(cell_1, cell_2) for cell_1, cell_2 in zip(cells, cells[1:])]
+    packed = bytearray((len(directions) + 3) // 4)
+    for i, direction in enumerate(directions):
+        packed[i // 4] |= direction << (2 * (i % 4))
+    return {'Start': list(cells[0]), 'Length': len(cells), 'Chain': base64.b64encode(bytes(packed)).decode('ascii')}
+
+
+def decode_path(path):
+    packed = base64.b64decode(path['Chain'])
+    cells = [tuple(path['Start'])]
+    for i in range(path['Length'] - 1):
+        dx, dy = track_layout.steps[(packed[i // 4] >> (2 * (i % 4))) & 3]
+        cells.append((cells[-1][0] + dx, cells[-1][1] + dy))
+    return cells
+
+
+def make_state(input_values, seed, engine, cells, group_name, tiles_key=None):
+    # tiles_key is the key of the stored base tiles that the run uses, None if its tiles aren't stored
+    return {'Version': version, 'Inputs': input_values, 'Seed': seed, 'Engine': engine, 'Path': encode_path(cells),
+            'Group': group_name, 'Tiles': tiles_key}
+
+
+def dumps(state):
+    return json.dumps(state, separators=(',', ':'))
+
+
+def loads(text):
+    state = json.loads(text)
+    if state.get('Version') != version:
+        return None
+    return state
+
+
+def changed_stages(state, input_values, reroll_cells=None):
+    """Return the set of stages ('path', 'layout') that the new input values require, empty if none."""
+    old_values = state['Inputs']
+    changed = {id for id in input_values if old_values.get(id) != input_values[id]}
+    stages = set()
+    if changed & set(path_inputs) or reroll_cells:
+        stages.add('path')
+    if changed or reroll_cells:
+        stages.add('layout')
+    return stages
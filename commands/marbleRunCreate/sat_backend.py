@@ -0,0 +1,97 @@
+# Optional CP-SAT backend.
+# Hard instances (masks with narrow corridors, runs that have no path at all) can keep the randomized backtracking
+# search restarting for a long time. If OR-tools is installed, the path is instead written as a circuit problem and
+# handed to its CP-SAT solver, which either finds a path, proves that there is none, or stops at the time limit.
+# Without OR-tools the pure-Python search is used with a bounded number of restarts.
+#
+# The model: every free cell of create_matrix is a node and every pair of neighboring free cells gets an arc in both
+# directions. The path from the start cell to the end cell plus a fixed closing arc from the end cell back to the
+# start cell has to form one circuit through all nodes. The end block is already filled by create_matrix, and a
+# circuit can only reach the end cell last, which is what is_valid2 checks for the backtracking search.
+import time
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:
+    cp_model = None
+
+try:
+    from . import path_generator
+except ImportError:
+    import path_generator
+
+last_status = None # 'solved', 'infeasible' or 'timeout'
+last_solve_time = 0.0
+# CP-SAT runs a portfolio of different strategies. Even on one core, several of them find grid paths far more reliably
+# than a single strategy
+num_workers = 8
+
+
+def is_available():
+    return cp_model is not None
+
+
+def solve_circuit(time_limit, seed):
+    cells = [(x, y) for y in range(path_generator.ySize) for x in range(path_generator.xSize)
+             if path_generator.matrix[y][x] == 0]
+    node = {cell: i for i, cell in enumerate(cells)}
+    start_cell = (2, path_generator.ySize-1)
+    end_cell = path_generator.get_end_cell()
+
+    model = cp_model.CpModel()
+    arcs = []
+    cell_arcs = []
+    for cell in cells:
+        for neighbor in path_generator.free_neighbors(*cell):
+            if neighbor not in node or cell == end_cell or neighbor == start_cell:
+                continue # nothing leaves the end cell or enters the start cell except the closing arc
+            literal = model.NewBoolVar(f'{cell}->{neighbor}')
+            arcs.append((node[cell], node[neighbor], literal))
+            cell_arcs.append((cell, neighbor, literal))
+    arcs.append((node[end_cell], node[start_cell], model.NewConstant(1)))
+    model.AddCircuit(arcs)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.random_seed = seed or 0
+    solver.parameters.num_workers = num_workers
+    status = solver.Solve(model)
+    if status == cp_model.INFEASIBLE:
+        return 'infeasible', None
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return 'timeout', None
+
+    successor = {}
+    for cell, neighbor, literal in cell_arcs:
+        if solver.BooleanValue(literal):
+            successor[cell] = neighbor
+    path = [start_cell]
+    while path[-1] != end_cell:
+        path.append(successor[path[-1]])
+    return 'solved', path
+
+
+# Generate a path with CP-SAT if it is installed, else with the backtracking search (at most max_attempts restarts).
+# Returns the path matrix, or None if no path was found in time (last_status tells why). Raises ValueError if the run
+# has no path at all.
+def generate_path_sat(x_size, y_size, seed=None, mask=None, time_limit=10.0, max_attempts=20):
+    global last_status
+    global last_solve_time
+    start_time = time.perf_counter()
+    path_generator.create_matrix(x_size, y_size, mask)
+    if path_generator.infeasible_reason:
+        last_status = 'infeasible'
+        raise ValueError(path_generator.infeasible_reason)
+    if cp_model is None:
+        matrix = path_generator.generate_path(x_size, y_size, seed, mask, max_attempts)
+        last_status = 'solved' if matrix is not None else 'timeout'
+        last_solve_time = time.perf_counter() - start_time
+        return matrix
+
+    last_status, path = solve_circuit(time_limit, seed)
+    last_solve_time = time.perf_counter() - start_time
+    if last_status == 'infeasible':
+        raise ValueError('There is no path through all cells of this run')
+    if path is None:
+        return None
+    return path_generator.set_path(x_size, y_size, path, mask)
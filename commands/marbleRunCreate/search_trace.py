@@ -0,0 +1,97 @@
+# Compact recorder for the backtracking search.
+# Set path_generator.trace to a SearchTrace and every cell the search places or takes back is logged as a 3 byte event
+# (2 bits operation, 22 bits cell index) in a fixed size ring buffer, so a long search keeps its most recent events
+# without growing. With sample_every > 1 only every n-th place/backtrack event is stored, which keeps the buffer cheap on
+# large searches; the per-cell place and backtrack counts are always exact. Restarts are always stored.
+# tools/trace_viewer.py replays a trace as an animated HTML page and draws the backtrack heatmap.
+import array
+import struct
+
+PLACE = 0
+BACKTRACK = 1
+RESTART = 2
+event_size = 3
+cell_bits = 22
+header_format = '<4sBHHIQQ' # magic, version, x size, y size, sample_every, number of events, number of stored events
+magic = b'MRTR'
+
+
+class SearchTrace:
+    def __init__(self, x_size, y_size, capacity=1000000, sample_every=1):
+        self.x_size = x_size
+        self.y_size = y_size
+        self.capacity = capacity
+        self.sample_every = sample_every
+        self.buffer = bytearray(capacity * event_size)
+        self.num_events = 0 # every event seen, stored or not
+        self.num_stored = 0 # events written to the buffer, including the ones that were overwritten since
+        self.num_skipped = 0
+        self.place_counts = array.array('I', bytes(4 * x_size * y_size))
+        self.backtrack_counts = array.array('I', bytes(4 * x_size * y_size))
+
+    def record(self, op, cell):
+        self.num_events += 1
+        if op != RESTART:
+            self.num_skipped += 1
+            if self.num_skipped < self.sample_every:
+                return
+            self.num_skipped = 0
+        value = op << cell_bits | cell
+        position = (self.num_stored % self.capacity) * event_size
+        self.buffer[position] = value & 0xff
+        self.buffer[position+1] = (value >> 8) & 0xff
+        self.buffer[position+2] = value >> 16
+        self.num_stored += 1
+
+    def place(self, x, y):
+        cell = y * self.x_size + x
+        self.place_counts[cell] += 1
+        self.record(PLACE, cell)
+
+    def backtrack(self, x, y):
+        cell = y * self.x_size + x
+        self.backtrack_counts[cell] += 1
+        self.record(BACKTRACK, cell)
+
+    def restart(self):
+        self.record(RESTART, 0)
+
+    # The stored events, oldest first, as raw 3 byte records
+    def event_bytes(self):
+        if self.num_stored <= self.capacity:
+            return bytes(self.buffer[:self.num_stored * event_size])
+        split = (self.num_stored % self.capacity) * event_size
+        return bytes(self.buffer[split:] + self.buffer[:split])
+
+    # The stored events, oldest first, as (op, x, y)
+    def events(self):
+        data = self.event_bytes()
+        for position in range(0, len(data), event_size):
+            value = data[position] | data[position+1] << 8 | data[position+2] << 16
+            cell = value & ((1 << cell_bits) - 1)
+            yield value >> cell_bits, cell % self.x_size, cell // self.x_size
+
+    def save(self, file_name):
+        data = self.event_bytes()
+        with open(file_name, 'wb') as f:
+            f.write(struct.pack(header_format, magic, 1, self.x_size, self.y_size, self.sample_every, self.num_events,
+                                len(data) // event_size))
+            f.write(data)
+            f.write(self.place_counts.tobytes())
+            f.write(self.backtrack_counts.tobytes())
+
+
+def load(file_name):
+    with open(file_name, 'rb') as f:
+        header = f.read(struct.calcsize(header_format))
+        file_magic, version, x_size, y_size, sample_every, num_events, num_stored = struct.unpack(header_format, header)
+        if file_magic != magic:
+            raise ValueError(f'{file_name} is not a search trace')
+        trace = SearchTrace(x_size, y_size, max(num_stored, 1), sample_every)
+        data = f.read(num_stored * event_size)
+        trace.buffer[:len(data)] = data
+        trace.num_stored = num_stored
+        trace.num_events = num_events
+        trace.place_counts = array.array('I', f.read(4 * x_size * y_size))
+        trace.backtrack_counts = array.array('I', f.read(4 * x_size * y_size))
+    return trace
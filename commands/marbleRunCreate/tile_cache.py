@@ -0,0 +1,92 @@
+# On-disk cache of the base tiles, shared by all documents. Building the twelve tiles takes five sketches and about
+# fifty features, so a build with tile values that were used before (e.g. the default ball) loads them from here instead.
+# Every entry is a folder named after a hash of the key with one SMT file per track type and the key itself. The folders
+# are used in least recently used order: loading an entry touches it, and storing one evicts the oldest entries until
+# the cache fits into max_cache_bytes.
+import hashlib
+import json
+import os
+import shutil
+
+import adsk.core
+import adsk.fusion
+
+cache_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tile_cache')
+max_cache_bytes = 50 * 1024 * 1024
+is_enabled = True
+file_extension = '.smt' # the native format of the Fusion modelling kernel, the tiles are read back without conversion
+
+
+def entry_folder(key):
+    return os.path.join(cache_folder, hashlib.sha1(key.encode()).hexdigest()[:16])
+
+
+def tile_file(folder, index):
+    return os.path.join(folder, f'{index}{file_extension}')
+
+
+def load(key, num_tiles):
+    """Return the cached tiles for key as temporary bodies in the order they were stored, or None on a miss."""
+    folder = entry_folder(key)
+    try:
+        with open(os.path.join(folder, 'key.json')) as f:
+            if json.load(f) != key:
+                return None
+        temp_brep_manager = adsk.fusion.TemporaryBRepManager.get()
+        bodies = []
+        for index in range(num_tiles):
+            tile_bodies = temp_brep_manager.createFromFile(tile_file(folder, index))
+            if tile_bodies is None or tile_bodies.count != 1:
+                return None
+            bodies.append(tile_bodies.item(0))
+    except (OSError, ValueError, RuntimeError): # no entry, a broken key file or a file the kernel can't read
+        return None
+    os.utime(folder) # most recently used
+    return bodies
+
+
+def store(key, bodies):
+    """Export the tiles for key and evict the least recently used entries. A failed export leaves no entry behind."""
+    folder = entry_folder(key)
+    temp_folder = folder + '.tmp'
+    temp_brep_manager = adsk.fusion.TemporaryBRepManager.get()
+    try:
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        os.makedirs(temp_folder)
+        for index, body in enumerate(bodies):
+            if not temp_brep_manager.exportToFile([body], tile_file(temp_folder, index)):
+                raise RuntimeError(f'the tile {body.name} could not be exported')
+        # The key is written last, an entry without it is never loaded
+        with open(os.path.join(temp_folder, 'key.json'), 'w') as f:
+            json.dump(key, f)
+        shutil.rmtree(folder, ignore_errors=True)
+        os.replace(temp_folder, folder)
+    except (OSError, RuntimeError):
+        shutil.rmtree(temp_folder, ignore_errors=True)
+        return False
+    evict(keep=folder)
+    return True
+
+
+def folder_size(folder):
+    return sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+
+
+def evict(keep=None):
+    """Remove the least recently used entries until the cache fits into max_cache_bytes. keep is never removed."""
+    entries = []
+    for name in os.listdir(cache_folder):
+        folder = os.path.join(cache_folder, name)
+        if os.path.isdir(folder):
+            entries.append((os.path.getmtime(folder), folder, folder_size(folder)))
+    total_size = sum(size for _, _, size in entries)
+    for _, folder, size in sorted(entries):
+        if total_size <= max_cache_bytes:
+            break
+        if folder != keep:
+            shutil.rmtree(folder, ignore_errors=True)
+            total_size -= size
+
+
+def clear():
+    shutil.rmtree(cache_folder, ignore_errors=True)
@@ -0,0 +1,59 @@
+# Solved coordinates of the base tile sketches, so that the Fast Build can draw the tiles without constraints and
+# dimensions and still get the same geometry as the parametric build.
+# Every function returns the points of one sketch as (x, y) in that sketch's own coordinates (cm), where the sketch
+# solver puts them for the dimension expressions in logic.HandleExecute. In the sketches on the XZ plane a larger y is
+# lower in the model, so material "below" the ball path has a larger y.
+import math
+
+try:
+    from . import track_layout
+except ImportError:
+    import track_layout
+
+version = 1 # increase when the shape of the tiles changes, so that stored tiles aren't reused
+margin = 0.5 # 5 mm between the ends of the ball path lines and the tile edges
+floor_thickness = 0.25 # 2.5 mm of material under the groove
+
+
+# y of the line through (x_0, y_0) with the given slope, moved by a perpendicular offset
+def offset_line_y(x, x_0, y_0, slope, offset):
+    return y_0 + slope*(x - x_0) + offset*math.sqrt(1 + slope**2)
+
+
+# 'Straight Track' sketch: the ball path through the origin and the profile of the track block under it
+def straight_track(ball_diameter, clearance, slope):
+    diameter = track_layout.cell_size(ball_diameter, clearance)
+    top_y = [offset_line_y(x, 0, 0, slope, diameter/4) for x in [-diameter/2, diameter/2]]
+    bottom_y = [offset_line_y(x, 0, 0, slope, diameter/2 + floor_thickness) for x in [-diameter/2, diameter/2]]
+    return {
+        'ball_path': ((-diameter/2 - margin, -slope*(diameter/2 + margin)), (diameter/2 + margin, slope*(diameter/2 + margin))),
+        'top': ((-diameter/2, top_y[0]), (diameter/2, top_y[1])),
+        'bottom': ((-diameter/2, bottom_y[0]), (diameter/2, bottom_y[1])),
+    }
+
+
+# 'Bent Track Input' sketch (YZ plane): the incoming ball path and the reference point for the top of the block
+def bent_track_input(ball_diameter, clearance, slope):
+    diameter = track_layout.cell_size(ball_diameter, clearance)
+    return {
+        'input_path': ((0, 0), (-slope*(diameter/2 + margin), -(diameter/2 + margin))),
+        # diameter/4 from the input path, half a cell away from its start
+        'extrude_ref_point': (offset_line_y(-diameter/2, 0, 0, slope, diameter/4), -diameter/2),
+    }
+
+
+# 'Bent Track Output' sketch (XZ plane): the block outline, the two outgoing ball path lines and the trimming line
+def bent_track_output(ball_diameter, clearance, slope):
+    diameter = track_layout.cell_size(ball_diameter, clearance)
+    input_points = bent_track_input(ball_diameter, clearance, slope)
+    top_y = input_points['extrude_ref_point'][0] # the reference point projected onto the XZ plane
+    bend_point = (ball_diameter/4, track_layout.super_slope*ball_diameter/4)
+    end_point = (bend_point[0] + ball_diameter/2, bend_point[1] + slope*ball_diameter/2)
+    bottom_y = offset_line_y(diameter/2, bend_point[0], bend_point[1], slope, diameter/2 + floor_thickness)
+    trim_y = offset_line_y(diameter/2, bend_point[0], bend_point[1], slope, diameter/4)
+    return {
+        'rectangle': ((-diameter/2, top_y), (diameter/2, bottom_y)),
+        'steep_path': ((0, 0), bend_point),
+        'output_path': (bend_point, end_point),
+        'trimming_line': ((0, top_y), (diameter/2, trim_y)),
+    }
@@ -0,0 +1,63 @@
+# Where every track tile of a path goes, without any Fusion calls.
+# Cells are (x, y) grid positions with y counting rows towards the front, like path_generator. Directions use the codes of
+# path_generator.track_type_dict: 0: +X, 1: +Y (one row back), 2: -X, 3: -Y (one row to the front).
+try:
+    from . import path_generator
+except ImportError:
+    import path_generator
+
+super_slope = 0.15 # slope used for the first segment of the bent track output path. 0.15 slope corresponds to an angle of 8.53 degrees
+steps = {0: (1, 0), 1: (0, -1), 2: (-1, 0), 3: (0, 1)} # direction -> (dx, dy) in grid cells
+
+
+def cell_size(ball_diameter, clearance):
+    return ball_diameter + 2*clearance
+
+
+# Height lost in a straight cell and in a bent cell
+def z_drops(ball_diameter, clearance, slope):
+    diameter = cell_size(ball_diameter, clearance)
+    straight_drop = diameter*slope
+    bend_drop = slope*(diameter/2) + super_slope*(ball_diameter/4) + slope*(diameter/2-ball_diameter/4)
+    return straight_drop, bend_drop
+
+
+def direction_between(cell_1, cell_2):
+    for direction, step in steps.items():
+        if (cell_1[0]+step[0], cell_1[1]+step[1]) == cell_2:
+            return direction
+    return None
+
+
+# Track type of every cell of the path. The marble enters the first cell moving in entry_direction and leaves the
+# last one moving in exit_direction (the defaults are those of a full run from path_generator).
+def tile_types(cells, entry_direction=1, exit_direction=3):
+    types = []
+    for i, cell in enumerate(cells):
+        prev_direction = direction_between(cells[i-1], cell) if i > 0 else entry_direction
+        next_direction = direction_between(cell, cells[i+1]) if i < len(cells)-1 else exit_direction
+        types.append(path_generator.track_type_dict[(prev_direction, next_direction)])
+    return types
+
+
+def is_straight(tile_type):
+    return tile_type in [0, 1, 2, 3]
+
+
+# Position of every tile as (x, y, z), with origin the position of the tile in cell (0, 0) of the path's first cell
+# height. Returns the positions and the height at which the marble leaves the last cell.
+def layout_cells(cells, types, ball_diameter, clearance, slope, origin=(0.0, 0.0, 0.0)):
+    diameter = cell_size(ball_diameter, clearance)
+    straight_drop, bend_drop = z_drops(ball_diameter, clearance, slope)
+    positions = []
+    z_pos = origin[2]
+    for (x, y), tile_type in zip(cells, types):
+        positions.append((origin[0] + x*diameter, origin[1] - y*diameter, z_pos))
+        z_pos -= straight_drop if is_straight(tile_type) else bend_drop
+    return positions, z_pos
+
+
+# Total height lost along the path
+def total_drop(types, ball_diameter, clearance, slope):
+    straight_drop, bend_drop = z_drops(ball_diameter, clearance, slope)
+    return sum(straight_drop if is_straight(tile_type) else bend_drop for tile_type in types)
@@ -0,0 +1,140 @@
+import adsk.core
+import os
+from ...lib import fusionAddInUtils as futil
+from ... import config
+from ..marbleRunCreate import entry as create_entry
+from ..marbleRunCreate import logic
+
+app = adsk.core.Application.get()
+ui = app.userInterface
+
+marble_run_logic: logic.MarbleRunLogic = None
+
+# Specify the command identity information.
+CMD_ID = f'{config.COMPANY_NAME}_{config.ADDIN_NAME}_marbleRunEdit'
+CMD_NAME = 'Edit Marble Run'
+CMD_Description = ('Reopens a marble run of the design with its inputs: the selected run, or the last one if no run is selected. '
+                   'Only the parts of the run that the changes affect are built again.')
+
+# Specify that the command will be promoted to the panel.
+IS_PROMOTED = False
+
+# The command is placed right after the Marble Run Generator command in the same panel.
+WORKSPACE_ID = create_entry.WORKSPACE_ID
+PANEL_ID = create_entry.PANEL_ID
+COMMAND_BESIDE_ID = create_entry.CMD_ID
+
+# Local list of event handlers used to maintain a reference so
+# they are not released and garbage collected.
+local_handlers = []
+
+
+# Executed when the add-in is loaded. The button to execute the command
+# is created and the event handler to handle when the command is run is connected.
+def start():
+    # General logging for debug.
+    futil.log(f'{CMD_NAME} started')
+
+    # Delete the existing command, in case it wasn't correctly deleted during a failed execution.
+    cmdDef = ui.commandDefinitions.itemById(CMD_ID)
+    if cmdDef:
+        cmdDef.deleteMe()
+
+    # The icons are shared with the Marble Run Generator command.
+    icon_folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'marbleRunCreate', 'resources', 'DefaultIcons')
+
+    # Create a command Definition.
+    cmd_def = ui.commandDefinitions.addButtonDefinition(CMD_ID, CMD_NAME, CMD_Description, icon_folder)
+
+    # Define an event handler for the command created event. It will be called when the button is clicked.
+    futil.add_handler(cmd_def.commandCreated, command_created)
+
+    # Add a button into the UI after the Marble Run Generator button.
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(PANEL_ID)
+    control = panel.controls.addCommand(cmd_def, COMMAND_BESIDE_ID, False)
+    control.isPromoted = IS_PROMOTED
+
+
+# Executed when add-in is stopped.
+def stop():
+    # General logging for debug.
+    futil.log(f'{CMD_NAME} stopped')
+
+    # Gets the toolbar panel containing the button.
+    workspace = ui.workspaces.itemById(WORKSPACE_ID)
+    panel = workspace.toolbarPanels.itemById(PANEL_ID)
+
+    # Delete the button command control.
+    cntrl = panel.controls.itemById(CMD_ID)
+    if cntrl:
+        cntrl.deleteMe()
+
+    # Delete the command definition.
+    cmdDef = ui.commandDefinitions.itemById(CMD_ID)
+    if cmdDef:
+        cmdDef.deleteMe()
+
+
+# Function that is called when a user clicks the corresponding button in the UI.
+# The dialog is the one of the Marble Run Generator, filled in with the stored state of the last run.
+def command_created(args: adsk.core.CommandCreatedEventArgs):
+    # General logging for debug.
+    futil.log(f'{CMD_NAME} Command Created Event')
+
+    des: adsk.fusion.Design = app.activeProduct
+    if des is None:
+        return
+
+    # Create an instance of the command class with the state of the last run.
+    global marble_run_logic
+    marble_run_logic = logic.MarbleRunLogic(des, is_edit=True)
+    if marble_run_logic.edit_state is None:
+        # Without inputs and an execute handler the command ends right away
+        ui.messageBox('There is no marble run to edit in this design.', CMD_NAME)
+        return
+
+    # Setup the event handlers needed for this command.
+    futil.add_handler(args.command.execute, command_execute, local_handlers=local_handlers)
+    futil.add_handler(args.command.inputChanged, command_input_changed, local_handlers=local_handlers)
+    futil.add_handler(args.command.destroy, command_destroy, local_handlers=local_handlers)
+    futil.add_handler(args.command.validateInputs, command_validate_inputs, local_handlers=local_handlers)
+
+    cmd = args.command
+    cmd.isExecutedWhenPreEmpted = False
+
+    # Define the dialog by creating the command inputs.
+    marble_run_logic.CreateCommandInputs(cmd.commandInputs)
+
+
+# This event handler is called when the user clicks the OK button in the command dialog.
+def command_execute(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log(f'{CMD_NAME} Command Execute Event')
+
+    marble_run_logic.HandleExecute(args)
+
+
+# This event handler is called when the user changes anything in the command dialog
+# allowing you to modify values of other inputs based on that change.
+def command_input_changed(args: adsk.core.InputChangedEventArgs):
+    futil.log(f'{CMD_NAME} Input Changed Event fired from a change to {args.input.id}')
+
+    marble_run_logic.HandleInputsChanged(args)
+
+
+# This event handler is called when the user interacts with any of the inputs in the dialog
+# which allows you to verify that all of the inputs are valid and enables the OK button.
+def command_validate_inputs(args: adsk.core.CommandEventArgs):
+    futil.log(f'{CMD_NAME} Validate Inputs Event fired.')
+
+    marble_run_logic.HandleValidateInputs(args)
+
+
+# This event handler is called when the command terminates.
+def command_destroy(args: adsk.core.CommandEventArgs):
+    # General logging for debug.
+    futil.log(f'{CMD_NAME} Command Destroy Event')
+
+    global local_handlers
+    local_handlers = []
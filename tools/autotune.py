@@ -0,0 +1,101 @@
+# Autotuner for the search parameters of path_generator.
+# For every grid size it sweeps one parameter at a time over its candidate values (keeping the best value found so far
+# for the others), measures the time to a path on seeded runs and scores each setting by its mean time plus its
+# tail (90th percentile) time. The best setting per size is written to tuned_profiles.json, which generate_path loads
+# at run time. Only parameters that differ from the defaults are stored.
+#
+# Usage: python tools/autotune.py --sizes 9x9 11x11 13x13 15x13 15x15 --seeds 10
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'commands', 'marbleRunCreate'))
+import path_generator
+
+candidate_values = {
+    'max_moves': [500, 1000, 2000, 4000, 8000],
+    # 1.0 would make the Warnsdorff ordering deterministic, so every seed would give the same path
+    'randomize_probability': [0.5, 0.65, 0.8, 0.9, 0.95],
+    'use_subdividing_check': [True, False],
+    'use_dead_end_check': [True, False],
+    'use_forced_moves': [True, False],
+    'use_learned_ordering': [True, False],
+    'learned_ordering_noise': [0.3, 0.6, 1.0],
+}
+max_attempts = 200 # a setting that needs more restarts than this counts as failed for that seed
+tail_weight = 0.5
+
+
+def parse_size(text):
+    x_size, y_size = text.lower().split('x')
+    return int(x_size), int(y_size)
+
+
+# Returns (score, mean time, 90th percentile time). A setting that is already far slower than the best one after
+# some of the seeds is cut short with an infinite score
+def measure(x_size, y_size, parameters, seeds, budget=None):
+    path_generator.set_parameters(parameters)
+    times = []
+    for seed in seeds:
+        if budget is not None and sum(times) > budget:
+            return float('inf'), float('inf'), float('inf')
+        start_time = time.perf_counter()
+        matrix = path_generator.generate_path(x_size, y_size, seed, max_attempts=max_attempts)
+        elapsed = time.perf_counter() - start_time
+        times.append(elapsed if matrix is not None else elapsed * 10)
+    tail = sorted(times)[int(0.9 * (len(times) - 1))]
+    return statistics.mean(times) + tail_weight * tail, statistics.mean(times), tail
+
+
+def tune_size(x_size, y_size, seeds, passes):
+    best = dict(path_generator.default_parameters)
+    best_score = measure(x_size, y_size, best, seeds)
+    print(f'{x_size}x{y_size} defaults: mean {best_score[1]:.3f} s, p90 {best_score[2]:.3f} s', flush=True)
+    for _ in range(passes):
+        is_improved = False
+        for name, values in candidate_values.items():
+            for value in values:
+                if value == best[name]:
+                    continue
+                parameters = dict(best, **{name: value})
+                score = measure(x_size, y_size, parameters, seeds, budget=2 * best_score[0] * len(seeds))
+                if score[0] < best_score[0]:
+                    best, best_score = parameters, score
+                    is_improved = True
+                    print(f'  {name} = {value}: mean {score[1]:.3f} s, p90 {score[2]:.3f} s', flush=True)
+        if not is_improved:
+            break
+    return {name: value for name, value in best.items() if value != path_generator.default_parameters[name]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tune the path search parameters per grid size.')
+    parser.add_argument('--sizes', nargs='+', default=['9x9', '11x11', '13x13', '15x13', '15x15'])
+    parser.add_argument('--seeds', type=int, default=10, help='number of seeded runs per setting')
+    parser.add_argument('--passes', type=int, default=2, help='number of sweeps over all parameters')
+    parser.add_argument('--output', default=path_generator.tuned_profiles_file)
+    args = parser.parse_args()
+
+    path_generator.verbose = False
+    path_generator.use_tuned_profiles = False
+    path_generator.default_parameters = path_generator.get_parameters()
+    profiles = {}
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            profiles = json.load(f)['profiles']
+    # The measured seeds are kept apart from the seeds 0-9 that the benchmark uses
+    seeds = range(1000, 1000 + args.seeds)
+    for size in args.sizes:
+        x_size, y_size = parse_size(size)
+        profiles[f'{x_size}x{y_size}'] = tune_size(x_size, y_size, seeds, args.passes)
+        print(f'{x_size}x{y_size}: {profiles[f"{x_size}x{y_size}"]}', flush=True)
+    with open(args.output, 'w') as f:
+        json.dump({'version': 1, 'profiles': profiles}, f, indent=1, sort_keys=True)
+    print(f'wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# Benchmark for the geometry build in logic.py, run outside Fusion against the recording fake adsk package in
+# tools/fake_adsk. For every grid size the whole HandleExecute runs once and the number of API calls and timeline
+# features is reported, also per cell, for each build mode of the dialog, with and without Fast Build, and for each
+# union strategy together with the number of joins and the largest join (tool bodies in one combine or boolean).
+# The tile cache of the add-in is moved to a temporary folder. It is emptied before every build, unless
+# --tile-cache warm is given: then every measured build loads the base tiles that a build before it stored.
+# The check fails (exit code 1) when the build grows faster than O(cells): the cost of one more cell between the two
+# largest sizes may be at most --tolerance times the cost of one more cell between the two smallest sizes, or one call
+# or feature per cell if that is more (build modes with a constant cost have marginal costs around 0, in both directions).
+# --self-check runs the check on made up results for several sets of sizes instead of building anything.
+#
+# Usage: python tools/benchmark_build.py --sizes 5x5 9x9 13x13 15x15
+#        python tools/benchmark_build.py --sizes 15x15 --build-modes "By Tile Type" --details
+#        python tools/benchmark_build.py --fast-build both
+#        python tools/benchmark_build.py --sizes 9x9 15x15 --union-strategies "One Shot" "By Row" "K-Way Tree"
+#        python tools/benchmark_build.py --tile-cache warm
+#        python tools/benchmark_build.py --self-check
+import argparse
+import contextlib
+import importlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+import types
+
+tools_folder = os.path.dirname(os.path.abspath(__file__))
+addin_folder = os.path.dirname(tools_folder)
+sys.path.insert(0, os.path.join(tools_folder, 'fake_adsk'))
+import adsk
+import adsk.core
+import adsk.fusion
+
+package_name = 'marble_run_addin'
+
+
+# The add-in uses package-relative imports (from ...lib import fusionAddInUtils), so its folder is loaded as a package
+def import_addin_module(name):
+    if package_name not in sys.modules:
+        package = types.ModuleType(package_name)
+        package.__path__ = [addin_folder]
+        sys.modules[package_name] = package
+    return importlib.import_module(f'{package_name}.{name}')
+
+
+def parse_size(text):
+    x_size, y_size = text.lower().split('x')
+    return int(x_size), int(y_size)
+
+
+def default_inputs(x_size, y_size, build_mode, is_fast_build=False, union_strategy='One Shot'):
+    return {
+        'num_x_cells': x_size,
+        'num_y_cells': y_size,
+        'build_mode': build_mode,
+        'fast_build': is_fast_build,
+        'union_strategy': union_strategy,
+        'masked_cells': '',
+        'reroll_region': '',
+        'diameter': 0.9525,
+        'clearance': 0.015,
+        'slope': 0.06,
+    }
+
+
+# Run one build in a new design and return the recorder counts
+def run_build(logic, x_size, y_size, build_mode, seed, is_fast_build=False, union_strategy='One Shot',
+              is_tile_cache_warm=False, extra_inputs=None):
+    values = default_inputs(x_size, y_size, build_mode, is_fast_build, union_strategy)
+    values.update(extra_inputs or {})
+    design = adsk.fusion.Design()
+    adsk.core.Application.get().__dict__['activeProduct'] = design
+    inputs = adsk.core.CommandInputs()
+    args = types.SimpleNamespace(command=types.SimpleNamespace(commandInputs=inputs))
+    random.seed(seed)
+    adsk.recorder.reset()
+    logic.last_union_stats.clear() # not every build mode joins the tiles
+    if not is_tile_cache_warm:
+        logic.tile_cache.clear()
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()): # futil.log prints every message
+        marble_run_logic = logic.MarbleRunLogic(design)
+        marble_run_logic.CreateCommandInputs(inputs)
+        for id, value in values.items():
+            inputs.set_value(id, value)
+        marble_run_logic.HandleExecute(args)
+    return {
+        'build_mode': build_mode + (' (fast)' if is_fast_build else '') + (f', {union_strategy}' if union_strategy != 'One Shot' else ''),
+        'cells': x_size * y_size,
+        'calls': adsk.recorder.num_calls(),
+        'features': adsk.recorder.num_features(),
+        'time': time.perf_counter() - start_time,
+        'call_counts': adsk.recorder.calls.copy(),
+        'feature_counts': adsk.recorder.features.copy(),
+        'stage_times': dict(logic.last_build_times),
+        'joins': logic.last_union_stats.get('joins', 0),
+        'max_tools': logic.last_union_stats.get('max_tools', 0),
+    }
+
+
+# Cost of one more cell between consecutive sizes
+def marginal_costs(results, name):
+    return [(result_2[name] - result_1[name]) / (result_2['cells'] - result_1['cells'])
+            for result_1, result_2 in zip(results, results[1:]) if result_2['cells'] > result_1['cells']]
+
+
+def check_growth(results, tolerance):
+    is_linear = True
+    for name in ['calls', 'features']:
+        costs = marginal_costs(results, name)
+        if len(costs) < 2:
+            continue
+        if costs[-1] > tolerance * max(abs(costs[0]), 1):
+            print(f'FAIL: {results[0]["build_mode"]}: {name} per added cell grows from {costs[0]:.1f} to {costs[-1]:.1f}, faster than O(cells)')
+            is_linear = False
+    return is_linear
+
+
+# Made up costs by the number of cells: a constant cost that varies by a feature or two like the By Tile Type and
+# Instanced builds, a linear and a quadratic one. Only the quadratic one may fail the check
+self_check_costs = {
+    'constant': (lambda cells, index: 79 - index % 2, True),
+    'linear': (lambda cells, index: 40 + 2 * cells, True),
+    'quadratic': (lambda cells, index: 40 + cells * cells // 4, False),
+}
+self_check_size_sets = [['5x5', '7x7', '9x9'], ['5x5', '9x9', '13x13', '15x15'], ['9x9', '15x15'], ['3x3', '5x5', '7x7', '9x9', '11x11']]
+
+
+def self_check(tolerance):
+    is_passed = True
+    for size_set in self_check_size_sets:
+        for name, (cost, is_linear) in self_check_costs.items():
+            results = []
+            for index, (x_size, y_size) in enumerate(parse_size(size) for size in size_set):
+                cells = x_size * y_size
+                results.append({'build_mode': f'self-check {name} {" ".join(size_set)}', 'cells': cells,
+                                'calls': 10 * cost(cells, index), 'features': cost(cells, index)})
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = check_growth(results, tolerance)
+            # Two sizes give a single marginal cost, which is never checked
+            expected = is_linear or len(size_set) < 3
+            if result != expected:
+                print(f'FAIL: self-check: the {name} cost for the sizes {" ".join(size_set)} '
+                      f'{"failed" if is_linear else "passed"} the growth check')
+                is_passed = False
+    print('self-check passed' if is_passed else 'self-check failed')
+    return is_passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count the Fusion API calls and timeline features of a marble run build.')
+    parser.add_argument('--sizes', nargs='+', default=['5x5', '9x9', '13x13', '15x15'])
+    parser.add_argument('--build-modes', nargs='+', default=None, help='build modes to measure, all by default')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed growth of the cost per added cell')
+    parser.add_argument('--fast-build', choices=['off', 'on', 'both'], default='off',
+                        help='build the base tiles with the Fast Build option of the dialog')
+    parser.add_argument('--union-strategies', nargs='+', default=['One Shot'],
+                        help='union strategies to measure, see logic.union_strategies')
+    parser.add_argument('--tile-cache', choices=['cold', 'warm'], default='cold',
+                        help='build the base tiles (cold) or load them from the tile cache (warm)')
+    parser.add_argument('--details', action='store_true', help='print the calls and features by type')
+    parser.add_argument('--self-check', action='store_true', help='only check the growth check on made up results')
+    args = parser.parse_args()
+    if args.self_check:
+        sys.exit(0 if self_check(args.tolerance) else 1)
+
+    logic = import_addin_module('commands.marbleRunCreate.logic')
+    temp_folder = tempfile.TemporaryDirectory()
+    logic.tile_cache.cache_folder = os.path.join(temp_folder.name, 'tile_cache')
+    is_tile_cache_warm = args.tile_cache == 'warm'
+    import_addin_module('commands.marbleRunCreate.path_generator').verbose = False
+    build_modes = args.build_modes or logic.build_modes
+    sizes = sorted((parse_size(size) for size in args.sizes), key=lambda size: size[0] * size[1])
+    fast_build_options = {'off': [False], 'on': [True], 'both': [False, True]}[args.fast_build]
+    configurations = [(mode, is_fast, strategy) for mode in build_modes for is_fast in fast_build_options
+                      for strategy in args.union_strategies]
+    print(f'{"build mode":>30} {"size":>7} {"cells":>6} {"calls":>8} {"features":>9} {"calls/cell":>11} '
+          f'{"features/cell":>14} {"joins":>6} {"max tools":>10} {"time s":>7}')
+    is_linear = True
+    for build_mode, is_fast_build, union_strategy in configurations:
+        results = []
+        for x_size, y_size in sizes:
+            if is_tile_cache_warm:
+                run_build(logic, x_size, y_size, build_mode, args.seed, is_fast_build, union_strategy)
+            result = run_build(logic, x_size, y_size, build_mode, args.seed, is_fast_build, union_strategy, is_tile_cache_warm)
+            results.append(result)
+            print(f'{result["build_mode"]:>30} {f"{x_size}x{y_size}":>7} {result["cells"]:6} {result["calls"]:8} '
+                  f'{result["features"]:9} {result["calls"] / result["cells"]:11.1f} '
+                  f'{result["features"] / result["cells"]:14.2f} {result["joins"]:6} {result["max_tools"]:10} '
+                  f'{result["time"]:7.2f}', flush=True)
+            if args.details:
+                print('    stage times: ' + ', '.join(f'{stage} {seconds:.3f} s' for stage, seconds in result['stage_times'].items()))
+                for name, count in result['feature_counts'].most_common():
+                    print(f'    feature {name}: {count}')
+                for name, count in result['call_counts'].most_common(15):
+                    print(f'    call {name}: {count}')
+        is_linear = check_growth(results, args.tolerance) and is_linear
+    if not is_linear:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
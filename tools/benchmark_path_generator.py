@@ -0,0 +1,151 @@
+# Benchmark for the marble run path generator.
+# Generates seeded paths for each grid size and reports the mean and worst time, search nodes, backtracks and restarts.
+#
+# Usage: python tools/benchmark_path_generator.py --sizes 9x9 13x13 15x13 --seeds 20
+#
+# With --write-costs the engine-* configurations are measured and their expected time per path (mean time divided by
+# the share of seeds that found a path) is written to the cost table that engines.py uses to pick an engine.
+# python tools/benchmark_path_generator.py --sizes 5x5 7x7 9x9 11x11 13x13 15x15 21x21 --write-costs
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'commands', 'marbleRunCreate'))
+import path_generator
+import beam_search
+import engines
+
+
+def parse_size(text):
+    x_size, y_size = text.lower().split('x')
+    return int(x_size), int(y_size)
+
+
+def run_backtracking(x_size, y_size, seed):
+    start_time = time.perf_counter()
+    path_generator.generate_path(x_size, y_size, seed=seed)
+    return {
+        'time': time.perf_counter() - start_time,
+        'backtracks': path_generator.num_backtracks,
+        'attempts': path_generator.num_attempts,
+        'found': 1,
+    }
+
+
+def run_beam(beam_width):
+    def run(x_size, y_size, seed):
+        start_time = time.perf_counter()
+        matrix = beam_search.generate_path_beam(x_size, y_size, beam_width, seed)
+        return {
+            'time': time.perf_counter() - start_time,
+            'backtracks': 0,
+            'attempts': 1,
+            'found': 1 if matrix is not None else 0,
+        }
+    return run
+
+
+# Each configuration sets up the path_generator flags it needs and returns the function that generates one path
+def warnsdorff_ordering():
+    path_generator.use_tuned_profiles = False
+    path_generator.use_learned_ordering = False
+    return run_backtracking
+
+
+def learned_ordering():
+    path_generator.use_tuned_profiles = False
+    path_generator.use_learned_ordering = True
+    return run_backtracking
+
+
+def tuned_profile():
+    path_generator.use_tuned_profiles = True
+    return run_backtracking
+
+
+configurations = {
+    'warnsdorff': warnsdorff_ordering,
+    'learned': learned_ordering,
+    'tuned': tuned_profile,
+}
+# The beam search never backtracks, but it can fail. 'found' is the share of seeds that gave a path
+if beam_search.is_available():
+    for beam_width in [4, 16, 64, 256]:
+        configurations[f'beam-{beam_width}'] = lambda beam_width=beam_width: run_beam(beam_width)
+
+
+def run_engine(name):
+    path_generator.use_tuned_profiles = True
+    def run(x_size, y_size, seed):
+        start_time = time.perf_counter()
+        matrix = engines.engines[name]['generate'](x_size, y_size, seed, None)
+        return {
+            'time': time.perf_counter() - start_time,
+            'backtracks': path_generator.num_backtracks if name == 'backtracking' else 0,
+            'attempts': path_generator.num_attempts if name == 'backtracking' else 1,
+            'found': 1 if matrix is not None else 0,
+        }
+    return run
+
+
+for name, engine in engines.engines.items():
+    if engine['is_available']():
+        configurations[f'engine-{name}'] = lambda name=name: run_engine(name)
+
+
+def is_engine_suited(config, x_size, y_size):
+    if not config.startswith('engine-'):
+        return True
+    engine = engines.engines[config[len('engine-'):]]
+    return engine['max_cells'] is None or x_size * y_size <= engine['max_cells']
+
+
+def write_costs(costs):
+    with open(engines.cost_table_file, 'w') as file:
+        json.dump({'version': 1, 'costs': costs}, file, indent=1, sort_keys=True)
+    print(f'wrote {engines.cost_table_file}')
+
+
+def summarize(results):
+    summary = {}
+    for name in results[0]:
+        values = [result[name] for result in results]
+        summary[name] = (statistics.mean(values), max(values))
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the marble run path generator.')
+    parser.add_argument('--sizes', nargs='+', default=['9x9', '11x11', '13x13', '15x13'])
+    parser.add_argument('--seeds', type=int, default=10, help='number of seeded runs per size and configuration')
+    parser.add_argument('--configs', nargs='+', default=None, choices=list(configurations))
+    parser.add_argument('--write-costs', action='store_true', help='measure the engines and write their cost table')
+    args = parser.parse_args()
+    if args.configs is None:
+        args.configs = [config for config in configurations if args.write_costs == config.startswith('engine-')]
+    costs = {}
+
+    path_generator.verbose = False
+    print(f'{"size":>7} {"config":>12} {"mean s":>8} {"max s":>8} {"backtracks":>11} {"attempts":>9} {"found":>6}')
+    for size in args.sizes:
+        x_size, y_size = parse_size(size)
+        for config in args.configs:
+            if not is_engine_suited(config, x_size, y_size):
+                continue
+            run = configurations[config]()
+            results = [run(x_size, y_size, seed) for seed in range(args.seeds)]
+            summary = summarize(results)
+            print(f'{size:>7} {config:>12} {summary["time"][0]:8.3f} {summary["time"][1]:8.3f} '
+                  f'{summary["backtracks"][0]:11.1f} {summary["attempts"][0]:9.2f} {summary["found"][0]:6.0%}', flush=True)
+            if config.startswith('engine-'):
+                expected_time = summary['time'][0] / max(summary['found'][0], 0.01)
+                costs.setdefault(config[len('engine-'):], {})[str(x_size * y_size)] = round(expected_time, 4)
+    if args.write_costs:
+        write_costs(costs)
+
+
+if __name__ == '__main__':
+    main()
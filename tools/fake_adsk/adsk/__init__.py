@@ -0,0 +1,101 @@
+# Stand-in for the Fusion 360 API (adsk.core and adsk.fusion) that runs in a normal Python process.
+# It builds no geometry. Every API method call and property assignment is counted in `recorder`, and every feature that
+# would land in the timeline is appended to the design's timeline and counted per feature type, so the build in
+# logic.py can be measured and checked outside Fusion (see tools/benchmark_build.py).
+# Only the parts of the API the add-in relies on are modelled. Anything else is a generic object that accepts any
+# attribute and any call, so new API use doesn't break the fake; it is only counted.
+import collections
+
+
+class Recorder:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.calls = collections.Counter() # 'Type.method' or 'Type.property=' -> count
+        self.features = collections.Counter() # feature collection name -> number of timeline features
+
+    def call(self, name):
+        self.calls[name] += 1
+
+    def feature(self, kind):
+        self.features[kind] += 1
+
+    def num_calls(self):
+        return sum(self.calls.values())
+
+    def num_features(self):
+        return sum(self.features.values())
+
+
+recorder = Recorder()
+
+
+# Generic API object. Unknown attributes become generic objects (cached, so reading the same property twice gives the
+# same object), calling one counts a call, and assigning a property counts a call as well.
+# Subclasses set up their own fields through self.__dict__ so that the setup isn't counted.
+class ApiObject:
+    def __init__(self, api_type='Object'):
+        self.__dict__['api_type'] = api_type
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        value = ApiMember(self.api_type, name)
+        self.__dict__[name] = value
+        return value
+
+    def __setattr__(self, name, value):
+        recorder.call(f'{self.api_type}.{name}=')
+        self.__dict__[name] = value
+
+    def __iter__(self):
+        return iter(())
+
+    def __len__(self):
+        return 0
+
+    def __getitem__(self, index):
+        return ApiObject(self.api_type)
+
+    def __repr__(self):
+        return f'<fake {self.api_type}>'
+
+
+# A member of a generic object: a property value and a method at the same time
+class ApiMember(ApiObject):
+    def __init__(self, owner_type, name):
+        super().__init__(name)
+        self.__dict__['qualified_name'] = f'{owner_type}.{name}'
+
+    def __call__(self, *args, **kwargs):
+        recorder.call(self.qualified_name)
+        name = self.api_type
+        for prefix in ['add', 'create']:
+            if name.startswith(prefix) and len(name) > len(prefix):
+                name = name[len(prefix):]
+        return ApiObject(name)
+
+
+# Read-only list of API objects, like adsk.core.ObjectCollection or the body and face collections
+class Collection(ApiObject):
+    def __init__(self, api_type, items=()):
+        super().__init__(api_type)
+        self.__dict__['items'] = list(items)
+
+    @property
+    def count(self):
+        return len(self.items)
+
+    def item(self, index):
+        recorder.call(f'{self.api_type}.item')
+        return self.items[index] if index < len(self.items) else None
+
+    def __iter__(self):
+        return iter(list(self.items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        return self.items[index]
@@ -0,0 +1,225 @@
+# Fake adsk.core: points, vectors, value inputs, object collections, the application and command inputs
+import math
+
+from . import ApiObject, Collection, recorder
+
+
+class Point3D(ApiObject):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        super().__init__('Point3D')
+        self.__dict__.update(x=float(x), y=float(y), z=float(z))
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        recorder.call('Point3D.create')
+        return Point3D(x, y, z)
+
+    def copy(self):
+        recorder.call('Point3D.copy')
+        return Point3D(self.x, self.y, self.z)
+
+    def translateBy(self, vector):
+        recorder.call('Point3D.translateBy')
+        self.__dict__.update(x=self.x + vector.x, y=self.y + vector.y, z=self.z + vector.z)
+        return True
+
+    def asArray(self):
+        recorder.call('Point3D.asArray')
+        return (self.x, self.y, self.z)
+
+    def getData(self):
+        recorder.call('Point3D.getData')
+        return (True, self.x, self.y, self.z)
+
+    def distanceTo(self, point):
+        recorder.call('Point3D.distanceTo')
+        return math.dist(self.asArray(), point.asArray())
+
+
+class Point2D(ApiObject):
+    def __init__(self, x=0.0, y=0.0):
+        super().__init__('Point2D')
+        self.__dict__.update(x=float(x), y=float(y))
+
+    @staticmethod
+    def create(x=0.0, y=0.0):
+        recorder.call('Point2D.create')
+        return Point2D(x, y)
+
+
+class Vector3D(ApiObject):
+    def __init__(self, x=0.0, y=0.0, z=0.0):
+        super().__init__('Vector3D')
+        self.__dict__.update(x=float(x), y=float(y), z=float(z))
+
+    @staticmethod
+    def create(x=0.0, y=0.0, z=0.0):
+        recorder.call('Vector3D.create')
+        return Vector3D(x, y, z)
+
+    def dotProduct(self, vector):
+        recorder.call('Vector3D.dotProduct')
+        return self.x*vector.x + self.y*vector.y + self.z*vector.z
+
+    def copy(self):
+        recorder.call('Vector3D.copy')
+        return Vector3D(self.x, self.y, self.z)
+
+
+class Matrix3D(ApiObject):
+    def __init__(self):
+        super().__init__('Matrix3D')
+        self.__dict__['translation'] = Vector3D()
+
+    @staticmethod
+    def create():
+        recorder.call('Matrix3D.create')
+        return Matrix3D()
+
+
+class ValueInput(ApiObject):
+    def __init__(self, value=None, expression=None):
+        super().__init__('ValueInput')
+        self.__dict__.update(realValue=value, stringValue=expression)
+
+    @staticmethod
+    def createByReal(value):
+        recorder.call('ValueInput.createByReal')
+        return ValueInput(value=float(value))
+
+    @staticmethod
+    def createByString(expression):
+        recorder.call('ValueInput.createByString')
+        return ValueInput(expression=expression)
+
+
+class ObjectCollection(Collection):
+    def __init__(self):
+        super().__init__('ObjectCollection')
+
+    @staticmethod
+    def create():
+        recorder.call('ObjectCollection.create')
+        return ObjectCollection()
+
+    def add(self, item):
+        recorder.call('ObjectCollection.add')
+        self.items.append(item)
+        return True
+
+
+class Application(ApiObject):
+    instance = None
+
+    def __init__(self):
+        super().__init__('Application')
+        self.__dict__.update(activeProduct=None, userInterface=ApiObject('UserInterface'))
+
+    @staticmethod
+    def get():
+        if Application.instance is None:
+            Application.instance = Application()
+        return Application.instance
+
+    def log(self, message, level=None, log_type=None):
+        recorder.call('Application.log')
+
+
+class CommandInput(ApiObject):
+    def __init__(self, id, value=None):
+        super().__init__('CommandInput')
+        self.__dict__.update(id=id, listItems=ListItems(self))
+        self.set_value(value)
+
+    def set_value(self, value):
+        expression = value if isinstance(value, str) else repr(value)
+        self.__dict__.update(value=value, valueOne=value, expression=expression, expressionOne=expression, text='',
+                             selectedItem=ListItem(value))
+
+    def __setattr__(self, name, value):
+        if name in ['value', 'valueOne']:
+            recorder.call(f'CommandInput.{name}=')
+            self.set_value(value)
+        elif name == 'expression':
+            # Only plain numbers are evaluated
+            recorder.call('CommandInput.expression=')
+            try:
+                self.set_value(float(value))
+            except ValueError:
+                self.__dict__['expression'] = value
+        else:
+            super().__setattr__(name, value)
+
+
+class ListItem(ApiObject):
+    def __init__(self, name, command_input=None):
+        super().__init__('ListItem')
+        self.__dict__.update(name=name, command_input=command_input)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == 'isSelected' and value and self.command_input is not None:
+            self.command_input.set_value(self.name)
+
+
+# Items of a drop down input. The value of the input is the name of the selected item
+class ListItems(Collection):
+    def __init__(self, command_input):
+        super().__init__('ListItems')
+        self.__dict__['command_input'] = command_input
+
+    def add(self, name, is_selected, icon=''):
+        recorder.call('ListItems.add')
+        if is_selected:
+            self.command_input.set_value(name)
+        list_item = ListItem(name, self.command_input)
+        self.items.append(list_item)
+        return list_item
+
+
+# The inputs of the command dialog. Inputs added by the dialog code (addValueInput, addStringValueInput, ...) start with
+# their default value; set_value changes a value the way the user would. Numbers are in cm like the Fusion API
+class CommandInputs(ApiObject):
+    def __init__(self, values=None):
+        super().__init__('CommandInputs')
+        self.__dict__['inputs'] = {}
+        for id, value in (values or {}).items():
+            self.set_value(id, value)
+
+    def set_value(self, id, value):
+        if id not in self.inputs:
+            self.inputs[id] = CommandInput(id)
+        self.inputs[id].set_value(value)
+
+    def itemById(self, id):
+        recorder.call('CommandInputs.itemById')
+        return self.inputs.get(id)
+
+    def __getattr__(self, name):
+        if not (name.startswith('add') and name.endswith('Input')):
+            return super().__getattr__(name)
+        def add_input(id, *args):
+            recorder.call(f'CommandInputs.{name}')
+            defaults = [arg.realValue if isinstance(arg, ValueInput) else arg for arg in args[1:]]
+            if name == 'addValueInput':
+                value = defaults[1]
+            elif name in ['addStringValueInput', 'addTextBoxCommandInput']:
+                value = defaults[0]
+            elif name == 'addIntegerSliderCommandInput':
+                value = defaults[0]
+            elif name == 'addBoolValueInput':
+                value = defaults[2] if len(defaults) > 2 else False
+            else:
+                value = None
+            self.set_value(id, value)
+            return self.inputs[id]
+        return add_input
+
+
+# Everything else (event args, log levels, ...) is a generic object
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    value = ApiObject(name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,538 @@
+# Fake adsk.fusion: design, components, sketches, feature collections, bodies and the timeline.
+# Bodies have synthetic faces: a tile body has a few side and top faces and one flat bottom face facing -Z. A join keeps
+# the side and top faces of all bodies and merges their bottoms into one face, listed last, so face scans over a
+# combined body cost as much as they would on the real run.
+from . import ApiObject, Collection, core, recorder
+from .core import Point3D, Vector3D
+
+tile_face_normals = [(1, 0, 0), (-1, 0, 0), (0, 1, 0), (0, -1, 0), (0, 0, 1), (0.6, 0, 0.8), (-0.6, 0, 0.8),
+                     (0, 0.6, 0.8), (0, -0.6, 0.8)]
+
+
+class FeatureOperations:
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+
+class BooleanTypes:
+    DifferenceBooleanType = 0
+    IntersectionBooleanType = 1
+    UnionBooleanType = 2
+
+
+class Design(ApiObject):
+    def __init__(self):
+        super().__init__('Design')
+        self.__dict__.update(timeline=Timeline(), attributes=Attributes(self), unitsManager=UnitsManager(),
+                             components=[], occurrences=[])
+        self.__dict__['rootComponent'] = Component(self)
+        self.__dict__['activeComponent'] = self.rootComponent
+
+    @staticmethod
+    def cast(product):
+        return product
+
+    def findAttributes(self, group_name, name):
+        recorder.call('Design.findAttributes')
+        holders = [self] + self.components
+        return [holder.attributes.stored[(group_name, name)] for holder in holders
+                if (group_name, name) in holder.attributes.stored]
+
+
+class UnitsManager(ApiObject):
+    def __init__(self):
+        super().__init__('UnitsManager')
+        self.__dict__['defaultLengthUnits'] = 'cm'
+
+
+class Attribute(ApiObject):
+    def __init__(self, parent, group_name, name, value):
+        super().__init__('Attribute')
+        self.__dict__.update(parent=parent, groupName=group_name, name=name, value=value)
+
+    def deleteMe(self):
+        recorder.call('Attribute.deleteMe')
+        self.parent.attributes.stored.pop((self.groupName, self.name), None)
+        return True
+
+
+class Attributes(ApiObject):
+    def __init__(self, parent):
+        super().__init__('Attributes')
+        self.__dict__.update(parent=parent, stored={})
+
+    def add(self, group_name, name, value):
+        recorder.call('Attributes.add')
+        attribute = Attribute(self.parent, group_name, name, value)
+        self.stored[(group_name, name)] = attribute
+        return attribute
+
+    def itemByName(self, group_name, name):
+        recorder.call('Attributes.itemByName')
+        return self.stored.get((group_name, name))
+
+
+class Timeline(Collection):
+    def __init__(self):
+        super().__init__('Timeline')
+        self.__dict__['timelineGroups'] = TimelineGroups()
+
+    def append(self, kind, feature):
+        recorder.feature(kind)
+        feature.__dict__['timelineObject'] = TimelineObject(len(self.items))
+        self.items.append(feature)
+
+
+# Groups only keep their names, deleting one doesn't delete its features
+class TimelineGroups(Collection):
+    def __init__(self):
+        super().__init__('TimelineGroups')
+
+    def add(self, start_index, end_index):
+        recorder.call('TimelineGroups.add')
+        timeline_group = TimelineGroup(self)
+        self.items.append(timeline_group)
+        return timeline_group
+
+
+class TimelineGroup(ApiObject):
+    def __init__(self, timeline_groups):
+        super().__init__('TimelineGroup')
+        self.__dict__.update(name='Group', timeline_groups=timeline_groups)
+
+    def deleteMe(self, is_contents_deleted=False):
+        recorder.call('TimelineGroup.deleteMe')
+        self.timeline_groups.items.remove(self)
+        return True
+
+
+class TimelineObject(ApiObject):
+    def __init__(self, index):
+        super().__init__('TimelineObject')
+        self.__dict__['index'] = index
+
+
+class Component(ApiObject):
+    def __init__(self, design):
+        super().__init__('Component')
+        self.__dict__.update(name='Component', parentDesign=design, sketches=Sketches(design),
+                             features=Features(design), bRepBodies=BRepBodies(), attributes=Attributes(self),
+                             occurrences=Occurrences(self))
+        design.components.append(self)
+
+    def allOccurrencesByComponent(self, component):
+        recorder.call('Component.allOccurrencesByComponent')
+        return Collection('OccurrenceList', [occurrence for occurrence in self.parentDesign.occurrences
+                                             if occurrence.component is component])
+
+
+class Occurrences(Collection):
+    def __init__(self, component):
+        super().__init__('Occurrences')
+        self.__dict__['parent_component'] = component
+
+    def addNewComponent(self, transform):
+        recorder.call('Occurrences.addNewComponent')
+        design = self.parent_component.parentDesign
+        occurrence = self.add_occurrence(Component(design), transform)
+        design.timeline.append('Occurrences', occurrence)
+        return occurrence
+
+    def addExistingComponent(self, component, transform):
+        recorder.call('Occurrences.addExistingComponent')
+        return self.add_occurrence(component, transform)
+
+    def add_occurrence(self, component, transform):
+        occurrence = Occurrence(component, transform)
+        self.items.append(occurrence)
+        self.parent_component.parentDesign.occurrences.append(occurrence)
+        return occurrence
+
+
+# An occurrence shares the bodies of its component. Bodies read through an occurrence stand for the proxies that Fusion
+# returns, which include the occurrence's transform
+class Occurrence(ApiObject):
+    def __init__(self, component, transform):
+        super().__init__('Occurrence')
+        self.__dict__.update(component=component, transform=transform, isLightBulbOn=True)
+
+    @property
+    def bRepBodies(self):
+        return self.component.bRepBodies
+
+    @property
+    def childOccurrences(self):
+        return self.component.occurrences
+
+
+class BRepBodies(Collection):
+    def __init__(self):
+        super().__init__('BRepBodies')
+
+    # Add a temporary body to the component, inside a base feature that is being edited
+    def add(self, body, base_feature=None):
+        recorder.call('BRepBodies.add')
+        body = body.copy()
+        self.items.append(body)
+        if base_feature is not None:
+            base_feature.bodies.items.append(body)
+        return body
+
+    def itemByName(self, name):
+        recorder.call('BRepBodies.itemByName')
+        return next((body for body in self.items if body.name == name), None)
+
+
+class Features(ApiObject):
+    def __init__(self, design):
+        super().__init__('Features')
+        self.__dict__['design'] = design
+
+    # Every feature collection (extrudeFeatures, copyPasteBodies, ...) is created on first use
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        kind = name[0].upper() + name[1:]
+        value = FeatureCollection(self.design, kind)
+        self.__dict__[name] = value
+        return value
+
+
+class FeatureInput(ApiObject):
+    def __init__(self, kind, args):
+        super().__init__(kind[:-1] + 'Input')
+        self.__dict__['args'] = args
+        operations = [arg for arg in args if isinstance(arg, int) and not isinstance(arg, bool)]
+        self.__dict__['operation'] = operations[0] if operations else None
+
+
+class FeatureCollection(ApiObject):
+    def __init__(self, design, kind):
+        super().__init__(kind)
+        self.__dict__['design'] = design
+
+    def createInput(self, *args):
+        recorder.call(f'{self.api_type}.createInput')
+        return FeatureInput(self.api_type, args)
+
+    def createInput2(self, *args):
+        recorder.call(f'{self.api_type}.createInput2')
+        return FeatureInput(self.api_type, args)
+
+    def add(self, *args):
+        recorder.call(f'{self.api_type}.add')
+        feature = Feature(self.api_type, feature_bodies(self.api_type, args))
+        self.design.timeline.append(self.api_type, feature)
+        return feature
+
+    def addSimple(self, *args):
+        recorder.call(f'{self.api_type}.addSimple')
+        feature = Feature(self.api_type, feature_bodies(self.api_type, (FeatureInput(self.api_type, args),)))
+        self.design.timeline.append(self.api_type, feature)
+        return feature
+
+
+# The bodies a feature creates or changes
+def feature_bodies(kind, args):
+    first = args[0] if args else None
+    if kind == 'CopyPasteBodies':
+        return [body.copy() for body in entity_list(first)]
+    if not isinstance(first, FeatureInput):
+        return []
+    if kind == 'CombineFeatures':
+        target, tools = first.args[0], list(first.args[1])
+        if first.operation == FeatureOperations.JoinFeatureOperation:
+            target.join(tools)
+        return [target]
+    if kind == 'MirrorFeatures':
+        return [body.copy() for body in entity_list(first.args[0])]
+    if kind in ['MoveFeatures', 'ShellFeatures']:
+        return [body for body in entity_list(first.args[0]) if isinstance(body, BRepBody)]
+    if first.operation == FeatureOperations.NewBodyFeatureOperation:
+        return [BRepBody()]
+    return []
+
+
+def entity_list(entities):
+    if isinstance(entities, Collection):
+        return list(entities.items)
+    return [entities]
+
+
+class Feature(ApiObject):
+    def __init__(self, kind, bodies):
+        super().__init__(kind[:-1] if kind.endswith('s') else kind)
+        body_collection = Collection('BRepBodies', bodies)
+        faces = bodies[0].faces if bodies else Collection('BRepFaces')
+        self.__dict__.update(bodies=body_collection, sideFaces=faces, startFaces=Collection('BRepFaces'),
+                             endFaces=Collection('BRepFaces'))
+
+
+class BRepBody(ApiObject):
+    def __init__(self, num_faces=len(tile_face_normals)):
+        super().__init__('BRepBody')
+        self.__dict__.update(name='Body', isVisible=True, num_faces=num_faces, face_list=None)
+
+    @property
+    def faces(self):
+        if self.face_list is None:
+            normals = [tile_face_normals[i % len(tile_face_normals)] for i in range(self.num_faces)] + [(0, 0, -1)]
+            self.__dict__['face_list'] = Collection('BRepFaces', [BRepFace(i, normal) for i, normal in enumerate(normals)])
+        return self.face_list
+
+    def copy(self):
+        return BRepBody(self.num_faces)
+
+    def copyToComponent(self, target):
+        recorder.call('BRepBody.copyToComponent')
+        body = self.copy()
+        component = target.component if isinstance(target, Occurrence) else target
+        component.bRepBodies.items.append(body)
+        component.parentDesign.timeline.append('CopyToComponent', Feature('CopyToComponent', [body]))
+        return body
+
+    def join(self, tools):
+        self.__dict__['num_faces'] = self.num_faces + sum(tool.num_faces for tool in tools)
+        self.__dict__['face_list'] = None
+
+
+# Bodies that live only in memory, outside the timeline
+class TemporaryBRepManager(ApiObject):
+    instance = None
+
+    def __init__(self):
+        super().__init__('TemporaryBRepManager')
+
+    @staticmethod
+    def get():
+        if TemporaryBRepManager.instance is None:
+            TemporaryBRepManager.instance = TemporaryBRepManager()
+        return TemporaryBRepManager.instance
+
+    def copy(self, body):
+        recorder.call('TemporaryBRepManager.copy')
+        return body.copy()
+
+    def transform(self, body, transform):
+        recorder.call('TemporaryBRepManager.transform')
+        return True
+
+    def booleanOperation(self, target, tool, boolean_type):
+        recorder.call('TemporaryBRepManager.booleanOperation')
+        if boolean_type == BooleanTypes.UnionBooleanType:
+            target.join([tool])
+        return True
+
+    def createBox(self, box):
+        recorder.call('TemporaryBRepManager.createBox')
+        return BRepBody(5)
+
+    # The exported file only holds the number of faces of the body
+    def exportToFile(self, bodies, filename):
+        recorder.call('TemporaryBRepManager.exportToFile')
+        with open(filename, 'w') as f:
+            f.write(str(bodies[0].num_faces))
+        return True
+
+    def createFromFile(self, filename):
+        recorder.call('TemporaryBRepManager.createFromFile')
+        with open(filename) as f:
+            return Collection('BRepBodies', [BRepBody(int(f.read()))])
+
+
+# Every face is planar, face i is the unit square at x = i
+class BRepFace(ApiObject):
+    def __init__(self, index, normal):
+        super().__init__('BRepFace')
+        geometry = ApiObject('Plane')
+        geometry.__dict__['surfaceType'] = core.SurfaceTypes.PlaneSurfaceType
+        bounding_box = ApiObject('BoundingBox3D')
+        bounding_box.__dict__.update(minPoint=Point3D(index, 0, 0), maxPoint=Point3D(index, 1, 1))
+        self.__dict__.update(index=index, evaluator=SurfaceEvaluator(Vector3D(*normal)), geometry=geometry,
+                             boundingBox=bounding_box)
+
+    @property
+    def edges(self):
+        corners = [Point3D(self.index, 0, 0), Point3D(self.index, 1, 0), Point3D(self.index, 1, 1), Point3D(self.index, 0, 1)]
+        return Collection('BRepEdges', [BRepEdge(corners[i], corners[(i+1) % 4]) for i in range(4)])
+
+
+class BRepEdge(ApiObject):
+    def __init__(self, start, end):
+        super().__init__('BRepEdge')
+        self.__dict__.update(startVertex=BRepVertex(start), endVertex=BRepVertex(end))
+
+
+class BRepVertex(ApiObject):
+    def __init__(self, point):
+        super().__init__('BRepVertex')
+        self.__dict__['geometry'] = point
+
+
+class SurfaceEvaluator(ApiObject):
+    def __init__(self, normal):
+        super().__init__('SurfaceEvaluator')
+        self.__dict__['normal'] = normal
+
+    def getNormalAtParameter(self, parameter):
+        recorder.call('SurfaceEvaluator.getNormalAtParameter')
+        return (True, self.normal.copy())
+
+
+class Sketches(ApiObject):
+    def __init__(self, design):
+        super().__init__('Sketches')
+        self.__dict__['design'] = design
+
+    def add(self, plane):
+        recorder.call('Sketches.add')
+        sketch = Sketch()
+        self.design.timeline.append('Sketches', sketch)
+        return sketch
+
+
+class Sketch(ApiObject):
+    def __init__(self):
+        super().__init__('Sketch')
+        self.__dict__.update(name='Sketch', originPoint=SketchPoint(Point3D()), sketchPoints=SketchPoints(),
+                             sketchCurves=SketchCurves(self), rectangle_profiles=[])
+
+    @property
+    def profiles(self):
+        # Every rectangle is a closed profile. Sketches without rectangles get one profile for their closed outline
+        profiles = self.rectangle_profiles or [Profile(Point3D())]
+        return Collection('Profiles', profiles)
+
+    def project2(self, entities, is_linked):
+        recorder.call('Sketch.project2')
+        return [entity.copy() for entity in entities]
+
+
+class SketchCurves(ApiObject):
+    def __init__(self, sketch):
+        super().__init__('SketchCurves')
+        self.__dict__.update(sketchLines=SketchLines(sketch), sketchArcs=SketchArcs())
+
+
+class SketchPoint(ApiObject):
+    def __init__(self, point):
+        super().__init__('SketchPoint')
+        self.__dict__['geometry'] = point
+
+    def copy(self):
+        return SketchPoint(Point3D(self.geometry.x, self.geometry.y, self.geometry.z))
+
+
+class SketchPoints(ApiObject):
+    def __init__(self):
+        super().__init__('SketchPoints')
+
+    def add(self, point):
+        recorder.call('SketchPoints.add')
+        return SketchPoint(point)
+
+
+def sketch_point(point):
+    return point if isinstance(point, SketchPoint) else SketchPoint(point)
+
+
+class Line3D(ApiObject):
+    def __init__(self, start, end):
+        super().__init__('Line3D')
+        self.__dict__['evaluator'] = CurveEvaluator(start, end)
+
+
+class CurveEvaluator(ApiObject):
+    def __init__(self, start, end):
+        super().__init__('CurveEvaluator')
+        self.__dict__.update(start=start, end=end)
+
+    def getPointAtParameter(self, parameter):
+        recorder.call('CurveEvaluator.getPointAtParameter')
+        return (True, Point3D(self.start.x + parameter*(self.end.x - self.start.x),
+                              self.start.y + parameter*(self.end.y - self.start.y),
+                              self.start.z + parameter*(self.end.z - self.start.z)))
+
+
+class SketchLine(ApiObject):
+    def __init__(self, start, end):
+        super().__init__('SketchLine')
+        self.__dict__.update(startSketchPoint=sketch_point(start), endSketchPoint=sketch_point(end),
+                             isConstruction=False)
+
+    @property
+    def geometry(self):
+        return Line3D(self.startSketchPoint.geometry, self.endSketchPoint.geometry)
+
+    def copy(self):
+        return SketchLine(self.startSketchPoint.copy(), self.endSketchPoint.copy())
+
+
+class SketchLines(ApiObject):
+    def __init__(self, sketch):
+        super().__init__('SketchLines')
+        self.__dict__['sketch'] = sketch
+
+    def addByTwoPoints(self, start, end):
+        recorder.call('SketchLines.addByTwoPoints')
+        return SketchLine(start, end)
+
+    def add_rectangle(self, x_1, y_1, x_2, y_2):
+        corners = [Point3D(x_1, y_1), Point3D(x_2, y_1), Point3D(x_2, y_2), Point3D(x_1, y_2)]
+        self.sketch.rectangle_profiles.append(Profile(Point3D((x_1 + x_2)/2, (y_1 + y_2)/2)))
+        return Collection('SketchLineList', [SketchLine(corners[i], corners[(i+1) % 4]) for i in range(4)])
+
+    def addTwoPointRectangle(self, corner_1, corner_2):
+        recorder.call('SketchLines.addTwoPointRectangle')
+        corner_1 = sketch_point(corner_1).geometry
+        corner_2 = sketch_point(corner_2).geometry
+        return self.add_rectangle(corner_1.x, corner_1.y, corner_2.x, corner_2.y)
+
+    def addCenterPointRectangle(self, center, corner):
+        recorder.call('SketchLines.addCenterPointRectangle')
+        center = sketch_point(center).geometry
+        corner = sketch_point(corner).geometry
+        return self.add_rectangle(corner.x, corner.y, 2*center.x - corner.x, 2*center.y - corner.y)
+
+
+class SketchArc(ApiObject):
+    def __init__(self, center):
+        super().__init__('SketchArc')
+        self.__dict__['centerSketchPoint'] = sketch_point(center)
+
+
+class SketchArcs(ApiObject):
+    def __init__(self):
+        super().__init__('SketchArcs')
+
+    def addByCenterStartEnd(self, center, start, end):
+        recorder.call('SketchArcs.addByCenterStartEnd')
+        return SketchArc(center)
+
+
+class AreaProperties(ApiObject):
+    def __init__(self, centroid):
+        super().__init__('AreaProperties')
+        self.__dict__['centroid'] = centroid
+
+
+class Profile(ApiObject):
+    def __init__(self, centroid):
+        super().__init__('Profile')
+        self.__dict__['centroid'] = centroid
+
+    def areaProperties(self, accuracy=None):
+        recorder.call('Profile.areaProperties')
+        return AreaProperties(self.centroid)
+
+
+# Everything else (Path, extent definitions, enums, ...) is a generic object
+def __getattr__(name):
+    if name.startswith('__'):
+        raise AttributeError(name)
+    value = ApiObject(name)
+    globals()[name] = value
+    return value
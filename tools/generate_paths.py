@@ -0,0 +1,115 @@
+# Headless batch generation of marble run paths, without Fusion.
+# Runs every combination of size, seed and engine in a process pool and appends one JSON line per path to the output
+# file as soon as it is done, so a killed run keeps its results. Running the same command again skips the combinations
+# that are already in the file.
+#
+# Each line holds the size, seed, requested and used engine, the direction chain (one digit per step between cells,
+# 0: +X, 1: +Y, 2: -X, 3: -Y, including the end block), the type matrix, the bend count, the total drop and the time.
+#
+# Usage: python tools/generate_paths.py --sizes 9x9 13x13 15x13 --seeds 100 --output paths.jsonl
+#        python tools/generate_paths.py --widths 7 9 11 --depths 7 9 --seeds 20 --engines auto beam sat
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'commands', 'marbleRunCreate'))
+import path_generator
+import engines
+import track_layout
+
+
+def parse_size(text):
+    x_size, y_size = text.lower().split('x')
+    return int(x_size), int(y_size)
+
+
+def init_worker():
+    path_generator.verbose = False
+
+
+def run_task(task):
+    x_size, y_size, seed, engine, ball_diameter, clearance, slope = task
+    start_time = time.perf_counter()
+    try:
+        if engine == 'auto':
+            matrix = engines.generate_path(x_size, y_size, seed)
+            used_engine = engines.last_engine
+        else:
+            matrix = engines.engines[engine]['generate'](x_size, y_size, seed, None)
+            used_engine = engine
+    except ValueError as error:
+        return {'size': [x_size, y_size], 'seed': seed, 'engine': engine, 'found': False, 'error': str(error),
+                'time': round(time.perf_counter() - start_time, 4)}
+    elapsed = time.perf_counter() - start_time
+    result = {'size': [x_size, y_size], 'seed': seed, 'engine': engine, 'used_engine': used_engine,
+              'found': matrix is not None, 'time': round(elapsed, 4)}
+    if matrix is None:
+        return result
+    cells = path_generator.path_cells()
+    types = track_layout.tile_types(cells)
+    result['directions'] = ''.join(str(track_layout.direction_between(cell_1, cell_2))
+                                   for cell_1, cell_2 in zip(cells, cells[1:]))
+    result['type_matrix'] = path_generator.generate_type_matrix()
+    result['bends'] = sum(not track_layout.is_straight(tile_type) for tile_type in types)
+    result['total_drop'] = round(track_layout.total_drop(types, ball_diameter, clearance, slope), 4)
+    return result
+
+
+def task_key(x_size, y_size, seed, engine):
+    return f'{x_size}x{y_size}/{seed}/{engine}'
+
+
+def finished_keys(file_name):
+    keys = set()
+    if os.path.exists(file_name):
+        with open(file_name) as f:
+            for line in f:
+                try:
+                    result = json.loads(line)
+                except ValueError:
+                    continue # the last line of a killed run can be cut off
+                keys.add(task_key(*result['size'], result['seed'], result['engine']))
+    return keys
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate marble run paths in parallel and write them as JSON Lines.')
+    parser.add_argument('--sizes', nargs='+', default=[], help='sizes like 13x13')
+    parser.add_argument('--widths', nargs='+', type=int, default=[], help='with --depths: every width x depth pair')
+    parser.add_argument('--depths', nargs='+', type=int, default=[])
+    parser.add_argument('--seeds', type=int, default=10, help='number of seeds per size and engine')
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--engines', nargs='+', default=['auto'], choices=['auto'] + list(engines.engines))
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    parser.add_argument('--ball-diameter', type=float, default=0.9525, help='cm')
+    parser.add_argument('--clearance', type=float, default=0.015, help='cm')
+    parser.add_argument('--slope', type=float, default=0.06)
+    parser.add_argument('--output', default='paths.jsonl')
+    args = parser.parse_args()
+
+    sizes = [parse_size(size) for size in args.sizes]
+    sizes += [(width, depth) for width in args.widths for depth in args.depths]
+    if not sizes:
+        parser.error('give --sizes or --widths and --depths')
+    done = finished_keys(args.output)
+    tasks = [(x_size, y_size, seed, engine, args.ball_diameter, args.clearance, args.slope)
+             for x_size, y_size in sizes
+             for seed in range(args.first_seed, args.first_seed + args.seeds)
+             for engine in args.engines
+             if task_key(x_size, y_size, seed, engine) not in done]
+    print(f'{len(tasks)} paths to generate, {len(done)} already in {args.output}', flush=True)
+
+    start_time = time.perf_counter()
+    with open(args.output, 'a') as output, multiprocessing.Pool(args.processes, init_worker) as pool:
+        for i, result in enumerate(pool.imap_unordered(run_task, tasks, chunksize=1), start=1):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+            if i % 100 == 0 or i == len(tasks):
+                print(f'{i}/{len(tasks)} in {time.perf_counter() - start_time:.1f} s', flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+# Replay a recorded path search as an animated HTML page with a heatmap of where the search backtracks.
+# Either records a new trace by running the backtracking search, or reads a trace saved with SearchTrace.save.
+# The hottest cells are printed as well; they show where the pruning rules let the search run into dead ends.
+#
+# Usage: python tools/trace_viewer.py --size 13x13 --seed 3 --output trace.html
+#        python tools/trace_viewer.py --trace search.mrtr --output trace.html
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'commands', 'marbleRunCreate'))
+import path_generator
+import search_trace
+
+cell_pixels = 24
+
+page_template = '''<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Marble run search trace</title>
+<style>
+body {{ font-family: sans-serif; }}
+svg {{ margin: 8px; }}
+.panel {{ display: inline-block; vertical-align: top; }}
+</style>
+</head>
+<body>
+<h3>{title}</h3>
+<div class="panel">
+<div>Search replay: <span id="status"></span></div>
+{replay_svg}
+<div><button id="play">Pause</button> <button id="restart">Restart</button></div>
+</div>
+<div class="panel">
+<div>Backtracks per cell</div>
+{heatmap_svg}
+</div>
+<script>
+const events = {events};
+const xSize = {x_size};
+const cellBits = {cell_bits};
+const eventsPerFrame = {events_per_frame};
+const colors = ['#4a90d9', '#f4f4f4'];
+let position = 0;
+let isPlaying = true;
+function clearCells() {{
+    for (let cell = 0; cell < xSize * {y_size}; cell++) {{
+        document.getElementById('c' + cell).setAttribute('fill', '#f4f4f4');
+    }}
+}}
+function step() {{
+    if (isPlaying) {{
+        const end = Math.min(position + eventsPerFrame, events.length);
+        for (; position < end; position++) {{
+            const op = events[position] >> cellBits;
+            const cell = events[position] & ((1 << cellBits) - 1);
+            if (op === 2) {{
+                clearCells();
+            }} else {{
+                document.getElementById('c' + cell).setAttribute('fill', colors[op]);
+            }}
+        }}
+        document.getElementById('status').textContent = position + ' / ' + events.length + ' events';
+    }}
+    if (position < events.length) {{
+        requestAnimationFrame(step);
+    }}
+}}
+document.getElementById('play').onclick = function() {{
+    isPlaying = !isPlaying;
+    this.textContent = isPlaying ? 'Pause' : 'Play';
+}};
+document.getElementById('restart').onclick = function() {{
+    const isFinished = position >= events.length;
+    position = 0;
+    clearCells();
+    if (isFinished) {{
+        requestAnimationFrame(step);
+    }}
+}};
+requestAnimationFrame(step);
+</script>
+</body>
+</html>
+'''
+
+
+def parse_size(text):
+    x_size, y_size = text.lower().split('x')
+    return int(x_size), int(y_size)
+
+
+def record_trace(x_size, y_size, seed, capacity, sample_every):
+    path_generator.verbose = False
+    path_generator.trace = search_trace.SearchTrace(x_size, y_size, capacity, sample_every)
+    path_generator.generate_path(x_size, y_size, seed)
+    trace = path_generator.trace
+    path_generator.trace = None
+    return trace
+
+
+def grid_svg(trace, fills, titles):
+    width = trace.x_size * cell_pixels
+    height = trace.y_size * cell_pixels
+    rects = []
+    for cell in range(trace.x_size * trace.y_size):
+        x = (cell % trace.x_size) * cell_pixels
+        y = (cell // trace.x_size) * cell_pixels
+        rects.append(f'<rect id="{fills[cell][0]}" x="{x}" y="{y}" width="{cell_pixels}" height="{cell_pixels}" '
+                     f'fill="{fills[cell][1]}" stroke="#999"><title>{titles[cell]}</title></rect>')
+    return f'<svg width="{width}" height="{height}" xmlns="http://www.w3.org/2000/svg">' + ''.join(rects) + '</svg>'
+
+
+def heat_color(value, highest):
+    share = value / highest if highest else 0
+    level = int(255 * (1 - share))
+    return f'rgb(255,{level},{level})'
+
+
+def write_page(trace, file_name, frames):
+    events = []
+    data = trace.event_bytes()
+    for position in range(0, len(data), search_trace.event_size):
+        events.append(data[position] | data[position+1] << 8 | data[position+2] << 16)
+    num_cells = trace.x_size * trace.y_size
+    titles = [f'({cell % trace.x_size}, {cell // trace.x_size}): placed {trace.place_counts[cell]}, '
+              f'backtracked {trace.backtrack_counts[cell]}' for cell in range(num_cells)]
+    replay_svg = grid_svg(trace, [(f'c{cell}', '#f4f4f4') for cell in range(num_cells)], titles)
+    highest = max(trace.backtrack_counts) if num_cells else 0
+    heatmap_svg = grid_svg(trace, [(f'h{cell}', heat_color(trace.backtrack_counts[cell], highest))
+                                   for cell in range(num_cells)], titles)
+    title = f'{trace.x_size}x{trace.y_size}: {trace.num_events} events, {len(events)} stored'
+    if trace.sample_every > 1:
+        title += f' (every {trace.sample_every}th place or backtrack)'
+    page = page_template.format(title=title, replay_svg=replay_svg, heatmap_svg=heatmap_svg,
+                                events=json.dumps(events), x_size=trace.x_size, y_size=trace.y_size,
+                                cell_bits=search_trace.cell_bits, events_per_frame=max(1, len(events) // frames))
+    with open(file_name, 'w') as f:
+        f.write(page)
+
+
+def print_hot_cells(trace, count=10):
+    total = sum(trace.backtrack_counts)
+    cells = sorted(range(len(trace.backtrack_counts)), key=lambda cell: -trace.backtrack_counts[cell])[:count]
+    print(f'{total} backtracks, hottest cells:')
+    for cell in cells:
+        if trace.backtrack_counts[cell] == 0:
+            break
+        share = trace.backtrack_counts[cell] / total
+        print(f'  ({cell % trace.x_size}, {cell // trace.x_size}): {trace.backtrack_counts[cell]} ({share:.1%})')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a path search trace and draw its backtrack heatmap.')
+    parser.add_argument('--trace', help='trace file written by SearchTrace.save. Without it a new search is recorded')
+    parser.add_argument('--size', default='13x13')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--capacity', type=int, default=1000000, help='number of events the ring buffer keeps')
+    parser.add_argument('--sample', type=int, default=1, help='store only every n-th place/backtrack event')
+    parser.add_argument('--save', help='also save the recorded trace to this file')
+    parser.add_argument('--frames', type=int, default=600, help='length of the animation in frames')
+    parser.add_argument('--output', default='trace.html')
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = search_trace.load(args.trace)
+    else:
+        trace = record_trace(*parse_size(args.size), args.seed, args.capacity, args.sample)
+        if args.save:
+            trace.save(args.save)
+    write_page(trace, args.output, args.frames)
+    print_hot_cells(trace)
+    print(f'wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# Offline trainer for the learned move ordering used by path_generator.fill_path.
+# Runs the generator many times per grid size, records the local features of every candidate move at each branching
+# node, and writes the fraction of times each feature combination ended up on the finished path to move_ordering.json.
+# Every new table is then measured against the Warnsdorff ordering on held-out seeds, the ones after the training seeds.
+# The mean backtracks of both are stored with the table, and path_generator only uses the tables that won.
+#
+# Usage: python tools/train_move_ordering.py --sizes 7x7 9x9 11x11 13x13 15x13 15x15 --runs 200
+# With --evaluate-only the stored tables are measured again without training.
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'commands', 'marbleRunCreate'))
+import path_generator
+
+
+def parse_size(text):
+    x_size, y_size = text.lower().split('x')
+    return int(x_size), int(y_size)
+
+
+def train_size(x_size, y_size, runs, first_seed=0):
+    # counts[key] = [number of times the move was on the finished path, number of times it was a candidate]
+    counts = {}
+    path_generator.use_learned_ordering = False # train on the plain Warnsdorff ordering
+    path_generator.feature_log = []
+    try:
+        for seed in range(first_seed, first_seed + runs):
+            matrix = path_generator.generate_path(x_size, y_size, seed=seed)
+            for num, (x, y), candidates in path_generator.feature_log:
+                is_on_path = matrix[y][x] == num
+                for (nx, ny), key in candidates:
+                    count = counts.setdefault(key, [0, 0])
+                    count[1] += 1
+                    if is_on_path and matrix[ny][nx] == num + 1:
+                        count[0] += 1
+    finally:
+        path_generator.feature_log = None
+    # Laplace smoothing keeps rarely seen features close to an even chance
+    return {key: round((successes + 1) / (total + 2), 4) for key, (successes, total) in sorted(counts.items())}
+
+
+def mean_backtracks(x_size, y_size, first_seed, seeds):
+    backtracks = []
+    for seed in range(first_seed, first_seed + seeds):
+        path_generator.generate_path(x_size, y_size, seed=seed)
+        backtracks.append(path_generator.num_backtracks)
+    return round(statistics.mean(backtracks), 1)
+
+
+def evaluate_size(x_size, y_size, table, first_seed, seeds):
+    path_generator.load_move_ordering()[f'{x_size}x{y_size}'] = table
+    path_generator.use_learned_ordering = False
+    warnsdorff = mean_backtracks(x_size, y_size, first_seed, seeds)
+    path_generator.use_learned_ordering = True
+    learned = mean_backtracks(x_size, y_size, first_seed, seeds)
+    return {'warnsdorff': warnsdorff, 'learned': learned, 'first_seed': first_seed, 'seeds': seeds}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the move ordering table for the marble run path generator.')
+    parser.add_argument('--sizes', nargs='+', default=['5x5', '7x7', '9x9', '11x11', '13x13', '15x13', '15x15'])
+    parser.add_argument('--runs', type=int, default=100, help='number of generated paths per grid size')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first run')
+    parser.add_argument('--eval-seeds', type=int, default=30, help='number of seeded runs that measure each table')
+    parser.add_argument('--eval-seed', type=int, default=None,
+                        help='seed of the first measuring run, by default the first seed after the training runs')
+    parser.add_argument('--evaluate-only', action='store_true', help='measure the stored tables without training')
+    parser.add_argument('--output', default=path_generator.move_ordering_file)
+    args = parser.parse_args()
+
+    path_generator.verbose = False
+    tables = {}
+    evaluations = {}
+    if os.path.exists(args.output):
+        with open(args.output) as f:
+            data = json.load(f)
+        tables = data['tables']
+        evaluations = data.get('evaluations', {})
+
+    # The tuned profiles set their own ordering flags, so the tables are trained and measured with the defaults
+    settings = (path_generator.use_tuned_profiles, path_generator.use_learned_ordering, path_generator.use_evaluations)
+    path_generator.use_tuned_profiles = False
+    path_generator.use_evaluations = False
+    try:
+        for size in args.sizes:
+            x_size, y_size = parse_size(size)
+            size = f'{x_size}x{y_size}'
+            if not args.evaluate_only:
+                tables[size] = train_size(x_size, y_size, args.runs, args.seed)
+            elif size not in tables:
+                continue
+            # The measuring runs must not be training runs. A table measured again keeps the seeds it was measured on
+            eval_seed = args.eval_seed
+            if eval_seed is None and args.evaluate_only and 'first_seed' in evaluations.get(size, {}):
+                eval_seed = evaluations[size]['first_seed']
+            if eval_seed is None:
+                eval_seed = args.seed + args.runs
+            evaluations[size] = evaluate_size(x_size, y_size, tables[size], eval_seed, args.eval_seeds)
+            evaluation = evaluations[size]
+            result = 'used' if evaluation['learned'] < evaluation['warnsdorff'] else 'not used'
+            print(f'{size}: {len(tables[size])} feature combinations, mean backtracks {evaluation["warnsdorff"]} '
+                  f'(Warnsdorff) -> {evaluation["learned"]} (learned), {result}', flush=True)
+    finally:
+        path_generator.use_tuned_profiles, path_generator.use_learned_ordering, path_generator.use_evaluations = settings
+
+    with open(args.output, 'w') as f:
+        json.dump({'version': 1, 'tables': tables, 'evaluations': evaluations}, f, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()